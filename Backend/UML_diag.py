@@ -1,15 +1,21 @@
 import os
-import subprocess
-import google.generativeai as genai
-from dotenv import load_dotenv
+from progress import notify
+from llm_cache import generate_cached
+from llm_backend import get_model
+from uml_from_analysis import build_class_diagram, build_component_diagram
+from plantuml_renderer import get_renderer
 
 # --- Setup ---
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not set in .env")
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("models/gemini-2.5-flash")
+model = get_model("models/gemini-2.5-flash")
+
+UML_MARKDOWN_PATH = os.getenv("OUTPUT_MD", r"P:\AI_Documentation\example\FULL_PROJECT_DOC.md")
+UML_OUTPUT_DIR = os.getenv("UML_OUTPUT_DIR", r"P:\AI_Documentation\example\uml")
+# Set to 0 where Java/PlantUML is unavailable (benchmarks, CI)
+UML_RENDER_PNG = os.getenv("UML_RENDER_PNG", "1") == "1"
+# Rendered image format: "png" or "svg"
+UML_IMAGE_FORMAT = os.getenv("UML_IMAGE_FORMAT", "png")
+# The Gemini flowchart is an extra LLM round-trip; class/component diagrams need none
+UML_LLM_FLOWCHART = os.getenv("UML_LLM_FLOWCHART", "0") == "1"
 
 # ===================================================
 # UML (Flowchart) Generation Functions
@@ -34,8 +40,7 @@ def generate_plantuml(md_text: str) -> str:
     Generates PlantUML code (activity diagram / flowchart) from markdown using Gemini.
     """
     prompt = PROMPT_TEMPLATE.format(markdown_content=md_text)
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return generate_cached(model, prompt)
 
 def extract_uml_block(text: str) -> str:
     """
@@ -52,16 +57,21 @@ def extract_uml_block(text: str) -> str:
 # ===================================================
 
 def generate_uml_diagram_from_markdown(
-    markdown_path: str = r"P:\AI_Documentation\example\FULL_PROJECT_DOC.md",
-    output_dir: str = r"P:\AI_Documentation\example\uml",
-    render_png: bool = True
+    markdown_path: str = None,
+    output_dir: str = None,
+    render_png: bool = None,
+    emit=None
 ) -> str:
     """
     Reads a Markdown documentation file and generates a PlantUML activity diagram (flowchart).
       - Uses Gemini to create PlantUML code
       - Saves .puml file
-      - Optionally renders .png diagram using PlantUML
+      - Optionally renders it (PNG/SVG) through the shared PlantUML process
+    Arguments left as None fall back to the module configuration.
     """
+    markdown_path = markdown_path or UML_MARKDOWN_PATH
+    output_dir = output_dir or UML_OUTPUT_DIR
+    render_png = UML_RENDER_PNG if render_png is None else render_png
     os.makedirs(output_dir, exist_ok=True)
 
     # Load Markdown summary
@@ -69,6 +79,7 @@ def generate_uml_diagram_from_markdown(
         md_text = f.read()
 
     print("[+] Generating UML (flowchart) with Gemini...")
+    notify(emit, "uml_started")
     gemini_response = generate_plantuml(md_text)
     uml_code = extract_uml_block(gemini_response)
 
@@ -79,18 +90,81 @@ def generate_uml_diagram_from_markdown(
         f.write("\n@enduml")
 
     print(f"[✔] PlantUML flowchart saved to: {puml_path}")
+    notify(emit, "uml_generated", kind="flowchart", puml_path=puml_path, source=f"@startuml\n{uml_code}\n@enduml")
 
-    # Optionally render PNG
+    # Optionally render the image
     if render_png:
-        os.chdir(output_dir)
-        if not os.path.exists("plantuml.jar"):
-            print("[↓] Downloading PlantUML...")
-            subprocess.run([
-                "curl", "-L", "-o", "plantuml.jar",
-                "https://github.com/plantuml/plantuml/releases/latest/download/plantuml.jar"
-            ])
-        print("Rendering flowchart PNG...")
-        subprocess.run(["java", "-jar", "plantuml.jar", "combined_diagram.puml"])
-        print("[✔] Flowchart PNG generated.")
+        render_puml(puml_path, emit)
 
     return puml_path
+
+# ===================================================
+# Rendering
+# ===================================================
+
+def render_puml(puml_path: str, emit=None, fmt: str = None) -> str:
+    """Renders one .puml file; returns the content-addressed image path in the same folder."""
+    return render_diagrams({"diagram": puml_path}, emit, fmt).get("diagram")
+
+
+def render_diagrams(puml_paths: dict, emit=None, fmt: str = None, image_dir: str = None) -> dict:
+    """
+    Renders {kind: puml_path} in one batch through the shared PlantUML process.
+    Images are named by content hash, so unchanged diagrams are served from
+    the render cache and concurrent runs can share one image_dir.
+    Returns {kind: image_path} for the successful renders.
+    """
+    fmt = fmt or UML_IMAGE_FORMAT
+    # Images land in image_dir, or next to their .puml files; each folder is one batch
+    batches = {}
+    for kind, puml_path in puml_paths.items():
+        with open(puml_path, "r", encoding="utf-8") as f:
+            output_dir = image_dir or os.path.dirname(os.path.abspath(puml_path))
+            batches.setdefault(output_dir, []).append((kind, f.read()))
+
+    print(f"[+] Rendering {len(puml_paths)} diagram(s) as {fmt.upper()}...")
+    images = {}
+    for output_dir, batch in batches.items():
+        rendered = get_renderer().render_many([source for _, source in batch], output_dir, fmt)
+        for (kind, _), image_path in zip(batch, rendered):
+            if image_path:
+                images[kind] = image_path
+                notify(emit, "uml_rendered", kind=kind, image_name=os.path.basename(image_path), format=fmt)
+    print(f"[✔] {len(images)}/{len(puml_paths)} diagram(s) rendered.")
+    return images
+
+# ===================================================
+# Analysis-derived Diagrams (no LLM)
+# ===================================================
+
+def generate_uml_diagrams_from_analysis(
+    analysis,
+    output_dir: str = None,
+    render_png: bool = None,
+    emit=None
+) -> dict:
+    """
+    Writes a class diagram (inheritance/composition) and a component diagram
+    (import graph) built directly from the analysis tree, or the files_data
+    list of single-prompt mode. Returns {"class": puml_path, "component": puml_path}.
+    """
+    output_dir = output_dir or UML_OUTPUT_DIR
+    render_png = UML_RENDER_PNG if render_png is None else render_png
+    os.makedirs(output_dir, exist_ok=True)
+
+    notify(emit, "uml_started")
+    diagrams = {
+        "class": ("class_diagram.puml", build_class_diagram(analysis)),
+        "component": ("component_diagram.puml", build_component_diagram(analysis)),
+    }
+    paths = {}
+    for kind, (filename, source) in diagrams.items():
+        puml_path = os.path.join(output_dir, filename)
+        with open(puml_path, "w", encoding="utf-8") as f:
+            f.write(source)
+        print(f"[✔] PlantUML {kind} diagram saved to: {puml_path}")
+        notify(emit, "uml_generated", kind=kind, puml_path=puml_path, source=source)
+        paths[kind] = puml_path
+    if render_png:
+        render_diagrams(paths, emit)
+    return paths
@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import threading
+import subprocess
+
+# --------------------------------------------
+# Global Configurations
+# --------------------------------------------
+CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", r"P:\AI_Documentation\example\cache\analysis")
+CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bytes used per cache directory, shared by every AnalysisCache of this process:
+# the directory is scanned once per process, not once per request
+_dir_totals = {}
+_dir_totals_lock = threading.Lock()
+
+
+# --------------------------------------------
+# KEY HELPERS
+# --------------------------------------------
+def git_blob_sha(data: bytes) -> str:
+    """Hash file content exactly like `git hash-object` does."""
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def list_blob_shas(repo_dir: str) -> dict:
+    """
+    Returns {relative_path: blob_sha} for every tracked file of a checkout,
+    read from the git index so no file has to be opened or hashed.
+    Returns an empty dict when repo_dir is not a git checkout.
+    """
+    try:
+        out = subprocess.run(
+            ["git", "-C", repo_dir, "ls-files", "-s", "-z"],
+            capture_output=True, check=True
+        ).stdout
+    except Exception:
+        return {}
+
+    shas = {}
+    for entry in out.split(b"\0"):
+        if not entry:
+            continue
+        meta, path = entry.split(b"\t", 1)
+        shas[path.decode("utf-8", "replace")] = meta.split()[1].decode()
+    return shas
+
+
+# --------------------------------------------
+# ON-DISK LRU CACHE
+# --------------------------------------------
+class AnalysisCache:
+    """
+    Content-addressed store for per-file analyzer results.
+    Entries are keyed by (blob sha, analyzer version, language) and kept as
+    small JSON files; the mtime of an entry doubles as its LRU timestamp.
+    Analyzer failures (None) are never stored, so they are retried next run.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dir_key = os.path.abspath(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(blob_sha: str, analyzer_version: str, language: str) -> str:
+        raw = f"{analyzer_version}:{language}:{blob_sha}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key: str):
+        """Returns (found, result)."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return False, None
+
+        if entry.get("result") is None:
+            # Failure stored by an older version: analyse the file again
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, entry["result"]
+
+    def put(self, key: str, result):
+        """Stores an analyzer result; None (a failure, possibly transient) is not cached."""
+        if result is None:
+            return
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"result": result}, separators=(",", ":")).encode("utf-8")
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[!] Could not write analysis cache entry {key}: {e}")
+            return
+
+        with _dir_totals_lock:
+            if self._dir_key in _dir_totals:
+                _dir_totals[self._dir_key] += len(data) - old_size
+        self.evict()
+
+    def _entries(self):
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    yield entry
+
+    def evict(self):
+        """Drops least-recently-used entries until the cache fits in max_bytes."""
+        with _dir_totals_lock:
+            total = _dir_totals.get(self._dir_key)
+        if total is None:
+            total = sum(e.stat().st_size for e in self._entries())
+            with _dir_totals_lock:
+                total = _dir_totals.setdefault(self._dir_key, total)
+        if total <= self.max_bytes:
+            return
+
+        entries = sorted(
+            ((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries())
+        )
+        # Re-counted from the scan, which also corrects drift from other processes
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        with _dir_totals_lock:
+            _dir_totals[self._dir_key] = total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
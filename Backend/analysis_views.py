@@ -0,0 +1,175 @@
+import os
+import json
+import zlib
+import threading
+from collections import OrderedDict
+
+# Optional: Brotli responses need `pip install brotli`; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Views over an analysis tree for API responses: keep only some file fields
+# (e.g. drop the tree-sitter "ast"), cut the tree at a depth, or page through
+# the flat file list. Responses are JSON-encoded incrementally and compressed
+# chunk by chunk, so no complete JSON string is ever built in memory.
+BASE_FIELDS = ("name", "path", "type", "depth")
+STREAM_CHUNK_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Analysis trees kept in memory per repo@commit, so paging needs no re-analysis
+ANALYSIS_VIEW_CACHE_SIZE = int(os.getenv("ANALYSIS_VIEW_CACHE_SIZE", "8"))
+
+
+def parse_field_list(value):
+    """"a, b" -> {"a", "b"}; None or "" -> None."""
+    if not value:
+        return None
+    return {field.strip() for field in value.split(",") if field.strip()}
+
+
+# ------------------------------------------------------------------
+# Projection
+# ------------------------------------------------------------------
+def project_node(node, fields=None, exclude=None):
+    """Copy of a node without children: the base fields plus `fields` (all when None), minus `exclude`."""
+    exclude = exclude or ()
+    return {
+        key: value for key, value in node.items()
+        if key != "children" and key not in exclude and (fields is None or key in fields or key in BASE_FIELDS)
+    }
+
+
+def project_tree(tree, fields=None, exclude=None, max_depth=None):
+    """
+    Projected copy of the whole tree. Folders at max_depth keep no children
+    and are marked "truncated" when they had any.
+    """
+    if tree is None:
+        return None
+    root = project_node(tree, fields, exclude)
+    stack = [(tree, root)]
+    while stack:
+        source, copy = stack.pop()
+        if source["type"] != "folder":
+            continue
+        children = source.get("children", [])
+        if max_depth is not None and source["depth"] >= max_depth:
+            copy["children"] = []
+            if children:
+                copy["truncated"] = True
+            continue
+        copy["children"] = [project_node(child, fields, exclude) for child in children]
+        stack.extend(zip(children, copy["children"]))
+    return root
+
+
+def iter_file_nodes(tree, max_depth=None):
+    """File nodes in pre-order (the order of the tree's listing)."""
+    stack = [tree] if tree else []
+    while stack:
+        node = stack.pop()
+        if node["type"] == "file":
+            yield node
+        elif max_depth is None or node["depth"] < max_depth:
+            stack.extend(reversed(node.get("children", [])))
+
+
+def page_files(tree, offset=0, limit=100, fields=None, exclude=None, max_depth=None):
+    """One page of the flat file list: {"files", "total", "offset", "limit", "next_offset"}."""
+    files = []
+    total = 0
+    for node in iter_file_nodes(tree, max_depth):
+        if offset <= total < offset + limit:
+            files.append(project_node(node, fields, exclude))
+        total += 1
+    next_offset = offset + limit if offset + limit < total else None
+    return {"files": files, "total": total, "offset": offset, "limit": limit, "next_offset": next_offset}
+
+
+# ------------------------------------------------------------------
+# Streaming / Compression
+# ------------------------------------------------------------------
+def choose_encoding(accept_encoding):
+    """Best supported Content-Encoding for an Accept-Encoding header: "br", "gzip" or None."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def _compressor(encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        return compressor.compress, compressor.flush
+    return None
+
+
+def stream_json(obj, encoding=None, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yields obj as UTF-8 JSON in ~chunk_bytes pieces, compressed with `encoding` when given."""
+    compressor = _compressor(encoding)
+    buffer = []
+    size = 0
+    for piece in json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).iterencode(obj):
+        data = piece.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            block = b"".join(buffer)
+            buffer, size = [], 0
+            block = compressor[0](block) if compressor else block
+            if block:
+                yield block
+    block = b"".join(buffer)
+    if compressor:
+        block = compressor[0](block) + compressor[1]()
+    if block:
+        yield block
+
+
+# ------------------------------------------------------------------
+# Tree Cache
+# ------------------------------------------------------------------
+class AnalysisViewCache:
+    """Small LRU of analysis trees keyed by (repo, commit)."""
+
+    def __init__(self, size: int = ANALYSIS_VIEW_CACHE_SIZE):
+        self.size = size
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+            return tree
+
+    def put(self, key, tree):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._trees[key] = tree
+            self._trees.move_to_end(key)
+            while len(self._trees) > self.size:
+                self._trees.popitem(last=False)
@@ -0,0 +1,385 @@
+"""
+End-to-end pipeline benchmark against the local fake LLM backend.
+
+Builds a synthetic git repository, runs process_repo_full + UML generation
+(through pipeline.run_full_pipeline) and, optionally, the /process_repo
+endpoint, and reports per-stage wall time, throughput and peak memory.
+No network access or Gemini quota is used.
+
+    python benchmark.py --files 200 --runs 2 --endpoint --json baseline.json
+
+The first run of each target is cold (fresh commit, empty caches for its
+files); pass --warm to re-run the same commit and measure cache hits, or
+--incremental N to let every later revision change only N files and
+re-document them incrementally (see incremental.py).
+
+    python benchmark.py --import-budget 1.0
+
+checks server startup instead: `import main` in a fresh interpreter without
+Gemini credentials must finish within the budget, /healthz must answer, and
+none of the lazily loaded modules may have been imported (exit code 1 if not).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stage boundaries, as (stage, start event, end event); "start"/"end" wrap the whole run
+STAGES = [
+    ("clone", "start", "clone_finished"),
+    ("analysis", "clone_finished", "analysis_finished"),
+    ("file_summaries", "analysis_finished", "llm_started"),
+    ("project_markdown", "llm_started", "markdown_ready"),
+    ("uml", "markdown_ready", "end"),
+]
+# Heavy dependencies that must only load on first use, never at server startup
+LAZY_MODULES = ("javalang", "tree_sitter_languages", "git", "google.generativeai", "dotenv")
+
+STARTUP_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - started
+loaded = [name for name in {lazy!r} if name in sys.modules]
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+response = TestClient(main.app).get("/healthz")
+print(json.dumps({{
+    "import_seconds": round(import_seconds, 4),
+    "healthz_status": response.status_code,
+    "healthz_seconds": round(time.perf_counter() - started, 4),
+    "lazy_modules_loaded": loaded,
+}}))
+"""
+
+
+# ------------------------------------------------------------------
+# Environment
+# ------------------------------------------------------------------
+def configure_environment(workspace, args):
+    """Points every store at the workspace and selects the fake backend; must run before Backend imports."""
+    env = {
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_TOKENS_PER_SEC": str(args.tokens_per_sec),
+        "FAKE_LLM_OUTPUT_TOKENS": str(args.output_tokens),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "FAKE_LLM_SEED": str(args.seed),
+        "LLM_CONCURRENCY": str(args.concurrency),
+        "GEMINI_RPM": str(args.rpm),
+        "DOC_MODE": args.mode,
+        "BASE_CLONE_DIR": os.path.join(workspace, "cloned_repo"),
+        "OUTPUT_MD": os.path.join(workspace, "FULL_PROJECT_DOC.md"),
+        "UML_OUTPUT_DIR": os.path.join(workspace, "uml"),
+        "UML_RENDER_PNG": "0",
+        "MIRROR_ROOT": os.path.join(workspace, "mirrors"),
+        # The synthetic repository is served as a file:// remote
+        "ALLOW_FILE_REMOTES": "1",
+        "ANALYSIS_CACHE_DIR": os.path.join(workspace, "cache", "analysis"),
+        "LLM_CACHE_PATH": os.path.join(workspace, "cache", "llm_cache.sqlite3"),
+        "JOBS_DIR": os.path.join(workspace, "jobs"),
+        "WORKSPACE_ROOT": os.path.join(workspace, "workspaces"),
+        "DOC_STATE_DIR": os.path.join(workspace, "doc_state"),
+        "RESULT_STORE_PATH": os.path.join(workspace, "cache", "results.sqlite3"),
+        "INCREMENTAL_DOCS": "1" if args.incremental else "0",
+    }
+    os.environ.update(env)
+    return env
+
+
+# ------------------------------------------------------------------
+# Synthetic Repository
+# ------------------------------------------------------------------
+def _python_file(name, deps, rng, functions, salt):
+    lines = [f'"""Synthetic module {name} ({salt})."""']
+    lines += [f"from pkg import {dep}" for dep in deps]
+    lines.append("")
+    lines.append(f"class {name.title()}Service:")
+    lines.append(f'    """Service object for {name}."""')
+    for i in range(functions):
+        lines.append(f"    def step_{i}(self, value):")
+        lines.append(f"        return value * {rng.randint(1, 9)} + {i}")
+    for i in range(functions):
+        lines.append("")
+        lines.append(f"def helper_{i}(items):")
+        lines.append(f'    """Helper {i}."""')
+        lines.append(f"    return [x + {rng.randint(1, 99)} for x in items]")
+    return "\n".join(lines) + "\n"
+
+
+def _javascript_file(name, deps, rng, functions, salt):
+    lines = [f"// Synthetic module {name} ({salt})"]
+    lines += [f"import {{ run as {dep}Run }} from './{dep}';" for dep in deps]
+    lines.append(f"export class {name.title()}Widget {{")
+    for i in range(functions):
+        lines.append(f"  step{i}(value) {{ return value * {rng.randint(1, 9)}; }}")
+    lines.append("}")
+    for i in range(functions):
+        lines.append(f"export function run{i}(items) {{ return items.map(x => x + {rng.randint(1, 99)}); }}")
+    return "\n".join(lines) + "\n"
+
+
+def _java_file(name, deps, rng, functions, salt):
+    cls = name.title()
+    lines = [f"// Synthetic module {name} ({salt})", "package com.example;", ""]
+    lines += [f"import com.example.{dep.title()};" for dep in deps]
+    lines.append(f"public class {cls} {{")
+    for i in range(functions):
+        lines.append(f"    public int step{i}(int value) {{ return value * {rng.randint(1, 9)}; }}")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+GENERATORS = {
+    "py": (_python_file, "pkg"),
+    "js": (_javascript_file, "web/src"),
+    "java": (_java_file, "service/src/main/java/com/example"),
+}
+
+
+def write_synthetic_repo(repo_dir, files, functions, seed, salt=0, languages=("py", "js", "java"), changed=None):
+    """
+    Writes `files` source files spread across languages and nested folders.
+    With `changed`, only the first `changed` files carry `salt`; the rest keep
+    their revision-1 content. Returns the file count.
+    """
+    rng = random.Random(seed)
+    names = {ext: [] for ext in languages}
+    for index in range(files):
+        ext = languages[index % len(languages)]
+        generator, folder = GENERATORS[ext]
+        name = f"mod{index:05d}"
+        deps = rng.sample(names[ext], min(3, len(names[ext])))
+        subfolder = os.path.join(repo_dir, folder, f"group{index // 25:03d}")
+        os.makedirs(subfolder, exist_ok=True)
+        with open(os.path.join(subfolder, f"{name}.{ext}"), "w", encoding="utf-8") as f:
+            file_salt = salt if changed is None or index < changed else 1
+            f.write(generator(name, deps, rng, functions, file_salt))
+        names[ext].append(name)
+
+    with open(os.path.join(repo_dir, "README.md"), "w", encoding="utf-8") as f:
+        f.write(f"# Synthetic benchmark repository\n\nRevision {salt}.\n")
+    return files
+
+
+def _git(repo_dir, *args):
+    subprocess.run(
+        ["git", "-C", repo_dir, *args], check=True, capture_output=True,
+        env={**os.environ, "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+             "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com"},
+    )
+
+
+def commit_synthetic_revision(repo_dir, args, salt):
+    """(Re)writes the repo contents for revision `salt` and commits them."""
+    if not os.path.isdir(os.path.join(repo_dir, ".git")):
+        os.makedirs(repo_dir, exist_ok=True)
+        _git(repo_dir, "init", "-q", "-b", "main")
+    changed = args.incremental if args.incremental and salt > 1 else None
+    write_synthetic_repo(repo_dir, args.files, args.functions, args.seed, salt, changed=changed)
+    _git(repo_dir, "add", "-A")
+    _git(repo_dir, "commit", "-q", "--allow-empty", "-m", f"revision {salt}")
+
+
+# ------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------
+class EventTimer:
+    """emit() callback that records when each progress event first occurs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_seen = {"start": self.started}
+        self.counts = {}
+
+    def __call__(self, event, **data):
+        self.first_seen.setdefault(event, time.perf_counter())
+        self.counts[event] = self.counts.get(event, 0) + 1
+
+    def stage_times(self, finished):
+        marks = dict(self.first_seen, end=finished)
+        stages = {}
+        for name, start, end in STAGES:
+            if start in marks and end in marks:
+                stages[name] = round(marks[end] - marks[start], 4)
+        return stages
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(label, files, fn):
+    """Runs fn(emit) and returns wall time, throughput, stage times and peak memory."""
+    from llm_cache import cache_stats
+    import process_repo_full
+
+    before_cache = cache_stats()
+    before_calls = getattr(process_repo_full.model, "calls", 0)
+    tracemalloc.start()
+    timer = EventTimer()
+    error = None
+    try:
+        fn(timer)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finished = time.perf_counter()
+    _, peak_heap = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after_cache = cache_stats()
+
+    wall = finished - timer.started
+    result = {
+        "target": label,
+        "wall_seconds": round(wall, 4),
+        "files": files,
+        "files_per_second": round(files / wall, 2) if wall > 0 else None,
+        "stages": timer.stage_times(finished),
+        "llm_calls": getattr(process_repo_full.model, "calls", 0) - before_calls,
+        "llm_cache_hits": after_cache["hits"] - before_cache["hits"],
+        "llm_cache_misses": after_cache["misses"] - before_cache["misses"],
+        "peak_python_heap_mb": round(peak_heap / (1024 * 1024), 1),
+        "peak_rss_mb": _peak_rss_mb(),
+        "events": timer.counts,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def run_pipeline_target(git_url):
+    from pipeline import run_full_pipeline
+
+    def run(emit):
+        run_full_pipeline(git_url, emit=emit)
+    return run
+
+
+def run_endpoint_target(git_url):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+
+    def run(emit):
+        # The endpoint has no emit hook; only whole-request timing is available
+        response = client.post("/process_repo", json={"git_url": git_url})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return run
+
+
+def check_startup(budget):
+    """Imports main in a fresh interpreter (real Gemini backend, no API key) and probes /healthz."""
+    env = dict(os.environ, LLM_BACKEND="gemini")
+    env.pop("GEMINI_API_KEY", None)
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE.format(lazy=LAZY_MODULES)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {"ok": False, "error": completed.stderr.strip().splitlines()[-1:]}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["budget_seconds"] = budget
+    result["ok"] = (
+        result["import_seconds"] <= budget
+        and result["healthz_status"] == 200
+        and not result["lazy_modules_loaded"]
+    )
+    return result
+
+
+# ------------------------------------------------------------------
+# Entry Point
+# ------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the documentation pipeline with a fake LLM.")
+    parser.add_argument("--files", type=int, default=100, help="source files in the synthetic repo")
+    parser.add_argument("--functions", type=int, default=8, help="functions/methods per file")
+    parser.add_argument("--runs", type=int, default=1, help="measured runs per target")
+    parser.add_argument("--warm", action="store_true", help="re-run the same commit instead of a fresh one")
+    parser.add_argument("--endpoint", action="store_true", help="also benchmark POST /process_repo")
+    parser.add_argument("--incremental", type=int, metavar="N",
+                        help="later revisions change only N files and are documented incrementally")
+    parser.add_argument("--mode", choices=["map_reduce", "single"], default="map_reduce")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency per call (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=400.0)
+    parser.add_argument("--output-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rpm", type=float, default=100000.0, help="client-side requests-per-minute limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workspace", help="directory for repos, caches and outputs (default: temp dir)")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--import-budget", type=float, metavar="SECONDS",
+                        help="only check server startup time against this budget")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workspace = os.path.abspath(args.workspace or tempfile.mkdtemp(prefix="doc_bench_"))
+    configure_environment(workspace, args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.import_budget is not None:
+        result = check_startup(args.import_budget)
+        print(json.dumps(result, indent=2))
+        status = "ok" if result["ok"] else "FAILED"
+        print(f"[{'✔' if result['ok'] else '!'}] startup: {result.get('import_seconds')}s "
+              f"(budget {args.import_budget}s) {status}")
+        if not result["ok"]:
+            sys.exit(1)
+        return result
+
+    repo_dir = os.path.join(workspace, "synthetic_repo")
+    git_url = Path(repo_dir).as_uri()
+    targets = [("pipeline", run_pipeline_target)]
+    if args.endpoint:
+        targets.append(("endpoint", run_endpoint_target))
+
+    results = []
+    revision = 0
+    for label, make_target in targets:
+        run = make_target(git_url)
+        for index in range(args.runs):
+            if not (args.warm and revision):
+                revision += 1
+                commit_synthetic_revision(repo_dir, args, revision)
+            print(f"[+] {label} run {index + 1}/{args.runs} (revision {revision}, {args.files} files)")
+            result = measure(label, args.files, run)
+            result.update(run=index + 1, revision=revision)
+            results.append(result)
+            status = f"failed: {result['error']}" if "error" in result else "ok"
+            print(f"[✔] {label}: {result['wall_seconds']}s, {result['files_per_second']} files/s, "
+                  f"peak heap {result['peak_python_heap_mb']} MB ({status})")
+
+    report = {
+        "workspace": workspace,
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "workspace")},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import os
+import ast
+import asyncio
+
+from prompt_packer import count_tokens, pack_source, FILE_CODE_TOKEN_BUDGET
+from llm_engine import LLMEngine, LLM_CONCURRENCY
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Files whose code does not fit one per-file prompt are split into chunks at
+# class/function boundaries (ast for Python, tree-sitter for the rest, javalang
+# when tree-sitter is not installed), the chunks are summarised in parallel and
+# the chunk summaries replace the code in the file prompt. Every line of the
+# file ends up in exactly one chunk. Chunk prompts contain only the language
+# and the code, so llm_cache keys them by content: an unchanged function is a
+# cache hit even after the rest of the file (or its path) changed.
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "1500"))
+# Upper bound of chunks summarised per file; the rest are listed by name only
+MAX_CHUNKS_PER_FILE = int(os.getenv("MAX_CHUNKS_PER_FILE", "40"))
+
+
+# ------------------------------------------------------------------
+# Symbol Spans
+# ------------------------------------------------------------------
+# A span is {"start": first line, "end": last line (1-based, inclusive),
+# "name": symbol name or None, "children": nested spans it can be split into}
+def _python_spans(source):
+    def span(node):
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        body = getattr(node, "body", None)
+        children = [span(child) for child in body] if isinstance(body, list) else []
+        return {"start": start, "end": node.end_lineno, "name": getattr(node, "name", None), "children": children}
+
+    return [span(node) for node in ast.parse(source).body]
+
+
+def _tree_sitter_spans(source, language):
+    from tree_sitter_languages import get_parser  # imported on first use, like the analyzers
+
+    text = source.encode()
+
+    def body_of(node):
+        body = node.child_by_field_name("body")
+        declaration = node.child_by_field_name("declaration")  # JS/TS `export class ...`
+        if body is None and declaration is not None:
+            body = declaration.child_by_field_name("body")
+        return body.named_children if body is not None else []
+
+    def name_of(node):
+        name = node.child_by_field_name("name")
+        declaration = node.child_by_field_name("declaration")
+        if name is None and declaration is not None:
+            name = declaration.child_by_field_name("name")
+        return text[name.start_byte:name.end_byte].decode("utf-8", "replace") if name is not None else None
+
+    def span(node):
+        return {
+            "start": node.start_point[0] + 1,
+            "end": node.end_point[0] + 1,
+            "name": name_of(node),
+            "children": [span(child) for child in body_of(node)],
+        }
+
+    return [span(node) for node in get_parser(language).parse(text).root_node.named_children]
+
+
+def _javalang_spans(source, total_lines):
+    """javalang only knows where declarations start; each one ends where the next begins."""
+    import javalang
+
+    def spans(nodes, end):
+        starts = [(node.position.line, node) for node in nodes if getattr(node, "position", None)]
+        result = []
+        for index, (start, node) in enumerate(starts):
+            stop = starts[index + 1][0] - 1 if index + 1 < len(starts) else end
+            members = list(getattr(node, "fields", [])) + list(getattr(node, "constructors", [])) + \
+                list(getattr(node, "methods", []))
+            members.sort(key=lambda member: member.position.line if member.position else 0)
+            result.append({"start": start, "end": stop, "name": node.name, "children": spans(members, stop)})
+        return result
+
+    return spans(javalang.parse.parse(source).types, total_lines)
+
+
+def symbol_spans(source, language):
+    """Top-level symbol spans, or [] when the language has no parser here (line windows are used)."""
+    try:
+        if language == "python":
+            return _python_spans(source)
+        try:
+            return _tree_sitter_spans(source, language)
+        except ImportError:
+            if language == "java":
+                return _javalang_spans(source, len(source.splitlines()))
+            return []
+    except Exception as e:
+        print(f"[!] Could not parse {language} source for chunking: {e}")
+        return []
+
+
+# ------------------------------------------------------------------
+# Chunking
+# ------------------------------------------------------------------
+def _pieces(spans, start, end):
+    """
+    Cuts lines start..end into pieces, one per span. Lines before a span
+    (comments, decorators, blank lines) belong to it; lines after the last
+    span belong to the last piece.
+    """
+    pieces = []
+    position = start
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if span["end"] < position or span["start"] > end:
+            continue  # shares its lines with the previous span
+        piece_end = min(span["end"], end)
+        pieces.append({"start": position, "end": piece_end, "names": [span["name"]] if span["name"] else [],
+                       "children": span["children"]})
+        position = piece_end + 1
+    if position <= end:
+        if pieces:
+            pieces[-1]["end"] = end
+        else:
+            pieces.append({"start": position, "end": end, "names": [], "children": []})
+    return pieces
+
+
+def chunk_source(source, language, budget=CHUNK_TOKEN_BUDGET):
+    """
+    Splits source into chunks of at most `budget` tokens along symbol
+    boundaries. Returns [{"lines": [first, last], "symbols": [...], "text": ...}]
+    covering every line exactly once, in order. A single symbol larger than
+    the budget is split at its members, and only as a last resort by lines.
+    """
+    lines = source.splitlines()
+    if not lines:
+        return []
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + count_tokens(line) + 1)
+
+    def cost(piece):
+        return offsets[piece["end"]] - offsets[piece["start"] - 1]
+
+    def fit(pieces):
+        fitted = []
+        for piece in pieces:
+            if cost(piece) <= budget:
+                fitted.append(piece)
+            elif piece["children"]:
+                inner = fit(_pieces(piece["children"], piece["start"], piece["end"]))
+                # Name the parts after the symbol they belong to
+                for part in inner:
+                    part["names"] = [".".join(piece["names"] + [n]) if piece["names"] else n for n in part["names"]] \
+                        or list(piece["names"])
+                fitted.extend(inner)
+            else:
+                window = dict(piece, children=[])
+                for number in range(piece["start"], piece["end"] + 1):
+                    if number > window["start"] and offsets[number] - offsets[window["start"] - 1] > budget:
+                        fitted.append(dict(window, end=number - 1))
+                        window = dict(window, start=number)
+                fitted.append(dict(window, end=piece["end"]))
+        return fitted
+
+    # Greedily merge neighbouring pieces while they fit one chunk
+    chunks = []
+    for piece in fit(_pieces(symbol_spans(source, language), 1, len(lines))):
+        if chunks and offsets[piece["end"]] - offsets[chunks[-1]["start"] - 1] <= budget:
+            chunks[-1]["end"] = piece["end"]
+            chunks[-1]["names"] += [n for n in piece["names"] if n not in chunks[-1]["names"]]
+        else:
+            chunks.append({"start": piece["start"], "end": piece["end"], "names": list(piece["names"])})
+
+    return [
+        {"lines": [c["start"], c["end"]], "symbols": c["names"], "text": "\n".join(lines[c["start"] - 1:c["end"]])}
+        for c in chunks
+    ]
+
+
+def needs_chunking(source, budget=None):
+    """
+    True when the code splits into more than one chunk. Smaller files go into
+    the per-file prompt as packed code: summarising them as a single chunk
+    would cost an extra call and replace the code with a summary.
+    """
+    if budget is None:
+        budget = max(CHUNK_TOKEN_BUDGET, FILE_CODE_TOKEN_BUDGET)
+    return count_tokens(source) > budget
+
+
+# ------------------------------------------------------------------
+# Chunk Summaries
+# ------------------------------------------------------------------
+def build_chunk_prompt(chunk, language):
+    # No path or line numbers: identical code gives an identical (cached) prompt
+    return (
+        "You are a technical documentation assistant.\n"
+        f"Summarise this section of a {language} source file in at most 80 words: "
+        "what each class/function in it does, its inputs/outputs and notable dependencies.\n\n"
+        f"Code:\n{chunk['text']}\n"
+    )
+
+
+async def summarize_chunks(engine, source, language, budget=CHUNK_TOKEN_BUDGET):
+    """
+    Chunks source and summarises the chunks concurrently through an LLMEngine.
+    Returns [(chunk, summary or None)] in file order.
+    """
+    chunks = await asyncio.to_thread(chunk_source, source, language, budget)
+
+    async def one(chunk):
+        try:
+            return await engine.generate(build_chunk_prompt(chunk, language))
+        except Exception as e:
+            print(f"[!] Could not summarise lines {chunk['lines'][0]}-{chunk['lines'][1]}: {e}")
+            return None
+
+    summaries = await asyncio.gather(*(one(chunk) for chunk in chunks[:MAX_CHUNKS_PER_FILE]))
+    return list(zip(chunks, list(summaries) + [None] * (len(chunks) - len(summaries))))
+
+
+def format_chunk_summaries(chunk_summaries):
+    """Text that stands in for the code of a chunked file inside a file prompt."""
+    sections = []
+    for chunk, summary in chunk_summaries:
+        first, last = chunk["lines"]
+        symbols = ", ".join(chunk["symbols"][:8]) or "module-level code"
+        sections.append(f"[lines {first}-{last}] {symbols}\n{summary or '(not summarised)'}")
+    return "\n\n".join(sections)
+
+
+def summarize_chunks_sync(model, source, language, concurrency=LLM_CONCURRENCY):
+    """summarize_chunks for synchronous callers (one engine per call)."""
+    with LLMEngine(model, concurrency=concurrency) as engine:
+        return asyncio.run(summarize_chunks(engine, source, language))
+
+
+def code_material(model, node, source, language="python"):
+    """
+    Code section for a synchronous per-file prompt: the packed source when the
+    file fits, otherwise summaries of all its chunks.
+    """
+    if not needs_chunking(source):
+        return pack_source(node, source)
+    return "Section summaries (the whole file, in order):\n" + format_chunk_summaries(
+        summarize_chunks_sync(model, source, language)
+    )
@@ -1,15 +1,22 @@
-from git import Repo
 import os
-import shutil
 import ast
 import re
-import javalang
-from tree_sitter_languages import get_parser
+from functools import partial
+from analysis_cache import AnalysisCache, git_blob_sha, list_blob_shas
+from python_symbols import extract_python_symbols
+from compact_ast import compact_ast_from_node
+from source_reader import read_source
+from mirror_store import checkout_repo
+from progress import notify
+from repo_walker import (
+    EXCLUDE_FOLDERS, ANALYZERS, register_analyzer, get_analyzer, walk_repo, folder_record,
+    iter_repo_records, build_tree, analysis_file_record, TreeBuilder
+)
 
 # --------------------------------------------
 # Global Configurations
 # --------------------------------------------
-EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
+# Tree-sitter languages; Python, JavaScript and Java have their own analyzers below
 LANGUAGE_EXT_MAP = {
     "c": "c",
     "cpp": "cpp",
@@ -22,58 +29,83 @@ LANGUAGE_EXT_MAP = {
     "html": "html",
     "css": "css",
 }
+JS_CLASS_PATTERN = re.compile(r'\bclass\s+(\w+)(?:\s+extends\s+([\w.]+))?')
+# Bump whenever analyzer output changes so stale cache entries are ignored.
+ANALYZER_VERSION = "5"
+# Worker processes for parallel analysis (0 keeps the serial walker).
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+ANALYSIS_CHUNKSIZE = int(os.getenv("ANALYSIS_CHUNKSIZE", "16"))
 
 # --------------------------------------------
 # CLONE FUNCTION
 # --------------------------------------------
-def clone_and_analyze_repo(git_url: str, clone_dir: str = r"P:\AI_Documentation\example\cloned_repos"):
+def clone_and_analyze_repo(
+    git_url: str,
+    clone_dir: str = r"P:\AI_Documentation\example\cloned_repos",
+    use_cache: bool = True,
+    workers: int = ANALYSIS_WORKERS,
+    chunksize: int = ANALYSIS_CHUNKSIZE,
+    ref: str = None
+):
     """
-    Clones the given repository and performs full multi-language code analysis.
+    Checks out the given repository (from the local mirror store) and performs
+    full multi-language code analysis.
+    Unchanged files are served from the on-disk analysis cache when use_cache is set,
+    and files are parsed in a process pool when workers > 0.
     Returns the structured analysis tree.
     """
 
-    # Step 1: Clean old repo
-    if os.path.exists(clone_dir):
-        print(f"Deleting existing directory {clone_dir}")
-        shutil.rmtree(clone_dir, ignore_errors=True)
-
-    # Step 2: Clone repository
+    # Step 1-2: Fetch into the mirror and check out the requested ref
     try:
-        Repo.clone_from(git_url, clone_dir)
-        print(f"Cloned {git_url} into {clone_dir}")
+        checkout_repo(git_url, clone_dir, ref=ref)
     except Exception as e:
         raise Exception(f"Failed to clone repository: {e}")
 
     # Step 3: Build code analysis tree
-    analysis_tree = build_code_analysis_tree(clone_dir)
+    cache = AnalysisCache() if use_cache else None
+    blob_shas = list_blob_shas(clone_dir) if use_cache else None
+    if workers > 0:
+        analysis_tree = build_code_analysis_tree_parallel(
+            clone_dir, workers=workers, chunksize=chunksize, cache=cache, blob_shas=blob_shas
+        )
+    else:
+        analysis_tree = build_code_analysis_tree(clone_dir, cache=cache, blob_shas=blob_shas)
     print("Repository analysis complete.")
+    if cache is not None:
+        print(f"Analysis cache: {cache.stats()}")
     return analysis_tree
 
 
 # --------------------------------------------
 # LANGUAGE-SPECIFIC ANALYZERS
 # --------------------------------------------
+def _unparsed_analysis(file_path, language_name, source):
+    """Binary files are dropped; files above SOURCE_MAX_BYTES keep only their size and line count."""
+    if source["binary"]:
+        print(f"[!] Skipping binary file {file_path}")
+        return None
+    return {
+        "language": language_name,
+        "lines_of_code": source["lines"],
+        "size_bytes": source["size"],
+        "skipped": "too_large",
+        "uml_target": False
+    }
+
+
 def analyze_python_code(file_path):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            source = f.read()
-        tree = ast.parse(source)
-
-        class_count = sum(isinstance(n, ast.ClassDef) for n in ast.walk(tree))
-        func_count = sum(isinstance(n, ast.FunctionDef) for n in ast.walk(tree))
-        import_stmts = [n.names[0].name for n in ast.walk(tree) if isinstance(n, ast.Import)]
-        import_stmts += [n.module for n in ast.walk(tree) if isinstance(n, ast.ImportFrom)]
-        has_docstrings = ast.get_docstring(tree) is not None
-        lines_of_code = len(source.splitlines())
+        source = read_source(file_path)
+        if source["binary"] or source["truncated"]:
+            return _unparsed_analysis(file_path, "python", source)
+        tree = ast.parse(source["text"])
+        symbols = extract_python_symbols(tree)
 
         return {
             "language": "python",
-            "lines_of_code": lines_of_code,
-            "classes_count": class_count,
-            "functions_count": func_count,
-            "imports": import_stmts,
-            "has_docstrings": has_docstrings,
-            "uml_target": class_count > 0
+            "lines_of_code": source["lines"],
+            **symbols,
+            "uml_target": symbols["classes_count"] > 0
         }
     except Exception as e:
         print(f"[!] Error analyzing Python file {file_path}: {e}")
@@ -82,15 +114,17 @@ def analyze_python_code(file_path):
 
 def analyze_js_code(file_path):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            source = f.read()
+        info = read_source(file_path)
+        if info["binary"] or info["truncated"]:
+            return _unparsed_analysis(file_path, "javascript", info)
+        source = info["text"]
 
         class_count = len(re.findall(r'\bclass\s+\w+', source))
         func_count = len(re.findall(r'\bfunction\b|\b=>\s*\(', source))
         import_stmts = re.findall(r'\bimport\s.+?from\s+[\'"].+?[\'"]', source)
         import_stmts += re.findall(r'\brequire\s*\(\s*[\'"].+?[\'"]\s*\)', source)
         has_docstrings = '/**' in source or '/*' in source
-        lines_of_code = len(source.splitlines())
+        lines_of_code = info["lines"]
 
         return {
             "language": "javascript",
@@ -99,6 +133,7 @@ def analyze_js_code(file_path):
             "functions_count": func_count,
             "imports": import_stmts,
             "has_docstrings": has_docstrings,
+            "symbols": extract_js_symbols(source),
             "uml_target": class_count > 0
         }
     except Exception as e:
@@ -106,17 +141,59 @@ def analyze_js_code(file_path):
         return None
 
 
+def extract_js_symbols(source):
+    """Class names and `extends` bases; enough for inheritance edges."""
+    classes = [
+        {"name": name, "bases": [base] if base else [], "methods": [], "fields": []}
+        for name, base in JS_CLASS_PATTERN.findall(source)
+    ]
+    return {"classes": classes, "functions": []}
+
+
+def _java_type_name(java_type):
+    return getattr(java_type, "name", None) if java_type is not None else None
+
+
+def extract_java_symbols(tree):
+    """Classes, interfaces and enums with bases, typed fields and method signatures."""
+    import javalang
+    classes = []
+    for _, node in tree.filter(javalang.tree.TypeDeclaration):
+        extends = getattr(node, "extends", None) or []
+        if not isinstance(extends, list):  # classes extend one type, interfaces a list
+            extends = [extends]
+        bases = [_java_type_name(t) for t in extends + list(getattr(node, "implements", None) or [])]
+        fields = [
+            {"name": declarator.name, "type": _java_type_name(field.type)}
+            for field in node.fields
+            for declarator in field.declarators
+        ]
+        methods = [{"name": m.name, "args": [p.name for p in m.parameters]} for m in node.methods]
+        classes.append({
+            "name": node.name,
+            "kind": type(node).__name__.replace("Declaration", "").lower(),
+            "bases": [b for b in bases if b],
+            "methods": methods,
+            "fields": fields,
+        })
+    return {"classes": classes, "functions": []}
+
+
 def analyze_java_code(file_path):
+    import javalang  # parsers are imported on first use to keep server startup fast
+
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            source = f.read()
+        info = read_source(file_path)
+        if info["binary"] or info["truncated"]:
+            return _unparsed_analysis(file_path, "java", info)
+        source = info["text"]
         tree = javalang.parse.parse(source)
 
         class_count = len([node for _, node in tree.filter(javalang.tree.ClassDeclaration)])
         method_count = len([node for _, node in tree.filter(javalang.tree.MethodDeclaration)])
         import_stmts = [imp.path for imp in tree.imports]
         has_docstrings = '/**' in source or '/*' in source
-        lines_of_code = len(source.splitlines())
+        lines_of_code = info["lines"]
 
         return {
             "language": "java",
@@ -125,6 +202,7 @@ def analyze_java_code(file_path):
             "functions_count": method_count,
             "imports": import_stmts,
             "has_docstrings": has_docstrings,
+            "symbols": extract_java_symbols(tree),
             "uml_target": class_count > 0
         }
     except Exception as e:
@@ -133,25 +211,20 @@ def analyze_java_code(file_path):
 
 
 def analyze_tree_sitter_code(file_path, language_name):
+    from tree_sitter_languages import get_parser
+
     try:
         parser = get_parser(language_name)
-        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-            source = f.read()
-        tree = parser.parse(source.encode())
-        root = tree.root_node
-
-        def walk_tree(node):
-            return {
-                "type": node.type,
-                "start": node.start_point,
-                "end": node.end_point,
-                "children": [walk_tree(c) for c in node.children if c.is_named]
-            }
+        source = read_source(file_path, errors="replace")
+        if source["binary"] or source["truncated"]:
+            return _unparsed_analysis(file_path, language_name, source)
+        tree = parser.parse(source["text"].encode())
 
+        # Array-backed AST; use compact_ast.expand_compact_ast() for the nested form
         return {
             "language": language_name,
-            "lines_of_code": len(source.splitlines()),
-            "ast": walk_tree(root)
+            "lines_of_code": source["lines"],
+            "ast": compact_ast_from_node(tree.root_node)
         }
     except Exception as e:
         print(f"[!] Error analyzing file {file_path}: {e}")
@@ -159,51 +232,174 @@ def analyze_tree_sitter_code(file_path, language_name):
 
 
 # --------------------------------------------
-# DIRECTORY WALKER
+# FILE DISPATCH
 # --------------------------------------------
-def build_code_analysis_tree(path, root_path=None, depth=0):
-    if root_path is None:
-        root_path = path
+register_analyzer(["py"], "python", analyze_python_code)
+register_analyzer(["js"], "javascript", analyze_js_code)
+register_analyzer(["java"], "java", analyze_java_code)
+for _ext, _language_name in LANGUAGE_EXT_MAP.items():
+    register_analyzer([_ext], _language_name, partial(analyze_tree_sitter_code, language_name=_language_name))
 
-    name = os.path.basename(path)
-    rel_path = os.path.relpath(path, root_path).replace("\\", "/")
 
-    # Directory
-    if os.path.isdir(path):
-        if name in EXCLUDE_FOLDERS:
-            return None
+def get_file_language(ext):
+    """Returns the analyzer language for a file extension, or None if unsupported."""
+    return ANALYZERS.get(ext, (None, None))[0]
+
+
+def run_analyzer(path, language_name):
+    _, analyzer = get_analyzer(path)
+    return analyzer(path) if analyzer else None
 
-        node = {"name": name, "path": rel_path, "type": "folder", "depth": depth, "children": []}
 
+def analyze_file_cached(path, rel_path, language_name, cache, blob_shas=None):
+    """Serves an analysis from the cache when the file content was seen before."""
+    blob_sha = (blob_shas or {}).get(rel_path)
+    if blob_sha is None:
         try:
-            for item in sorted(os.listdir(path)):
-                full_path = os.path.join(path, item)
-                child = build_code_analysis_tree(full_path, root_path, depth + 1)
-                if child:
-                    node["children"].append(child)
-        except Exception as e:
-            print(f"[!] Error reading directory {path}: {e}")
+            with open(path, "rb") as f:
+                blob_sha = git_blob_sha(f.read())
+        except OSError as e:
+            print(f"[!] Error reading file {path}: {e}")
+            return None
 
-        return node
+    key = cache.make_key(blob_sha, ANALYZER_VERSION, language_name)
+    found, analysis = cache.get(key)
+    if not found:
+        analysis = run_analyzer(path, language_name)
+        cache.put(key, analysis)
+    return analysis
 
-    # File
-    else:
-        _, ext = os.path.splitext(name)
-        ext = ext.lstrip(".").lower()
-
-        if ext == "py":
-            analysis = analyze_python_code(path)
-        elif ext == "js":
-            analysis = analyze_js_code(path)
-        elif ext == "java":
-            analysis = analyze_java_code(path)
+
+# --------------------------------------------
+# DIRECTORY WALKER
+# --------------------------------------------
+def _file_analyzer(cache=None, blob_shas=None, previous=None):
+    """analyze(path, rel_path, language) going through the cache and the previous run, or None for plain analyzers."""
+    analyze = None
+    if cache is not None:
+        analyze = partial(analyze_file_cached, cache=cache, blob_shas=blob_shas)
+    if previous:
+        fallback = analyze or (lambda path, rel_path, language_name: run_analyzer(path, language_name))
+
+        def analyze(path, rel_path, language_name):
+            # Unchanged files keep the analysis of the previous run (see incremental.py)
+            if rel_path in previous:
+                return previous[rel_path]
+            return fallback(path, rel_path, language_name)
+    return analyze
+
+
+def _analysis_file_record(cache=None, blob_shas=None, previous=None):
+    return analysis_file_record(_file_analyzer(cache, blob_shas, previous))
+
+
+def build_code_analysis_tree(path, cache=None, blob_shas=None, previous=None, emit=None):
+    """
+    Folder/file tree of every analysable file under path (see repo_walker.walk_repo).
+    previous maps relative paths to analyses that are known to be current.
+    With emit, the files are listed first and a "file_analyzed" event with
+    done/total follows each one (see progress.py).
+    """
+    if emit is None:
+        return build_tree(path, _analysis_file_record(cache, blob_shas, previous))
+
+    analyze = _file_analyzer(cache, blob_shas, previous)
+    records, files = list_analysis_files(path)
+    results = {}
+    for done, (rel_path, language_name) in enumerate(files, start=1):
+        file_path = os.path.join(path, rel_path)
+        results[rel_path] = analyze(file_path, rel_path, language_name) if analyze else run_analyzer(file_path, language_name)
+        notify(emit, "file_analyzed", path=rel_path, done=done, total=len(files))
+    return assemble_analysis_tree(records, results)
+
+
+def iter_analysis_records(root_path, cache=None, blob_shas=None):
+    """
+    Streaming form of build_code_analysis_tree: yields the same nodes in the
+    same pre-order, without "children", one at a time (see github_repo/saving.py),
+    so a writer can persist a repository of any size with flat memory.
+    """
+    return iter_repo_records(root_path, _analysis_file_record(cache, blob_shas))
+
+
+# --------------------------------------------
+# PARALLEL WALKER
+# --------------------------------------------
+def list_analysis_files(root_path):
+    """
+    Lists the repository once, pruning EXCLUDE_FOLDERS.
+    Returns (records, files): the tree's nodes in pre-order (file nodes still
+    without analysis) and the (rel_path, language) pairs to analyse.
+    """
+    records = []
+    files = []
+    for rel_path, depth, is_dir, entry in walk_repo(root_path):
+        if is_dir:
+            records.append(folder_record(root_path, rel_path, depth, entry))
+            continue
+        language_name, _ = get_analyzer(entry.name)
+        if language_name:
+            records.append({"name": entry.name, "path": rel_path, "type": "file", "depth": depth})
+            files.append((rel_path, language_name))
+    return records, files
+
+
+def _analyze_worker(task):
+    path, language_name = task
+    return run_analyzer(path, language_name)
+
+
+def assemble_analysis_tree(records, results):
+    """Rebuilds the nested folder/file tree produced by build_code_analysis_tree."""
+    builder = TreeBuilder()
+    for record in records:
+        if record["type"] == "file":
+            analysis = results.get(record["path"])
+            if not analysis:
+                continue
+            record = {**record, **analysis}
+        builder.add(record)
+    return builder.root
+
+
+def build_code_analysis_tree_parallel(root_path, workers=None, chunksize=ANALYSIS_CHUNKSIZE, cache=None, blob_shas=None):
+    """
+    Same output as build_code_analysis_tree, but the per-file analyzers run in a
+    ProcessPoolExecutor. Cache lookups stay in the parent; only misses are dispatched.
+    """
+    records, files = list_analysis_files(root_path)
+    results = {}
+    pending = []
+
+    for rel_path, language_name in files:
+        if cache is None:
+            pending.append((rel_path, language_name, None))
+            continue
+        blob_sha = (blob_shas or {}).get(rel_path)
+        if blob_sha is None:
+            try:
+                with open(os.path.join(root_path, rel_path), "rb") as f:
+                    blob_sha = git_blob_sha(f.read())
+            except OSError as e:
+                print(f"[!] Error reading file {rel_path}: {e}")
+                continue
+        key = cache.make_key(blob_sha, ANALYZER_VERSION, language_name)
+        found, analysis = cache.get(key)
+        if found:
+            results[rel_path] = analysis
         else:
-            language_name = LANGUAGE_EXT_MAP.get(ext)
-            if language_name:
-                analysis = analyze_tree_sitter_code(path, language_name)
-            else:
-                return None
-
-        if analysis:
-            return {"name": name, "path": rel_path, "type": "file", "depth": depth, **analysis}
-        return None
+            pending.append((rel_path, language_name, key))
+
+    if pending:
+        from concurrent.futures import ProcessPoolExecutor
+
+        tasks = [(os.path.join(root_path, rel_path), language_name) for rel_path, language_name, _ in pending]
+        with ProcessPoolExecutor(max_workers=workers or None) as pool:
+            analyses = pool.map(_analyze_worker, tasks, chunksize=max(1, chunksize))
+            for (rel_path, _, key), analysis in zip(pending, analyses):
+                results[rel_path] = analysis
+                if key is not None:
+                    cache.put(key, analysis)
+
+    print(f"Analyzed {len(files)} files ({len(pending)} parsed, {len(files) - len(pending)} from cache) with {workers or os.cpu_count()} workers.")
+    return assemble_analysis_tree(records, results)
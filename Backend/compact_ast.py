@@ -0,0 +1,108 @@
+import sys
+import zlib
+import base64
+from array import array
+
+# --------------------------------------------
+# Compact, array-backed tree-sitter AST
+# --------------------------------------------
+# Named nodes are stored in pre-order as parallel columns; node i's parent is
+# parent[i] (-1 for the root). Each column is an int32 array that is
+# zlib-compressed and base64-encoded for JSON transport.
+COMPACT_AST_FORMAT = "ts-compact-1"
+COLUMNS = ("type", "parent", "start_byte", "end_byte", "start_row", "start_col", "end_row", "end_col")
+
+
+def build_compact_ast(root):
+    """Flattens a tree-sitter node into parallel column arrays without recursion."""
+    types = []
+    type_ids = {}
+    columns = {name: array("i") for name in COLUMNS}
+
+    stack = [(root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(columns["type"])
+
+        type_id = type_ids.get(node.type)
+        if type_id is None:
+            type_id = type_ids[node.type] = len(types)
+            types.append(node.type)
+
+        columns["type"].append(type_id)
+        columns["parent"].append(parent)
+        columns["start_byte"].append(node.start_byte)
+        columns["end_byte"].append(node.end_byte)
+        columns["start_row"].append(node.start_point[0])
+        columns["start_col"].append(node.start_point[1])
+        columns["end_row"].append(node.end_point[0])
+        columns["end_col"].append(node.end_point[1])
+
+        named = [c for c in node.children if c.is_named]
+        for child in reversed(named):
+            stack.append((child, index))
+
+    return types, columns
+
+
+def _encode_column(column):
+    if sys.byteorder != "little":
+        column = array("i", column)
+        column.byteswap()
+    return base64.b64encode(zlib.compress(column.tobytes(), 6)).decode("ascii")
+
+
+def _decode_column(data):
+    column = array("i")
+    column.frombytes(zlib.decompress(base64.b64decode(data)))
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+def serialize_compact_ast(types, columns):
+    """Returns the JSON-safe form embedded in the analysis tree under "ast"."""
+    return {
+        "format": COMPACT_AST_FORMAT,
+        "count": len(columns["type"]),
+        "types": types,
+        "columns": {name: _encode_column(columns[name]) for name in COLUMNS},
+    }
+
+
+def compact_ast_from_node(root):
+    return serialize_compact_ast(*build_compact_ast(root))
+
+
+def decode_compact_ast(compact):
+    """Returns (types, columns) with columns decoded back into int arrays."""
+    if compact.get("format") != COMPACT_AST_FORMAT:
+        raise ValueError(f"Unsupported AST format: {compact.get('format')}")
+    columns = {name: _decode_column(compact["columns"][name]) for name in COLUMNS}
+    return compact["types"], columns
+
+
+def expand_compact_ast(compact):
+    """
+    Rebuilds the legacy nested-dict AST ({type, start, end, children}) on demand.
+    Relies on pre-order storage: a parent always precedes its children.
+    """
+    types, columns = decode_compact_ast(compact)
+    nodes = []
+    root = None
+
+    for i in range(len(columns["type"])):
+        node = {
+            "type": types[columns["type"][i]],
+            "start": [columns["start_row"][i], columns["start_col"][i]],
+            "end": [columns["end_row"][i], columns["end_col"][i]],
+            "children": [],
+        }
+        nodes.append(node)
+        parent = columns["parent"][i]
+        if parent < 0:
+            root = node
+        else:
+            nodes[parent]["children"].append(node)
+
+    return root
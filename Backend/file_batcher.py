@@ -0,0 +1,71 @@
+import os
+import asyncio
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Tiny files (__init__.py, settings modules, short utilities) cost a whole
+# round trip each although their code is a few dozen tokens. They are grouped
+# into one request of up to BATCH_TOKEN_BUDGET tokens that asks for a JSON
+# object keyed by file path. Files the answer leaves out (or gets wrong) are
+# re-sent in smaller batches; a file that fails on its own takes the regular
+# single-file path.
+BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", "6000"))
+# Files up to this many tokens of code are batched; 0 disables batching
+SMALL_FILE_TOKENS = int(os.getenv("SMALL_FILE_TOKENS", "400"))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "20"))
+
+
+# ------------------------------------------------------------------
+# Planning
+# ------------------------------------------------------------------
+def plan_batches(items, cost, budget=BATCH_TOKEN_BUDGET, max_items=MAX_BATCH_FILES):
+    """Groups items in order into batches whose summed cost(item) stays within budget."""
+    batches = []
+    current, used = [], 0
+    for item in items:
+        item_cost = cost(item)
+        if current and (used + item_cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += item_cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ------------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------------
+async def run_batch(items, request, apply, fallback, key):
+    """
+    Sends items as one request and hands every keyed result to apply(item, result).
+      request(items) -> {key: result}; keys it leaves out count as failed
+      fallback(item) handles an item that failed in a batch of one
+    Failed items of a larger batch are split in two and retried.
+    """
+    try:
+        results = await request(items)
+    except Exception as e:
+        print(f"[!] Batch of {len(items)} files failed: {e}")
+        results = {}
+
+    missing = []
+    for item in items:
+        if key(item) in results:
+            apply(item, results[key(item)])
+        else:
+            missing.append(item)
+    if not missing:
+        return
+    if len(items) == 1:
+        await fallback(items[0])
+        return
+
+    print(f"[!] {len(missing)} of {len(items)} files missing from a batch answer; retrying them")
+    middle = len(missing) // 2
+    await asyncio.gather(*(
+        run_batch(half, request, apply, fallback, key) if len(half) > 1 else fallback(half[0])
+        for half in (missing[:middle], missing[middle:]) if half
+    ))
@@ -0,0 +1,155 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import posixpath
+import subprocess
+
+from mirror_store import normalize_repo_url
+from clone_utils import ANALYZER_VERSION
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# After every map-reduce run the annotated tree (analysis + "doc_summary" on
+# every node) and the project markdown are kept per repository and commit.
+# An incremental run diffs the previous commit against the new one and only
+# re-analyses / re-summarises changed files and the folders above them;
+# everything else is copied from the previous run.
+DOC_STATE_DIR = os.getenv("DOC_STATE_DIR", r"P:\AI_Documentation\example\doc_state")
+# Runs kept per repository
+DOC_STATE_KEEP = int(os.getenv("DOC_STATE_KEEP", "5"))
+# Bump when prompts change so stored summaries are not reused
+DOC_STATE_VERSION = "2"
+LATEST_MARKER = "LATEST"
+
+# Per-node keys that are not analysis output
+_NODE_KEYS = {"name", "path", "type", "depth", "children", "doc_summary", "doc_partial"}
+
+
+# ------------------------------------------------------------------
+# Stored Runs
+# ------------------------------------------------------------------
+def _state_dir(git_url: str) -> str:
+    key = normalize_repo_url(git_url)
+    readable = re.sub(r"[^a-z0-9]+", "_", key).strip("_")[:60]
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    return os.path.join(DOC_STATE_DIR, f"{readable}-{digest}")
+
+
+def save_run_state(git_url: str, commit: str, tree: dict, markdown: str):
+    """Stores the annotated tree and markdown of a finished run as <commit>.json.gz."""
+    state_dir = _state_dir(git_url)
+    os.makedirs(state_dir, exist_ok=True)
+    state = {
+        "version": DOC_STATE_VERSION,
+        "analyzer_version": ANALYZER_VERSION,
+        "commit": commit,
+        "tree": tree,
+        "markdown": markdown,
+    }
+    path = os.path.join(state_dir, f"{commit}.json.gz")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    with open(os.path.join(state_dir, LATEST_MARKER), "w") as f:
+        f.write(commit)
+
+    # Keep the newest DOC_STATE_KEEP runs
+    runs = sorted(
+        (entry for entry in os.scandir(state_dir) if entry.name.endswith(".json.gz")),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in runs[DOC_STATE_KEEP:]:
+        os.remove(entry.path)
+
+
+def load_run_state(git_url: str, commit: str = None):
+    """Returns the stored run for commit (default: the latest run), or None."""
+    state_dir = _state_dir(git_url)
+    if commit is None:
+        try:
+            with open(os.path.join(state_dir, LATEST_MARKER)) as f:
+                commit = f.read().strip()
+        except OSError:
+            return None
+    path = os.path.join(state_dir, f"{commit}.json.gz")
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != DOC_STATE_VERSION or state.get("analyzer_version") != ANALYZER_VERSION:
+        return None
+    return state
+
+
+# ------------------------------------------------------------------
+# Change Detection
+# ------------------------------------------------------------------
+def changed_paths(repo_dir: str, base_commit: str, commit: str) -> set:
+    """
+    Paths added, modified or deleted between two commits (renames count as a
+    delete plus an add). Raises if base_commit is unknown to the checkout.
+    """
+    out = subprocess.run(
+        ["git", "-C", repo_dir, "diff", "--name-only", "--no-renames", "-z", base_commit, commit],
+        capture_output=True, check=True
+    ).stdout
+    return {path.decode("utf-8", "replace") for path in out.split(b"\0") if path}
+
+
+def _ancestors(path: str):
+    folder = posixpath.dirname(path)
+    while folder:
+        yield folder
+        folder = posixpath.dirname(folder)
+    yield "."
+
+
+def prepare_incremental(git_url: str, repo_dir: str, commit: str, base_commit: str = None):
+    """
+    Compares the checkout with a previous run (base_commit, default: the latest
+    stored run). Returns None when a full run is needed, otherwise
+      base_commit: commit of the previous run
+      changed:     changed file paths
+      analyses:    {path: analysis} of unchanged files
+      summaries:   {path: doc_summary} of unchanged files and of folders
+                   without changes below them
+      markdown:    previous project markdown (reusable when nothing changed)
+    """
+    state = load_run_state(git_url, base_commit)
+    if state is None:
+        print("[+] No reusable previous run; documenting the whole repository")
+        return None
+    try:
+        changed = changed_paths(repo_dir, state["commit"], commit)
+    except Exception as e:
+        print(f"[!] Could not diff against {state['commit'][:12]}: {e}")
+        return None
+
+    dirty = set(changed)
+    for path in changed:
+        dirty.update(_ancestors(path))
+
+    analyses, summaries = {}, {}
+    stack = [state["tree"]]
+    while stack:
+        node = stack.pop()
+        stack.extend(node.get("children", []))
+        if node["path"] in dirty:
+            continue
+        if node["type"] == "file":
+            analyses[node["path"]] = {k: v for k, v in node.items() if k not in _NODE_KEYS}
+        if node.get("doc_summary") and not node.get("doc_partial"):
+            summaries[node["path"]] = node["doc_summary"]
+
+    print(f"[+] Incremental run against {state['commit'][:12]}: {len(changed)} changed path(s)")
+    return {
+        "base_commit": state["commit"],
+        "changed": changed,
+        "analyses": analyses,
+        "summaries": summaries,
+        "markdown": state["markdown"],
+    }
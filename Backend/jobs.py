@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from progress import ProgressLog
+
+# ----------------------------------------------------
+# Global Configurations
+# ----------------------------------------------------
+JOBS_DIR = os.getenv("JOBS_DIR", r"P:\AI_Documentation\example\jobs")
+# Each job runs in its own workspace (see workspaces.py), so jobs can run side by side.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Progress logs of finished jobs are dropped this long after their last reader left;
+# the job's result then stays on disk only and is read back on request
+JOB_LOG_TTL_SECONDS = float(os.getenv("JOB_LOG_TTL_SECONDS", "600"))
+# Finished job records (memory and JOBS_DIR) are kept this long, and at most JOB_MAX_RECORDS
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_MAX_RECORDS = int(os.getenv("JOB_MAX_RECORDS", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ----------------------------------------------------
+# Job Manager
+# ----------------------------------------------------
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded thread pool.
+    Every state change is written to JOBS_DIR/<id>.json, so after a restart
+    finished jobs stay queryable and unfinished ones are queued again.
+    Finished jobs are pruned (see prune()) so memory and JOBS_DIR stay bounded.
+    """
+
+    def __init__(self, runner, jobs_dir: str = JOBS_DIR, workers: int = JOB_WORKERS,
+                 log_ttl: float = JOB_LOG_TTL_SECONDS, retention: float = JOB_RETENTION_SECONDS,
+                 max_records: int = JOB_MAX_RECORDS):
+        self.runner = runner
+        self.jobs_dir = jobs_dir
+        self.log_ttl = log_ttl
+        self.retention = retention
+        self.max_records = max_records
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._jobs = {}
+        self._futures = {}
+        self._cancel_requested = set()
+        self._progress = {}
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    # ---------------- persistence ----------------
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        path = self._job_path(job["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _load(self, job_id):
+        try:
+            with open(self._job_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _delete(self, job_id):
+        try:
+            os.remove(self._job_path(job_id))
+        except OSError:
+            pass
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            self._save(job)
+            return dict(job)
+
+    def resume(self):
+        """
+        Loads persisted jobs and re-queues the ones a restart interrupted. Only
+        the newest max_records files within the retention period are read; the
+        rest are deleted. Results of finished jobs stay on disk until requested.
+        """
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.jobs_dir):
+            if entry.name.endswith(".json"):
+                files.append((entry.stat().st_mtime, entry.path))
+        files.sort(reverse=True)
+        for index, (modified, path) in enumerate(files):
+            if index >= self.max_records or now - modified > self.retention:
+                os.remove(path)
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[!] Skipping unreadable job file {os.path.basename(path)}: {e}")
+                continue
+            if job["status"] in FINISHED_STATES:
+                # Their progress log is rebuilt on demand (see progress())
+                job.pop("result", None)
+            else:
+                self._progress[job["id"]] = ProgressLog()
+            self._jobs[job["id"]] = job
+
+        interrupted = [j for j in self._jobs.values() if j["status"] not in FINISHED_STATES]
+        for job in sorted(interrupted, key=lambda j: j["created_at"]):
+            print(f"[+] Resuming interrupted job {job['id']}")
+            self._update(job["id"], status=QUEUED, stage=None)
+            self._progress[job["id"]].emit("job_queued", job_id=job["id"], resumed=True)
+            self._schedule(job["id"])
+
+    def prune(self, now: float = None) -> list:
+        """
+        Bounds what finished jobs keep around:
+          - progress logs closed and unread for log_ttl are dropped, and the
+            job's result is then only kept in its job file
+          - records finished longer than `retention` ago, and the oldest ones
+            beyond max_records, are deleted (memory and JOBS_DIR)
+        Returns the ids of deleted jobs.
+        """
+        now = now or time.time()
+        with self._lock:
+            for job_id, log in list(self._progress.items()):
+                job = self._jobs.get(job_id)
+                if job is not None and job["status"] in FINISHED_STATES and log.expired(self.log_ttl, now):
+                    del self._progress[job_id]
+                    job.pop("result", None)
+
+            finished = sorted(
+                (j for j in self._jobs.values() if j["status"] in FINISHED_STATES and j["id"] not in self._progress),
+                key=lambda j: j["finished_at"] or j["created_at"],
+            )
+            excess = len(self._jobs) - self.max_records
+            removed = []
+            for job in finished:
+                if excess <= 0 and now - (job["finished_at"] or job["created_at"]) <= self.retention:
+                    break
+                del self._jobs[job["id"]]
+                removed.append(job["id"])
+                excess -= 1
+
+        for job_id in removed:
+            self._delete(job_id)
+        return removed
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- public API ----------------
+    def submit(self, git_url: str, ref: str = None, incremental: bool = None, base_commit: str = None,
+               refresh: bool = False) -> dict:
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "git_url": git_url,
+            "ref": ref,
+            "incremental": incremental,
+            "base_commit": base_commit,
+            "refresh": refresh,
+            "status": QUEUED,
+            "stage": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "result": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._progress[job_id] = ProgressLog()
+            self._save(job)
+        self._progress[job_id].emit("job_queued", job_id=job_id)
+        self._schedule(job_id)
+        self.prune()
+        return self.status(job_id)
+
+    def status(self, job_id: str):
+        """Returns the job without its (potentially large) result, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != "result"}
+
+    def result(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if "result" not in job:
+            # Pruned from memory; the job file still has it
+            job["result"] = self._load(job_id).get("result")
+        return job
+
+    def progress(self, job_id: str):
+        """Returns the job's ProgressLog, or None for unknown jobs."""
+        with self._lock:
+            log = self._progress.get(job_id)
+            job = self._jobs.get(job_id)
+            if log is None and job is not None:
+                # A finished job whose log was pruned only replays its final state
+                log = self._progress[job_id] = ProgressLog()
+                log.emit("job_finished", job_id=job_id, status=job["status"], error=job["error"])
+                log.close()
+            return log
+
+    def cancel(self, job_id: str):
+        """
+        Cancels a queued job immediately; a running job stops at its next stage boundary.
+        Returns the updated status, or None for unknown jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in FINISHED_STATES:
+                return {k: v for k, v in job.items() if k != "result"}
+            self._cancel_requested.add(job_id)
+            future = self._futures.get(job_id)
+
+        if future is not None and future.cancel():
+            self._finish(job_id, CANCELLED)
+        return self.status(job_id)
+
+    # ---------------- execution ----------------
+    def _schedule(self, job_id):
+        future = self._executor.submit(self._run, job_id)
+        with self._lock:
+            self._futures[job_id] = future
+
+    def _finish(self, job_id, status, error=None, result=None):
+        self._update(job_id, status=status, error=error, result=result, finished_at=time.time())
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+            log = self._progress[job_id]
+        log.emit("job_finished", job_id=job_id, status=status, error=error)
+        log.close()
+        self.prune()
+
+    def _run(self, job_id):
+        if job_id in self._cancel_requested:
+            self._finish(job_id, CANCELLED)
+            return
+
+        job = self._update(job_id, status=RUNNING, started_at=time.time())
+        log = self._progress[job_id]
+        log.emit("job_started", job_id=job_id)
+
+        def on_stage(stage):
+            if job_id in self._cancel_requested:
+                raise JobCancelled(f"Cancelled before stage '{stage}'")
+            self._update(job_id, stage=stage)
+            log.emit("stage_started", stage=stage)
+
+        try:
+            result = self.runner(
+                job["git_url"], job["ref"], on_stage=on_stage, emit=log.emit, job_id=job_id,
+                incremental=job.get("incremental"), base_commit=job.get("base_commit"),
+                refresh=job.get("refresh", False)
+            )
+        except JobCancelled:
+            print(f"[-] Job {job_id} cancelled")
+            self._finish(job_id, CANCELLED)
+        except Exception as e:
+            print(f"[!] Job {job_id} failed: {e}")
+            self._finish(job_id, FAILED, error=str(e))
+        else:
+            print(f"[✔] Job {job_id} finished")
+            self._finish(job_id, SUCCEEDED, result=result)
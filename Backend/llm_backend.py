@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# "gemini" talks to Google; "fake" is a deterministic local stand-in for
+# load tests and benchmarks (no network, no quota).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.05"))
+FAKE_LLM_TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "400"))
+FAKE_LLM_OUTPUT_TOKENS = int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "120"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+# Batch prompts list the keys their JSON answer must have (see file_batcher.py)
+_JSON_KEYS = re.compile(r"^JSON keys: (\[.*\])$", re.M)
+
+
+# ------------------------------------------------------------------
+# Gemini
+# ------------------------------------------------------------------
+class GeminiModel:
+    """
+    genai.GenerativeModel with deferred setup: the SDK is imported and the
+    API key checked on the first request instead of at import time.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                from dotenv import load_dotenv
+
+                load_dotenv()
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not set in .env")
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate_content(self, prompt, **kwargs):
+        return self._client().generate_content(prompt, **kwargs)
+
+
+# ------------------------------------------------------------------
+# Deterministic Fake
+# ------------------------------------------------------------------
+class FakeRateLimitError(Exception):
+    """Looks like a Gemini 429 to llm_engine.is_rate_limit_error."""
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Stand-in for genai.GenerativeModel. The same prompt always yields the same
+    text; latency is `latency + output_tokens / tokens_per_sec`, and a seeded
+    fraction `error_rate` of calls fail with a 429.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, latency: float = FAKE_LLM_LATENCY,
+                 tokens_per_sec: float = FAKE_LLM_TOKENS_PER_SEC, output_tokens: int = FAKE_LLM_OUTPUT_TOKENS,
+                 error_rate: float = FAKE_LLM_ERROR_RATE, seed: int = FAKE_LLM_SEED):
+        self.model_name = f"fake/{model_name}"
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _respond(self, prompt, json_mode=False):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if "PlantUML" in prompt and not json_mode:
+            return f"@startuml\nstart\n:Step {digest[:8]};\n:Step {digest[8:16]};\nstop\n@enduml"
+        keys = _JSON_KEYS.search(prompt)
+        if keys:
+            return json.dumps({
+                key: {"summary": f"Fake summary {digest[:8]}", "analysis": f"Fake analysis {digest[8:16]}",
+                      "docstrings": {}}
+                for key in json.loads(keys.group(1))
+            })
+        if json_mode or "JSON" in prompt:
+            return '{"summary": "Fake summary %s", "analysis": "Fake analysis %s", "docstrings": {}}' % (
+                digest[:8], digest[8:16])
+        words = [digest[i:i + 6] for i in range(0, len(digest), 6)]
+        body = " ".join(words[i % len(words)] for i in range(self.output_tokens))
+        return f"## Generated [{digest[:12]}]\n\n{body}"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            fail = self._rng.random() < self.error_rate
+
+        time.sleep(self.latency)
+        if fail:
+            raise FakeRateLimitError("429 Resource has been exhausted (fake backend)")
+
+        config = kwargs.get("generation_config") or {}
+        text = self._respond(prompt, json_mode=config.get("response_mime_type") == "application/json")
+        per_token = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+        if not stream:
+            time.sleep(self.output_tokens * per_token)
+            return FakeResponse(text)
+        return self._stream(text, per_token)
+
+    def _stream(self, text, per_token, chunk_tokens=20):
+        words = text.split(" ")
+        for i in range(0, len(words), chunk_tokens):
+            time.sleep(chunk_tokens * per_token)
+            chunk = " ".join(words[i:i + chunk_tokens])
+            yield FakeResponse(chunk if i + chunk_tokens >= len(words) else chunk + " ")
+
+
+# ------------------------------------------------------------------
+# Factory
+# ------------------------------------------------------------------
+def get_model(model_name: str = DEFAULT_MODEL, backend: str = None):
+    """Returns a model object exposing generate_content() for the configured backend."""
+    backend = backend or os.getenv("LLM_BACKEND", LLM_BACKEND)
+    if backend == "fake":
+        return FakeModel(model_name)
+    if backend == "gemini":
+        return GeminiModel(model_name)
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", r"P:\AI_Documentation\example\cache\llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+_schema_ready = set()
+
+
+# ------------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------------
+def normalize_prompt(prompt: str) -> str:
+    """Ignores differences that do not change what the model sees: line endings and trailing blanks."""
+    lines = prompt.replace("\r\n", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(model_name: str, prompt: str, generation_config=None) -> str:
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "prompt": hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest(),
+            "params": generation_config or {},
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------------
+# SQLite Store
+# ------------------------------------------------------------------
+def _connect(path=None):
+    path = path or LLM_CACHE_PATH
+    if path not in _schema_ready:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if path not in _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+            " created REAL, last_access REAL, size INTEGER)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_access)")
+        conn.commit()
+        _schema_ready.add(path)
+    return conn
+
+
+def _count(stat, n=1):
+    with _stats_lock:
+        _stats[stat] += n
+
+
+def cache_get(key: str, ttl: float = LLM_CACHE_TTL_SECONDS):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT response, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created = row
+        if ttl and time.time() - created > ttl:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return response
+    finally:
+        conn.close()
+
+
+def cache_put(key: str, model_name: str, response: str, max_bytes: int = LLM_CACHE_MAX_BYTES):
+    now = time.time()
+    size = len(response.encode("utf-8"))
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, created, last_access, size)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model_name, response, now, now, size),
+        )
+        _count("stores")
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > max_bytes:
+            # Drop least-recently-used entries until the cache fits again
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= max_bytes:
+                    break
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (old_key,))
+                total -= old_size
+                _count("evictions")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+# ------------------------------------------------------------------
+# Cached Generation
+# ------------------------------------------------------------------
+def lookup_cached(model, prompt: str, generation_config=None, bypass: bool = LLM_CACHE_BYPASS, accept=None):
+    """
+    Returns the cached response for this call, or None on a miss (or when
+    bypassed). A cached response that accept(text) rejects counts as a miss.
+    """
+    if bypass:
+        _count("bypassed")
+        return None
+    cached = cache_get(make_cache_key(getattr(model, "model_name", str(model)), prompt, generation_config))
+    if cached is not None and accept is not None and not accept(cached):
+        cached = None
+    _count("hits" if cached is not None else "misses")
+    return cached
+
+
+def generate_and_store(model, prompt: str, generation_config=None, on_chunk=None, accept=None) -> str:
+    """
+    Calls the model unconditionally and stores a non-empty response, or with
+    accept set only a response for which accept(text) is true.
+    """
+    model_name = getattr(model, "model_name", str(model))
+    kwargs = {"generation_config": generation_config} if generation_config else {}
+    if on_chunk:
+        parts = []
+        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+            parts.append(chunk.text)
+            on_chunk(chunk.text)
+        text = "".join(parts).strip()
+    else:
+        text = model.generate_content(prompt, **kwargs).text.strip()
+
+    if text and (accept is None or accept(text)):
+        cache_put(make_cache_key(model_name, prompt, generation_config), model_name, text)
+    return text
+
+
+def generate_cached(model, prompt: str, generation_config=None, bypass: bool = LLM_CACHE_BYPASS, on_chunk=None,
+                    accept=None) -> str:
+    """
+    Drop-in replacement for model.generate_content(prompt).text.strip().
+    Responses are cached by model name, normalised prompt hash and generation
+    parameters. bypass skips the lookup but still refreshes the entry.
+    With on_chunk set, a miss is streamed chunk by chunk and a hit is
+    delivered as a single chunk. Failed calls raise and are never cached;
+    accept(text) can reject answers that are unusable (e.g. malformed JSON)
+    so they are neither stored nor served from the cache.
+    """
+    cached = lookup_cached(model, prompt, generation_config, bypass, accept)
+    if cached is not None:
+        if on_chunk:
+            on_chunk(cached)
+        return cached
+    return generate_and_store(model, prompt, generation_config, on_chunk, accept)
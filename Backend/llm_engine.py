@@ -0,0 +1,181 @@
+import os
+import time
+import random
+import asyncio
+from functools import partial
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import lookup_cached, generate_and_store
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# Output tokens reserved per request when charging the tokens-per-minute bucket
+OUTPUT_TOKEN_ALLOWANCE = int(os.getenv("OUTPUT_TOKEN_ALLOWANCE", "1024"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+# Extra engine threads for cache lookups, so they do not queue behind slow model calls
+LLM_LOOKUP_THREADS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate (~4 characters per token for code and English)."""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """True for HTTP 429 / quota errors, e.g. google.api_core ResourceExhausted."""
+    if getattr(exc, "code", None) == 429 or type(exc).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(exc).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+# ------------------------------------------------------------------
+# Token Bucket Limiter
+# ------------------------------------------------------------------
+class TokenBucket:
+    """Classic token bucket: `rate_per_minute` units refill continuously up to the same capacity."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = max(1.0, rate_per_minute)
+        self.refill_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets shared by all workers.
+    The state is guarded by a thread lock (never held while sleeping), so one
+    limiter can serve engines on different event loops and job threads.
+    """
+
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+
+    def cool_down(self, seconds: float):
+        """Pauses every worker after a 429 instead of letting them all retry at once."""
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int):
+        while True:
+            with self._lock:
+                wait = max(
+                    self._cooldown_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+            await asyncio.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM) -> RateLimiter:
+    """
+    Process-wide limiter for these limits. Every LLMEngine uses it by default,
+    so engines created per run, per chunked file or per batch pass together
+    stay within one RPM/TPM quota however many jobs run at once.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get((rpm, tpm))
+        if limiter is None:
+            limiter = _limiters[(rpm, tpm)] = RateLimiter(rpm, tpm)
+        return limiter
+
+
+# ------------------------------------------------------------------
+# Async Engine
+# ------------------------------------------------------------------
+class LLMEngine:
+    """
+    Runs many Gemini calls concurrently on top of the blocking SDK:
+    a semaphore bounds in-flight requests, the shared RateLimiter enforces
+    RPM/TPM, 429s back off exponentially (with jitter) and cache hits skip both.
+    Pass `limiter` to use a dedicated limiter instead of get_rate_limiter(rpm, tpm).
+    Blocking calls run on the engine's own thread pool (the loop's default
+    executor is capped at min(32, cpus + 4) threads), so `concurrency` calls
+    really are in flight together. Use it as a context manager, or call
+    close(), to release the threads.
+    """
+
+    def __init__(self, model, concurrency: int = LLM_CONCURRENCY, rpm: float = GEMINI_RPM,
+                 tpm: float = GEMINI_TPM, max_retries: int = LLM_MAX_RETRIES, base_delay: float = 2.0,
+                 max_delay: float = 60.0, limiter: RateLimiter = None):
+        self.model = model
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.limiter = limiter or get_rate_limiter(rpm, tpm)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, concurrency) + LLM_LOOKUP_THREADS, thread_name_prefix="llm"
+        )
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"requests": 0, "cache_hits": 0, "rate_limited": 0, "failures": 0}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _in_thread(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def generate(self, prompt: str, generation_config=None, accept=None) -> str:
+        """One cached, rate-limited call; accept() as in llm_cache.generate_cached."""
+        cached = await self._in_thread(lookup_cached, self.model, prompt, generation_config, accept=accept)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        cost = estimate_tokens(prompt) + OUTPUT_TOKEN_ALLOWANCE
+        attempt = 0
+        async with self.semaphore:
+            while True:
+                await self.limiter.acquire(cost)
+                self.stats["requests"] += 1
+                try:
+                    return await self._in_thread(
+                        generate_and_store, self.model, prompt, generation_config, accept=accept
+                    )
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                        self.stats["failures"] += 1
+                        raise
+                    self.stats["rate_limited"] += 1
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+                    attempt += 1
+                    print(f"[!] Rate limited, retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                    self.limiter.cool_down(delay)
@@ -1,13 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel, field_validator
 from typing import Optional
 import os
 
 from clone_utils import clone_and_analyze_repo
-from process_repo_full import process_repo_full
-from UML_diag import generate_uml_diagram_from_markdown
+from UML_diag import generate_uml_diagram_from_markdown, UML_OUTPUT_DIR
+from pipeline import run_full_pipeline, stored_details, load_stored_result, PIPELINE_VERSION
+from jobs import JobManager, SUCCEEDED, FINISHED_STATES
+from progress import format_sse
+from llm_cache import cache_stats
+from plantuml_renderer import HASHED_IMAGE_NAME
+from workspaces import get_workspace_manager
+from result_store import get_result_store, MARKDOWN, ANALYSIS, FILE_SUMMARY, DIAGRAM, DIAGRAM_IMAGE
+from mirror_store import resolve_remote_commit, normalize_repo_url, validate_git_url, validate_ref
+from analysis_views import (
+    AnalysisViewCache, parse_field_list, project_tree, page_files, choose_encoding, stream_json
+)
+
+# ----------------------------------------------------
+# Background Jobs
+# ----------------------------------------------------
+job_manager = JobManager(run_full_pipeline)
+workspace_manager = get_workspace_manager()
+# Recent /clone_and_analyze trees, so paging through one repo@commit analyses it once
+analysis_view_cache = AnalysisViewCache()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Leftovers of runs interrupted by a restart are collected on the first GC pass
+    workspace_manager.start_gc()
+    job_manager.resume()
+    yield
+    job_manager.shutdown()
+    workspace_manager.stop_gc()
+
 
 # ----------------------------------------------------
 # Initialize FastAPI App
@@ -19,6 +50,7 @@ app = FastAPI(
         "UML generation, and complete project overview."
     ),
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # ----------------------------------------------------
@@ -35,15 +67,42 @@ app.add_middleware(
 # ----------------------------------------------------
 # Serve UML PNGs statically
 # ----------------------------------------------------
-uml_output_dir = os.path.abspath(r"P:\AI_Documentation\example\uml")
+class UMLStaticFiles(StaticFiles):
+    """Rendered images are named by content hash, so browsers may cache them forever."""
+
+    def file_response(self, full_path, *args, **kwargs):
+        response = super().file_response(full_path, *args, **kwargs)
+        if HASHED_IMAGE_NAME.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+uml_output_dir = os.path.abspath(UML_OUTPUT_DIR)
 os.makedirs(uml_output_dir, exist_ok=True)
-app.mount("/uml", StaticFiles(directory=uml_output_dir), name="uml")
+app.mount("/uml", UMLStaticFiles(directory=uml_output_dir), name="uml")
 
 # ----------------------------------------------------
 # Request Models
 # ----------------------------------------------------
 class RepoRequest(BaseModel):
     git_url: str
+    ref: Optional[str] = None
+    # Re-document only files changed since base_commit (default: the last run of this repo)
+    incremental: Optional[bool] = None
+    base_commit: Optional[str] = None
+    # Regenerate even when documentation for this commit is already stored
+    refresh: Optional[bool] = False
+
+    # Everything below reaches git; unsafe values are rejected with 422
+    @field_validator("git_url")
+    @classmethod
+    def _check_git_url(cls, value):
+        return validate_git_url(value)
+
+    @field_validator("ref", "base_commit")
+    @classmethod
+    def _check_ref(cls, value):
+        return validate_ref(value)
 
 
 class UMLRequest(BaseModel):
@@ -65,24 +124,77 @@ def home():
             "Clone and analyze repositories",
             "Generate Gemini-based documentation",
             "Create UML diagrams",
-            "Build unified project overview"
+            "Build unified project overview",
+            "Asynchronous pipeline jobs"
         ],
     }
 
 
+@app.get("/healthz")
+def healthz():
+    """
+    Readiness probe. Answers without loading the parsers, GitPython or the
+    LLM client, which are all imported on first use.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/llm_cache/stats")
+def llm_cache_stats():
+    """Hit/miss counters of the shared Gemini response cache."""
+    return cache_stats()
+
+
+def _analysis_tree(req: RepoRequest):
+    commit = resolve_remote_commit(req.git_url, req.ref)
+    key = (normalize_repo_url(req.git_url), commit)
+    tree = analysis_view_cache.get(key) if commit else None
+    if tree is not None:
+        return tree
+
+    workspace = workspace_manager.create()
+    try:
+        # Check out the resolved commit so the cached tree matches its key
+        tree = clone_and_analyze_repo(req.git_url, clone_dir=workspace.clone_dir, ref=commit or req.ref)
+    finally:
+        # The analysis is returned inline; the checkout is not needed afterwards
+        workspace_manager.discard(workspace)
+    if commit:
+        analysis_view_cache.put(key, tree)
+    return tree
+
+
 @app.post("/clone_and_analyze")
-def clone_and_analyze(req: RepoRequest):
-    """Clone a GitHub repo and perform initial analysis."""
+def clone_and_analyze(req: RepoRequest, request: Request, fields: Optional[str] = None,
+                      exclude: Optional[str] = None, max_depth: Optional[int] = None,
+                      offset: int = 0, limit: Optional[int] = None):
+    """
+    Clone a GitHub repo and perform initial analysis.
+    Query options: fields / exclude pick file fields (e.g. exclude=ast),
+    max_depth cuts the tree below that folder depth, and limit (+ offset)
+    returns one page of the flat file list instead of the tree. The body is
+    streamed and compressed with br or gzip when the client accepts it.
+    """
     try:
-        result = clone_and_analyze_repo(req.git_url)
-        return {
-            "status": "success",
-            "message": "Repository cloned and analyzed successfully",
-            "analysis": result
-        }
+        tree = _analysis_tree(req)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Clone/analysis failed: {str(e)}")
 
+    fields, exclude = parse_field_list(fields), parse_field_list(exclude)
+    body = {"status": "success", "message": "Repository cloned and analyzed successfully"}
+    if limit is not None:
+        body.update(page_files(tree, max(offset, 0), min(max(limit, 1), 1000), fields, exclude, max_depth))
+    elif fields or exclude or max_depth is not None:
+        body["analysis"] = project_tree(tree, fields, exclude, max_depth)
+    else:
+        body["analysis"] = tree
+
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(stream_json(body, encoding), media_type="application/json", headers=headers)
+
 
 @app.post("/generate_uml")
 def generate_uml(req: UMLRequest):
@@ -106,34 +218,152 @@ def generate_uml(req: UMLRequest):
 def process_repo(req: RepoRequest):
     """Run full pipeline: clone, analyze, generate docs, and create overview."""
     try:
-        # 1. Run the complete repository processing pipeline
-        result = process_repo_full(req.git_url)
-
-        # 2. Locate the generated markdown file
-        markdown_path = result.get("markdown_path") or r"P:\AI_Documentation\example\FULL_PROJECT_DOC.md"
-        if not os.path.exists(markdown_path):
-            raise HTTPException(status_code=500, detail="Markdown file not found after processing")
-
-        # 3. Read markdown content
-        with open(markdown_path, "r", encoding="utf-8") as f:
-            project_doc_text = f.read()
-
-        # 4. Generate UML diagram (optional)
-        uml_path = None
-        uml_puml_path = generate_uml_diagram_from_markdown()
-        if os.path.exists(uml_puml_path):
-            uml_filename = os.path.basename(uml_puml_path).replace(".puml", ".png")
-            uml_path = f"/uml/{uml_filename}"
-
-        # 5. Return results
+        details = run_full_pipeline(
+            req.git_url, req.ref, incremental=req.incremental, base_commit=req.base_commit, refresh=req.refresh
+        )
         return {
             "status": "success",
             "message": "Repository processed successfully",
-            "details": {
-                "project_doc_text": project_doc_text,
-                "uml_url": uml_path,
-                "other_info": result
-            }
+            "details": details
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Repository processing failed: {str(e)}")
+
+
+@app.post("/jobs", status_code=202)
+def submit_job(req: RepoRequest):
+    """Queue the full pipeline for a repository and return a job id immediately."""
+    job = job_manager.submit(
+        req.git_url, req.ref, incremental=req.incremental, base_commit=req.base_commit, refresh=req.refresh
+    )
+    return {"status": "accepted", "job_id": job["id"], "job": job}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Current status and stage of a pipeline job."""
+    job = job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """Result of a finished job, in the same shape as /process_repo."""
+    job = job_manager.result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] not in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job['status']}: {job['error'] or 'no result'}")
+    return {
+        "status": "success",
+        "message": "Repository processed successfully",
+        "details": job["result"]
+    }
+
+
+@app.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events stream of pipeline progress (clone, file analysis N/M,
+    streamed LLM text, UML generation). Reconnecting clients may send
+    Last-Event-ID to resume after the last event they saw.
+    """
+    log = job_manager.progress(job_id)
+    if log is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    last_event_id = request.headers.get("last-event-id")
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def events():
+        # Async, so an idle watcher holds no threadpool thread for the whole job
+        async for event in log.follow_async(start):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job (running jobs stop at the next stage)."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# ----------------------------------------------------
+# Stored Results
+# ----------------------------------------------------
+ARTIFACT_MEDIA_TYPES = {
+    MARKDOWN: "text/markdown; charset=utf-8",
+    ANALYSIS: "application/json",
+    FILE_SUMMARY: "text/plain; charset=utf-8",
+    DIAGRAM: "text/plain; charset=utf-8",
+    DIAGRAM_IMAGE: "image/png",
+}
+
+
+@app.get("/results")
+def list_results(git_url: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """Index of stored documentation runs, newest first (optionally for one repository)."""
+    return get_result_store().list_runs(git_url, limit=min(max(limit, 1), 500), offset=max(offset, 0))
+
+
+@app.get("/results/lookup")
+def lookup_result(git_url: str, commit: str, version: Optional[str] = None):
+    """Stored documentation for repo@commit (full SHA), in the same shape as /process_repo."""
+    details = load_stored_result(git_url, commit, version or PIPELINE_VERSION)
+    if details is None:
+        raise HTTPException(status_code=404, detail="No stored documentation for this commit")
+    return {"status": "success", "message": "Stored documentation", "details": details}
+
+
+@app.get("/results/{result_id}")
+def get_result(result_id: int):
+    """A stored run by id, with the list of its artifacts."""
+    store = get_result_store()
+    run = store.get(result_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return {
+        "status": "success",
+        "details": stored_details(run),
+        "artifacts": store.artifact_names(result_id),
+    }
+
+
+@app.get("/results/{result_id}/artifacts/{kind}/{name:path}")
+def get_result_artifact(result_id: int, kind: str, name: str):
+    """One stored artifact: markdown, analysis.json, a file summary (by path) or a diagram."""
+    data = get_result_store().artifact(result_id, kind, name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    media_type = ARTIFACT_MEDIA_TYPES.get(kind, "application/octet-stream")
+    if kind == DIAGRAM_IMAGE and name.endswith(".svg"):
+        media_type = "image/svg+xml"
+    return Response(content=data, media_type=media_type)
+
+
+@app.delete("/results")
+def purge_results(git_url: Optional[str] = None, commit: Optional[str] = None,
+                  older_than_days: Optional[float] = None, version: Optional[str] = None,
+                  purge_all: bool = Query(False, alias="all")):
+    """
+    Deletes stored runs matching all given filters. git_url and/or commit are
+    required; purging across all repositories needs an explicit all=true
+    (optionally narrowed by older_than_days / version).
+    """
+    if not (git_url or commit or purge_all):
+        raise HTTPException(status_code=400, detail="Pass git_url and/or commit, or all=true to purge every repository")
+    older_than = older_than_days * 86400 if older_than_days is not None else None
+    purged = get_result_store().purge(git_url, commit, older_than=older_than, version=version)
+    return {"status": "success", "purged": purged}
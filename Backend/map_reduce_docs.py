@@ -0,0 +1,217 @@
+import os
+import asyncio
+
+from llm_cache import generate_cached
+from llm_engine import LLMEngine, LLM_CONCURRENCY
+from progress import notify
+from prompt_packer import pack_source
+from chunker import needs_chunking, summarize_chunks, format_chunk_summaries
+from source_reader import read_source
+
+# ------------------------------------------------------------------
+# Hierarchical (map-reduce) project documentation
+# ------------------------------------------------------------------
+# map:    one short summary per analyzed file
+# reduce: one summary per folder, computed bottom-up from its children;
+#         sibling folders are reduced concurrently
+# final:  one project-level synthesis of the nine documentation sections
+#
+# Every call goes through llm_cache, and a folder prompt only contains its
+# children's summaries, so after a change only the files that changed and
+# their ancestor folders produce new prompts; everything else is a cache hit.
+# Files too large for one prompt are summarised chunk by chunk first (see
+# chunker.py), so the whole file is covered rather than its first lines.
+SOURCE_EXCERPT_CHARS = 2000
+# Upper bound read per file (bytes); prompt_packer decides how much of it is sent
+MAX_SOURCE_CHARS = 200000
+MAX_TOP_LEVEL_SUMMARIES = 40
+MAX_LISTED_FILES = 300
+
+PROJECT_DOC_SECTIONS = (
+    "1. Overview & Introduction\n2. System Architecture\n3. Functional Specification\n"
+    "4. Non-Functional Requirements\n5. Code Documentation\n6. Testing\n7. Deployment / Execution\n"
+    "8. User Guide\n9. Appendices\n"
+)
+
+
+# ------------------------------------------------------------------
+# Prompts
+# ------------------------------------------------------------------
+def _symbol_outline(node):
+    symbols = node.get("symbols") or {}
+    lines = []
+    for cls in symbols.get("classes", []):
+        bases = f"({', '.join(cls['bases'])})" if cls.get("bases") else ""
+        methods = ", ".join(m["name"] for m in cls.get("methods", []))
+        lines.append(f"class {cls['name']}{bases}: {methods}")
+    for func in symbols.get("functions", []):
+        lines.append(f"def {func['name']}({', '.join(func.get('args', []))})")
+    return "\n".join(lines)
+
+
+def build_file_prompt(node, source, chunk_summaries=None):
+    outline = _symbol_outline(node)
+    if chunk_summaries:
+        code = "Section summaries (the whole file, in order):\n" + format_chunk_summaries(chunk_summaries)
+    else:
+        code = f"Code:\n{pack_source(node, source)}"
+    return (
+        "You are a technical documentation assistant.\n"
+        "Summarise this source file in at most 150 words for a project-level document: "
+        "its purpose, key classes/functions and notable dependencies.\n\n"
+        f"Path: {node['path']}\n"
+        f"Language: {node.get('language', 'N/A')}\n"
+        f"Lines: {node.get('lines_of_code', 'N/A')}\n"
+        f"Classes: {node.get('classes_count', 'N/A')}\n"
+        f"Functions: {node.get('functions_count', 'N/A')}\n"
+        f"Imports: {node.get('imports', [])}\n"
+        + (f"Symbols:\n{outline}\n" if outline else "")
+        + f"{code}\n"
+    )
+
+
+def build_folder_prompt(node, child_summaries):
+    listing = "\n\n".join(f"[{kind}] {path}\n{summary}" for kind, path, summary in child_summaries)
+    return (
+        "You are a technical documentation assistant.\n"
+        f"Summarise the folder `{node['path']}` in at most 200 words: what this part of the "
+        "project is responsible for and how its files/subfolders work together.\n"
+        "Base the summary only on these summaries of its contents:\n\n"
+        f"{listing}\n"
+    )
+
+
+def build_project_prompt(root, file_paths):
+    top_level = [
+        f"[{child['type']}] {child['path']}\n{child['doc_summary']}"
+        for child in root.get("children", [])
+        if child.get("doc_summary")
+    ][:MAX_TOP_LEVEL_SUMMARIES]
+    listed = file_paths[:MAX_LISTED_FILES]
+    if len(file_paths) > MAX_LISTED_FILES:
+        listed.append(f"... and {len(file_paths) - MAX_LISTED_FILES} more files")
+    return (
+        "You are a technical documentation assistant.\n"
+        "Generate a **full Markdown project document** with the following sections:\n"
+        f"{PROJECT_DOC_SECTIONS}\n"
+        f"Project summary:\n{root.get('doc_summary', '')}\n\n"
+        "Top-level component summaries:\n\n" + "\n\n".join(top_level) + "\n\n"
+        "Files analysed:\n" + "\n".join(listed) + "\n\n"
+        "Generate the Markdown content ready to save."
+    )
+
+
+# ------------------------------------------------------------------
+# Map / Reduce
+# ------------------------------------------------------------------
+def _read_source(base_dir, rel_path):
+    try:
+        source = read_source(os.path.join(base_dir, rel_path), MAX_SOURCE_CHARS, errors="replace", with_lines=False)
+        return source["text"] or ""
+    except OSError as e:
+        print(f"[!] Could not read {rel_path}: {e}")
+        return ""
+
+
+async def summarize_subtree(engine, node, base_dir, counters, emit=None, reuse=None):
+    """
+    Fills node["doc_summary"] bottom-up and returns it (None for empty folders).
+    reuse maps paths to summaries from a previous run that are still valid
+    (see incremental.py); those nodes cost no file read and no LLM call.
+    """
+    reuse = reuse or {}
+    if node["type"] == "file" and node["path"] in reuse:
+        node["doc_summary"] = reuse[node["path"]]
+        counters["files_done"] += 1
+        counters["reused"] += 1
+        notify(emit, "file_summarized", path=node["path"], reused=True,
+               done=counters["files_done"], total=counters["files_total"])
+        return node["doc_summary"]
+
+    if node["type"] == "file":
+        source = await asyncio.to_thread(_read_source, base_dir, node["path"])
+        try:
+            chunk_summaries = None
+            if needs_chunking(source):
+                chunk_summaries = await summarize_chunks(engine, source, node.get("language", "text"))
+            node["doc_summary"] = await engine.generate(build_file_prompt(node, source, chunk_summaries))
+        except Exception as e:
+            print(f"[!] Could not summarise {node['path']}: {e}")
+            node["doc_summary"] = None
+        counters["files_done"] += 1
+        notify(emit, "file_summarized", path=node["path"],
+               done=counters["files_done"], total=counters["files_total"])
+        return node["doc_summary"]
+
+    children = node.get("children", [])
+    summaries = await asyncio.gather(
+        *(summarize_subtree(engine, child, base_dir, counters, emit, reuse) for child in children)
+    )
+    if node["path"] in reuse:
+        node["doc_summary"] = reuse[node["path"]]
+        counters["reused"] += 1
+        return node["doc_summary"]
+
+    child_summaries = [
+        (child["type"], child["path"], summary)
+        for child, summary in zip(children, summaries)
+        if summary
+    ]
+    if not child_summaries:
+        node["doc_summary"] = None
+        return None
+
+    try:
+        node["doc_summary"] = await engine.generate(build_folder_prompt(node, child_summaries))
+    except Exception as e:
+        # Keep the reduction going with the raw child summaries rather than failing the run
+        print(f"[!] Could not reduce folder {node['path']}: {e}")
+        node["doc_summary"] = "\n".join(summary for _, _, summary in child_summaries)[:SOURCE_EXCERPT_CHARS]
+        node["doc_partial"] = True  # not reused by later incremental runs
+    notify(emit, "folder_reduced", path=node["path"])
+    return node["doc_summary"]
+
+
+def _file_paths(tree):
+    paths = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node["type"] == "file":
+            paths.append(node["path"])
+        else:
+            stack.extend(reversed(node.get("children", [])))
+    return paths
+
+
+def generate_markdown_map_reduce(model, analysis_tree, base_dir, concurrency=LLM_CONCURRENCY, emit=None,
+                                 previous=None):
+    """
+    Documents a repository of any size: per-file summaries, per-folder
+    reductions, then one project-level synthesis. Intermediate summaries are
+    left on the tree nodes under "doc_summary". Returns the Markdown text.
+    previous (from incremental.prepare_incremental) supplies the summaries
+    and, when nothing changed, the markdown of an earlier run.
+    """
+    file_paths = _file_paths(analysis_tree)
+    counters = {"files_done": 0, "files_total": len(file_paths), "reused": 0}
+    reuse = previous["summaries"] if previous else None
+
+    async def run():
+        with LLMEngine(model, concurrency=concurrency) as engine:
+            await summarize_subtree(engine, analysis_tree, base_dir, counters, emit, reuse)
+        print(f"[Gemini] Map-reduce summaries done: {engine.stats}, {counters['reused']} reused")
+
+    asyncio.run(run())
+
+    if previous and not previous["changed"] and previous.get("markdown"):
+        notify(emit, "llm_started", stage="project_markdown", prompt_chars=0, reused=True)
+        notify(emit, "llm_finished", stage="project_markdown", chars=len(previous["markdown"]), reused=True)
+        return previous["markdown"]
+
+    prompt = build_project_prompt(analysis_tree, file_paths)
+    notify(emit, "llm_started", stage="project_markdown", prompt_chars=len(prompt))
+    on_chunk = (lambda text: notify(emit, "llm_chunk", stage="project_markdown", text=text)) if emit else None
+    content = generate_cached(model, prompt, on_chunk=on_chunk)
+    notify(emit, "llm_finished", stage="project_markdown", chars=len(content))
+    return content
@@ -0,0 +1,313 @@
+import os
+import re
+import shutil
+import hashlib
+import threading
+import subprocess
+from urllib.parse import urlsplit
+
+# --------------------------------------------
+# Global Configurations
+# --------------------------------------------
+MIRROR_ROOT = os.getenv("MIRROR_ROOT", r"P:\AI_Documentation\example\mirrors")
+MIRROR_QUOTA_BYTES = int(os.getenv("MIRROR_QUOTA_BYTES", str(20 * 1024 * 1024 * 1024)))
+MIRROR_BLOBLESS = os.getenv("MIRROR_BLOBLESS", "0") == "1"
+MIRROR_DEPTH = int(os.getenv("MIRROR_DEPTH", "0")) or None
+
+LAST_USED_MARKER = "ai_doc_last_used"
+
+# Remote URL schemes accepted for mirroring (plus scp-like git@host:path);
+# everything else, e.g. ext:: or option-like strings, is refused
+ALLOWED_URL_SCHEMES = ("https", "ssh")
+# file:// remotes expose every repository readable on this machine to API
+# callers; only enable them for local setups, tests and the benchmark
+ALLOW_FILE_REMOTES = os.getenv("ALLOW_FILE_REMOTES", "0") == "1"
+
+_SCP_LIKE = re.compile(r"^[\w.-]+@([\w.-]+):(.+)$")
+_REF_CHARS = re.compile(r"^[A-Za-z0-9._/-]+$")
+
+_locks = {}
+_locks_guard = threading.Lock()
+# Mirrors with a checkout in progress in this process: path -> count
+_in_use = {}
+
+
+class InvalidRepoSpec(ValueError):
+    """A repository URL or ref that is not safe to pass to git."""
+
+
+# --------------------------------------------
+# VALIDATION
+# --------------------------------------------
+def validate_git_url(git_url: str) -> str:
+    """
+    Returns the stripped URL, or raises InvalidRepoSpec for anything but
+    https/ssh remotes (and file:// ones when ALLOW_FILE_REMOTES is set).
+    """
+    url = (git_url or "").strip()
+    if not url or url.startswith("-") or any(c.isspace() or ord(c) < 32 for c in url):
+        raise InvalidRepoSpec(f"Invalid repository URL: {git_url!r}")
+
+    scp_like = _SCP_LIKE.match(url)
+    if scp_like:
+        host = scp_like.group(1)
+    else:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        allowed = ALLOWED_URL_SCHEMES + (("file",) if ALLOW_FILE_REMOTES else ())
+        if scheme not in allowed:
+            raise InvalidRepoSpec(f"Unsupported repository URL {git_url!r}; use one of: {', '.join(allowed)}")
+        host = parts.hostname or ""
+        if scheme != "file" and not host:
+            raise InvalidRepoSpec(f"Repository URL has no host: {git_url!r}")
+    if host.startswith("-"):
+        raise InvalidRepoSpec(f"Invalid repository host in {git_url!r}")
+    return url
+
+
+def validate_ref(ref):
+    """
+    None, or a branch/tag name or commit SHA following `git check-ref-format`
+    rules (restricted to [A-Za-z0-9._/-]). Raises InvalidRepoSpec otherwise.
+    """
+    if ref is None:
+        return None
+    if (
+        not ref or ref.startswith(("-", "/", ".")) or not _REF_CHARS.match(ref)
+        or ".." in ref or "//" in ref or "/." in ref or ref.endswith(("/", ".", ".lock"))
+    ):
+        raise InvalidRepoSpec(f"Invalid git ref: {ref!r}")
+    return ref
+
+
+# --------------------------------------------
+# URL NORMALISATION
+# --------------------------------------------
+def normalize_repo_url(git_url: str) -> str:
+    """
+    Maps equivalent spellings of a repo URL to one key, e.g.
+    https://user@GitHub.com/Owner/Repo.git/ and git@github.com:Owner/Repo
+    both become github.com/owner/repo.
+    """
+    url = git_url.strip()
+    scp_like = _SCP_LIKE.match(url)
+    if scp_like:
+        host, path = scp_like.groups()
+    else:
+        parts = urlsplit(url)
+        host, path = (parts.hostname or ""), parts.path
+    path = path.strip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    return f"{host}/{path}".lower()
+
+
+def mirror_path(git_url: str) -> str:
+    key = normalize_repo_url(git_url)
+    readable = re.sub(r"[^a-z0-9]+", "_", key).strip("_")[:60]
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    return os.path.join(MIRROR_ROOT, f"{readable}-{digest}.git")
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+# --------------------------------------------
+# MIRROR MAINTENANCE
+# --------------------------------------------
+def ensure_mirror(git_url: str, blobless: bool = MIRROR_BLOBLESS, depth: int = MIRROR_DEPTH) -> "Repo":
+    """
+    Returns an up-to-date bare mirror of git_url: cloned on first use,
+    incrementally fetched afterwards.
+    """
+    from git import Repo  # GitPython is slow to import; load it on the first clone
+
+    git_url = validate_git_url(git_url)
+    path = mirror_path(git_url)
+    depth_args = [f"--depth={depth}"] if depth else []
+
+    if os.path.isdir(path):
+        repo = Repo(path)
+        print(f"[+] Fetching updates into mirror {path}")
+        repo.git.fetch("origin", "--prune", "--tags", *depth_args)
+        repo.git.worktree("prune")
+    else:
+        os.makedirs(MIRROR_ROOT, exist_ok=True)
+        print(f"[+] Creating mirror for {git_url}")
+        clone_opts = {"bare": True}
+        if blobless:
+            clone_opts["filter"] = "blob:none"
+        if depth:
+            clone_opts["depth"] = depth
+        repo = Repo.clone_from(git_url, path, **clone_opts)
+        # Bare clones have no fetch refspec; track branches only (skips refs/pull/* etc.)
+        repo.git.config("remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+
+    with open(os.path.join(path, LAST_USED_MARKER), "w") as f:
+        f.write(git_url)
+    return repo
+
+
+def _resolve_ref(repo: "Repo", ref):
+    target = validate_ref(ref) or "HEAD"
+    try:
+        return repo.git.rev_parse("--verify", f"{target}^{{commit}}")
+    except Exception:
+        # Commit SHAs outside the fetched history (shallow mirrors) must be fetched explicitly
+        repo.git.fetch("origin", "--", target)
+        return repo.git.rev_parse("--verify", "FETCH_HEAD^{commit}")
+
+
+def resolve_remote_commit(git_url: str, ref: str = None, timeout: float = 30):
+    """
+    Commit SHA that ref (default HEAD) names on the remote, via `git ls-remote`
+    (no clone or fetch). Full SHAs are returned as they are; None when the ref
+    cannot be resolved this way (short SHAs, unreachable remotes). Raises
+    InvalidRepoSpec for URLs or refs that are not safe to pass to git.
+    """
+    git_url = validate_git_url(git_url)
+    if validate_ref(ref) and re.fullmatch(r"[0-9a-f]{40}", ref):
+        return ref
+    target = ref or "HEAD"
+    try:
+        out = subprocess.run(
+            ["git", "ls-remote", "--", git_url, target, f"{target}^{{}}"],
+            capture_output=True, text=True, timeout=timeout, check=True
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[!] Could not resolve {git_url}@{target}: {e}")
+        return None
+
+    refs = dict(reversed(line.split("\t", 1)) for line in out.splitlines() if "\t" in line)
+    # Peeled annotated tags first, then branches, then anything else that matched
+    for name in (f"refs/tags/{target}^{{}}", f"refs/heads/{target}", target, f"refs/tags/{target}"):
+        if name in refs:
+            return refs[name]
+    return None
+
+
+def checkout_repo(
+    git_url: str,
+    dest: str,
+    ref: str = None,
+    blobless: bool = MIRROR_BLOBLESS,
+    depth: int = MIRROR_DEPTH
+) -> str:
+    """
+    Materialises git_url@ref at dest as a detached worktree of the local mirror,
+    replacing whatever was at dest. Returns the checked-out commit SHA.
+    """
+    git_url = validate_git_url(git_url)
+    validate_ref(ref)
+    path = mirror_path(git_url)
+    _mark_in_use(path, 1)
+    try:
+        with _lock_for(path):
+            repo = ensure_mirror(git_url, blobless=blobless, depth=depth)
+            commit = _resolve_ref(repo, ref)
+
+            if os.path.exists(dest):
+                print(f"Deleting existing directory {dest}")
+                shutil.rmtree(dest, ignore_errors=True)
+                repo.git.worktree("prune")
+
+            repo.git.worktree("add", "--force", "--detach", dest, commit)
+            print(f"Checked out {git_url}@{commit[:12]} into {dest}")
+
+        evict_cold_mirrors(keep={path})
+    finally:
+        _mark_in_use(path, -1)
+    return commit
+
+
+# --------------------------------------------
+# DISK QUOTA
+# --------------------------------------------
+def _mark_in_use(path, delta):
+    with _locks_guard:
+        count = _in_use.get(path, 0) + delta
+        if count > 0:
+            _in_use[path] = count
+        else:
+            _in_use.pop(path, None)
+
+
+def has_live_worktrees(path) -> bool:
+    """True while a checkout of this mirror still exists (an active workspace or job)."""
+    worktrees = os.path.join(path, "worktrees")
+    if not os.path.isdir(worktrees):
+        return False
+    for entry in os.scandir(worktrees):
+        try:
+            with open(os.path.join(entry.path, "gitdir")) as f:
+                gitdir = f.read().strip()
+        except OSError:
+            continue
+        if os.path.exists(gitdir):
+            return True
+    return False
+
+
+def mirrors_in_use() -> set:
+    """Mirrors that must not be evicted: checkouts in progress and mirrors with live worktrees."""
+    with _locks_guard:
+        busy = set(_in_use)
+    if os.path.isdir(MIRROR_ROOT):
+        busy.update(
+            entry.path for entry in os.scandir(MIRROR_ROOT)
+            if entry.is_dir() and entry.name.endswith(".git") and has_live_worktrees(entry.path)
+        )
+    return busy
+
+
+def dir_size(path):
+    total = 0
+    stack = [path]
+    while stack:
+        for entry in os.scandir(stack.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def evict_cold_mirrors(quota_bytes: int = MIRROR_QUOTA_BYTES, keep=()):
+    """
+    Deletes least-recently-used mirrors until the store fits in quota_bytes.
+    Mirrors in keep or in use (see mirrors_in_use) are never evicted.
+    """
+    if not os.path.isdir(MIRROR_ROOT):
+        return []
+
+    mirrors = []
+    for entry in os.scandir(MIRROR_ROOT):
+        if not entry.is_dir() or not entry.name.endswith(".git"):
+            continue
+        marker = os.path.join(entry.path, LAST_USED_MARKER)
+        last_used = os.path.getmtime(marker) if os.path.exists(marker) else 0
+        mirrors.append((last_used, entry.path, dir_size(entry.path)))
+
+    total = sum(size for _, _, size in mirrors)
+    if total <= quota_bytes:
+        return []
+    busy = mirrors_in_use() | set(keep)
+    evicted = []
+    for _, path, size in sorted(mirrors):
+        if total <= quota_bytes:
+            break
+        if path in busy:
+            continue
+        with _lock_for(path):
+            # Re-checked under the lock: a checkout may have started meanwhile
+            with _locks_guard:
+                started = path in _in_use
+            if started or has_live_worktrees(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        evicted.append(path)
+        print(f"[-] Evicted cold mirror {path}")
+    return evicted
@@ -0,0 +1,161 @@
+import os
+import json
+
+from process_repo_full import process_repo_full, INCREMENTAL_DOCS, DOC_MODE
+from clone_utils import ANALYZER_VERSION
+from incremental import DOC_STATE_VERSION
+from mirror_store import resolve_remote_commit
+from progress import notify
+from result_store import get_result_store, MARKDOWN, ANALYSIS, FILE_SUMMARY, DIAGRAM, DIAGRAM_IMAGE
+from UML_diag import (
+    generate_uml_diagram_from_markdown, generate_uml_diagrams_from_analysis, render_diagrams,
+    UML_LLM_FLOWCHART, UML_RENDER_PNG, UML_OUTPUT_DIR,
+)
+from workspaces import get_workspace_manager
+
+# ----------------------------------------------------
+# Full Documentation Pipeline
+# ----------------------------------------------------
+PIPELINE_STAGES = ["process_repo", "read_markdown", "generate_uml"]
+# Stored results (see result_store.py) are keyed by repo, commit and this
+# version; it changes with the analyzers, the prompts and the output options
+PIPELINE_VERSION = f"1-a{ANALYZER_VERSION}-p{DOC_STATE_VERSION}-{DOC_MODE}" + ("-flowchart" if UML_LLM_FLOWCHART else "")
+# Set to 0 to always regenerate (results are still stored)
+RESULT_STORE_LOOKUP = os.getenv("RESULT_STORE_LOOKUP", "1") == "1"
+
+
+def run_full_pipeline(git_url: str, ref: str = None, on_stage=None, emit=None, job_id: str = None,
+                      incremental: bool = None, base_commit: str = None, refresh: bool = False) -> dict:
+    """
+    Runs clone -> analysis -> Gemini docs -> UML for one repository.
+    on_stage(name) is called before each stage; it may raise to abort the run
+    (used by the job manager for cancellation). emit receives progress events.
+    Each run works in its own workspace (named after job_id when given), so
+    several runs can proceed in parallel. incremental / base_commit re-document
+    only what changed since an earlier run (see incremental.py).
+    A repo@commit documented before is answered from the result store unless
+    refresh is set.
+    """
+    if RESULT_STORE_LOOKUP and not refresh:
+        commit = resolve_remote_commit(git_url, ref)
+        cached = load_stored_result(git_url, commit) if commit else None
+        if cached is not None:
+            print(f"[✔] Serving stored documentation for {git_url}@{commit[:12]}")
+            notify(emit, "result_cached", commit=commit, run_id=cached["other_info"]["result_id"])
+            return cached
+
+    if incremental is None:
+        incremental = INCREMENTAL_DOCS
+    manager = get_workspace_manager()
+    workspace = manager.create(job_id)
+    try:
+        return _run_in_workspace(workspace, git_url, ref, on_stage, emit, incremental, base_commit)
+    finally:
+        manager.release(workspace)
+
+
+def _run_in_workspace(workspace, git_url, ref, on_stage, emit, incremental=False, base_commit=None):
+    def enter(stage):
+        workspace.check_quota()
+        if on_stage:
+            on_stage(stage)
+
+    # 1. Run the complete repository processing pipeline
+    enter("process_repo")
+    result = process_repo_full(
+        git_url, ref, emit=emit, workspace=workspace, incremental=incremental, base_commit=base_commit
+    )
+    analysis = result.pop("analysis", None) or []
+
+    # 2. Locate and read the generated markdown file
+    enter("read_markdown")
+    markdown_path = result.get("markdown_path") or workspace.markdown_path
+    if not os.path.exists(markdown_path):
+        raise FileNotFoundError("Markdown file not found after processing")
+    with open(markdown_path, "r", encoding="utf-8") as f:
+        project_doc_text = f.read()
+
+    # 3. Generate UML diagrams: class + component from the analysis (no LLM),
+    #    plus the Gemini flowchart when UML_LLM_FLOWCHART is enabled
+    enter("generate_uml")
+    puml_paths = generate_uml_diagrams_from_analysis(
+        analysis, output_dir=workspace.uml_dir, render_png=False, emit=emit
+    )
+    if UML_LLM_FLOWCHART:
+        puml_paths["flowchart"] = generate_uml_diagram_from_markdown(
+            markdown_path=markdown_path, output_dir=workspace.uml_dir, render_png=False, emit=emit
+        )
+
+    # All diagrams are rendered in one batch into the shared /uml folder;
+    # images have content-hash names, so runs cannot overwrite each other's
+    images = render_diagrams(puml_paths, emit, image_dir=UML_OUTPUT_DIR) if UML_RENDER_PNG else {}
+    uml_diagrams = {kind: f"/uml/{os.path.basename(path)}" for kind, path in images.items()}
+
+    details = {
+        "project_doc_text": project_doc_text,
+        "uml_url": uml_diagrams.get("class"),
+        "uml_diagrams": uml_diagrams,
+        "other_info": result
+    }
+    try:
+        result["result_id"] = store_result(git_url, details, analysis, puml_paths, images)
+    except Exception as e:
+        print(f"[!] Could not store the result: {e}")
+    return details
+
+
+# ----------------------------------------------------
+# Stored Results
+# ----------------------------------------------------
+def _file_summaries(analysis):
+    stack = [analysis] if isinstance(analysis, dict) else []
+    while stack:
+        node = stack.pop()
+        stack.extend(node.get("children", []))
+        if node.get("type") == "file" and node.get("doc_summary"):
+            yield node["path"], node["doc_summary"]
+
+
+def store_result(git_url, details, analysis, puml_paths, images, version=PIPELINE_VERSION) -> int:
+    """Keeps a finished run (markdown, analysis, file summaries, diagrams) in the result store."""
+    artifacts = [
+        (MARKDOWN, "FULL_PROJECT_DOC.md", details["project_doc_text"]),
+        (ANALYSIS, "analysis.json", json.dumps(analysis, ensure_ascii=False)),
+    ]
+    artifacts += [(FILE_SUMMARY, path, summary) for path, summary in _file_summaries(analysis)]
+    for kind, puml_path in puml_paths.items():
+        with open(puml_path, "r", encoding="utf-8") as f:
+            artifacts.append((DIAGRAM, kind, f.read()))
+    for image_path in images.values():
+        with open(image_path, "rb") as f:
+            artifacts.append((DIAGRAM_IMAGE, os.path.basename(image_path), f.read()))
+
+    meta = {key: value for key, value in details.items() if key != "project_doc_text"}
+    commit = details["other_info"]["commit"]
+    return get_result_store().save(git_url, commit, version, meta, artifacts)
+
+
+def stored_details(run) -> dict:
+    """Rebuilds the run_full_pipeline() result of a stored run; rendered images are restored to /uml."""
+    store = get_result_store()
+    for item in store.artifact_names(run["id"], DIAGRAM_IMAGE):
+        image_path = os.path.join(UML_OUTPUT_DIR, item["name"])
+        if not os.path.exists(image_path):
+            os.makedirs(UML_OUTPUT_DIR, exist_ok=True)
+            with open(image_path, "wb") as f:
+                f.write(store.artifact(run["id"], DIAGRAM_IMAGE, item["name"]))
+
+    details = dict(run["meta"])
+    details["project_doc_text"] = store.artifact(run["id"], MARKDOWN, "FULL_PROJECT_DOC.md").decode("utf-8")
+    details["other_info"] = dict(details.get("other_info") or {}, result_id=run["id"], cached=True)
+    return details
+
+
+def load_stored_result(git_url, commit, version=PIPELINE_VERSION):
+    """The stored result for repo@commit, or None."""
+    try:
+        run = get_result_store().find(git_url, commit, version)
+        return stored_details(run) if run else None
+    except Exception as e:
+        print(f"[!] Result store lookup failed: {e}")
+        return None
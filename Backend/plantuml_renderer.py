@@ -0,0 +1,301 @@
+import os
+import re
+import time
+import uuid
+import zlib
+import queue
+import base64
+import atexit
+import socket
+import string
+import hashlib
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# PlantUML runs as one long-lived JVM instead of `java -jar` per diagram:
+#   "pipe":    java -jar plantuml.jar -pipe -t<fmt> -pipedelimitor <marker>
+#              (one process per output format, diagrams streamed through stdin)
+#   "picoweb": java -jar plantuml.jar -picoweb:<port>:127.0.0.1 (HTTP, any format)
+# Rendered images are content-addressed (<hash>.<fmt>), so a diagram whose
+# source has not changed is never rendered twice and can be cached forever.
+PLANTUML_JAR = os.getenv("PLANTUML_JAR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor", "plantuml.jar"))
+# Fetched once into PLANTUML_JAR when the vendored jar is missing; empty disables
+PLANTUML_JAR_URL = os.getenv("PLANTUML_JAR_URL", "https://github.com/plantuml/plantuml/releases/latest/download/plantuml.jar")
+PLANTUML_JAVA = os.getenv("PLANTUML_JAVA", "java")
+PLANTUML_MODE = os.getenv("PLANTUML_MODE", "pipe")
+PLANTUML_TIMEOUT = float(os.getenv("PLANTUML_TIMEOUT", "60"))
+PLANTUML_RENDER_WORKERS = int(os.getenv("PLANTUML_RENDER_WORKERS", "4"))
+SUPPORTED_FORMATS = ("png", "svg")
+HASHED_IMAGE_NAME = re.compile(r"^[0-9a-f]{24}\.(png|svg)$")
+
+_PLANTUML_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase + "-_"
+_BASE64_TO_PLANTUML = bytes.maketrans(
+    (string.ascii_uppercase + string.ascii_lowercase + string.digits + "+/").encode(),
+    _PLANTUML_ALPHABET.encode(),
+)
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def ensure_jar(jar_path: str = PLANTUML_JAR, url: str = PLANTUML_JAR_URL) -> str:
+    """Returns the vendored jar, downloading it once if it is missing and a URL is configured."""
+    if os.path.exists(jar_path):
+        return jar_path
+    if not url:
+        raise FileNotFoundError(f"PlantUML jar not found: {jar_path}")
+    print(f"[↓] Downloading PlantUML to {jar_path}...")
+    os.makedirs(os.path.dirname(jar_path), exist_ok=True)
+    tmp_path = f"{jar_path}.{uuid.uuid4().hex}.tmp"
+    urllib.request.urlretrieve(url, tmp_path)
+    os.replace(tmp_path, jar_path)
+    return jar_path
+
+
+def plantuml_encode(source: str) -> str:
+    """PlantUML's URL text encoding: raw deflate + its own base64 alphabet."""
+    compressed = zlib.compress(source.encode("utf-8"), 9)[2:-4]
+    compressed += b"\0" * (-len(compressed) % 3)
+    return base64.b64encode(compressed).translate(_BASE64_TO_PLANTUML).decode("ascii")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ------------------------------------------------------------------
+# Persistent Processes
+# ------------------------------------------------------------------
+class PipeProcess:
+    """One `-pipe` JVM for one output format; requests are serialised through a lock."""
+
+    def __init__(self, command, fmt, timeout=PLANTUML_TIMEOUT):
+        self.delimiter = f"--plantuml-{uuid.uuid4().hex}--".encode()
+        self.command = command + ["-pipe", f"-t{fmt}", "-charset", "UTF-8", "-pipedelimitor", self.delimiter.decode()]
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.process = None
+        self._chunks = None
+        self._buffer = b""
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._chunks = queue.Queue()
+        self._buffer = b""
+        threading.Thread(target=self._pump, args=(self.process, self._chunks), daemon=True).start()
+
+    @staticmethod
+    def _pump(process, chunks):
+        # A reader thread keeps reads interruptible by a timeout on every platform
+        while True:
+            data = process.stdout.read1(65536)
+            chunks.put(data)
+            if not data:
+                return
+
+    def _read_image(self):
+        deadline = time.monotonic() + self.timeout
+        while self.delimiter not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("PlantUML did not answer in time")
+            try:
+                data = self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if not data:
+                raise RuntimeError("PlantUML process exited")
+            self._buffer += data
+        image, _, rest = self._buffer.partition(self.delimiter)
+        # PlantUML prints the delimiter with println(), i.e. followed by a newline
+        self._buffer = rest.lstrip(b"\r\n")
+        return image
+
+    def render(self, source: str) -> bytes:
+        with self.lock:
+            for attempt in range(2):
+                if self.process is None or self.process.poll() is not None:
+                    self._start()
+                try:
+                    self.process.stdin.write(source.strip().encode("utf-8") + b"\n")
+                    self.process.stdin.flush()
+                    return self._read_image()
+                except (OSError, RuntimeError, TimeoutError):
+                    # A hung or crashed JVM is replaced once before giving up
+                    self.close()
+                    if attempt:
+                        raise
+
+    def close(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+class PicowebProcess:
+    """A `-picoweb` JVM on a private localhost port; requests may run concurrently."""
+
+    def __init__(self, command, timeout=PLANTUML_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.process = None
+        self.port = None
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                return
+            self.port = _free_port()
+            self.process = subprocess.Popen(
+                self.command + [f"-picoweb:{self.port}:127.0.0.1"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                try:
+                    socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                    return
+                except OSError:
+                    time.sleep(0.1)
+            raise TimeoutError("PlantUML picoweb server did not start")
+
+    def render(self, source: str, fmt: str) -> bytes:
+        self._ensure_started()
+        url = f"http://127.0.0.1:{self.port}/plantuml/{fmt}/{plantuml_encode(source)}"
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return response.read()
+
+    def close(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+# ------------------------------------------------------------------
+# Renderer
+# ------------------------------------------------------------------
+class PlantUMLRenderer:
+    """
+    Renders PlantUML sources to PNG/SVG through a persistent PlantUML process.
+    Output files are named by a hash of (format, jar, source) and double as the
+    render cache: an existing file is returned without touching the JVM.
+    """
+
+    def __init__(self, jar_path: str = PLANTUML_JAR, mode: str = PLANTUML_MODE, java: str = PLANTUML_JAVA,
+                 timeout: float = PLANTUML_TIMEOUT, workers: int = PLANTUML_RENDER_WORKERS):
+        if mode not in ("pipe", "picoweb"):
+            raise ValueError(f"Unknown PLANTUML_MODE: {mode}")
+        self.jar_path = jar_path
+        self.mode = mode
+        self.java = java
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.stats = {"rendered": 0, "cache_hits": 0, "failures": 0}
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._jar_id = None
+
+    def _jar(self) -> str:
+        """The jar (downloaded on first use), identified by name and size for render keys."""
+        jar = ensure_jar(self.jar_path)
+        if self._jar_id is None:
+            self._jar_id = f"{os.path.basename(jar)}:{os.path.getsize(jar)}"
+        return jar
+
+    def _command(self):
+        return [self.java, "-Djava.awt.headless=true", "-jar", self._jar()]
+
+    def _process(self, fmt):
+        key = fmt if self.mode == "pipe" else "picoweb"
+        with self._lock:
+            if key not in self._processes:
+                command = self._command()
+                self._processes[key] = (
+                    PipeProcess(command, fmt, self.timeout) if self.mode == "pipe"
+                    else PicowebProcess(command, self.timeout)
+                )
+            return self._processes[key]
+
+    def render_key(self, source: str, fmt: str) -> str:
+        # Resolve the jar first, so the key is the same before and after a cold-start download
+        self._jar()
+        payload = f"{fmt}\0{self._jar_id}\0{source.strip()}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:24]
+
+    def render(self, source: str, output_dir: str, fmt: str = "png") -> str:
+        """Returns the path of the rendered <hash>.<fmt> file in output_dir."""
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported diagram format: {fmt}")
+        path = os.path.join(output_dir, f"{self.render_key(source, fmt)}.{fmt}")
+        if os.path.exists(path):
+            self.stats["cache_hits"] += 1
+            return path
+
+        process = self._process(fmt)
+        try:
+            image = process.render(source) if self.mode == "pipe" else process.render(source, fmt)
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        if not image:
+            self.stats["failures"] += 1
+            raise RuntimeError("PlantUML returned an empty image")
+
+        os.makedirs(output_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(image)
+        os.replace(tmp_path, path)
+        self.stats["rendered"] += 1
+        return path
+
+    def render_many(self, sources, output_dir: str, fmt: str = "png"):
+        """
+        Renders several diagrams in one call. Returns one path (or None on
+        failure) per source, in order. Cache hits are resolved without the JVM.
+        """
+        def render_one(source):
+            try:
+                return self.render(source, output_dir, fmt)
+            except Exception as e:
+                print(f"[!] PlantUML render failed: {e}")
+                return None
+
+        sources = list(sources)
+        if len(sources) <= 1 or self.mode == "pipe":
+            # A pipe process handles one diagram at a time anyway
+            return [render_one(source) for source in sources]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(sources))) as pool:
+            return list(pool.map(render_one, sources))
+
+    def close(self):
+        with self._lock:
+            for process in self._processes.values():
+                process.close()
+            self._processes.clear()
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PlantUMLRenderer:
+    """Process-wide renderer, so every request shares the same warm JVM."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PlantUMLRenderer()
+            atexit.register(_renderer.close)
+        return _renderer
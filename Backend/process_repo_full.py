@@ -1,29 +1,32 @@
 import os
 import json
-import shutil
 import ast
-import javalang
-from git import Repo
-from tree_sitter_languages import get_parser
-import google.generativeai as genai
-from dotenv import load_dotenv
+from llm_backend import get_model
+from python_symbols import extract_python_symbols
+from mirror_store import checkout_repo
+from progress import notify
+from llm_cache import generate_cached
+from clone_utils import build_code_analysis_tree, extract_java_symbols
+from repo_walker import walk_repo
+from source_reader import read_source
+from analysis_cache import AnalysisCache, list_blob_shas
+from map_reduce_docs import generate_markdown_map_reduce
+from incremental import prepare_incremental, save_run_state
+from prompt_packer import pack_files, is_entry_point, PROJECT_PROMPT_TOKEN_BUDGET
 
 # ------------------------------------------------------------------
 # 1. Setup
 # ------------------------------------------------------------------
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found. Set in .env file.")
+# Gemini (or the LLM_BACKEND=fake stand-in); the API key is checked on first use
+model = get_model("models/gemini-2.5-flash")
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-
-BASE_CLONE_DIR = r"P:\AI_Documentation\example\cloned_repo"
+BASE_CLONE_DIR = os.getenv("BASE_CLONE_DIR", r"P:\AI_Documentation\example\cloned_repo")
 DOCS_DIR = r"P:\AI_Documentation\example\docs"
-OUTPUT_MD = r"P:\AI_Documentation\example\FULL_PROJECT_DOC.md"
-EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
-
+OUTPUT_MD = os.getenv("OUTPUT_MD", r"P:\AI_Documentation\example\FULL_PROJECT_DOC.md")
+# "map_reduce": per-file -> per-folder -> project summaries; "single": one prompt with everything
+DOC_MODE = os.getenv("DOC_MODE", "map_reduce")
+# Re-document only what changed since the last stored run (map_reduce mode, see incremental.py)
+INCREMENTAL_DOCS = os.getenv("INCREMENTAL_DOCS", "0") == "1"
 LANGUAGE_EXT_MAP = {
     "py": "python", "java": "java", "js": "javascript", "ts": "typescript",
     "cpp": "cpp", "c": "c", "cc": "cpp", "html": "html", "css": "css",
@@ -33,112 +36,205 @@ LANGUAGE_EXT_MAP = {
 # ------------------------------------------------------------------
 # 2. Clone Repo
 # ------------------------------------------------------------------
-def clone_repo(git_url):
-    if os.path.exists(BASE_CLONE_DIR):
-        shutil.rmtree(BASE_CLONE_DIR, ignore_errors=True)
-    Repo.clone_from(git_url, BASE_CLONE_DIR)
+def clone_repo(git_url, ref=None, emit=None, clone_dir=None):
+    notify(emit, "clone_started", git_url=git_url, ref=ref)
+    commit = checkout_repo(git_url, clone_dir or BASE_CLONE_DIR, ref=ref)
     print(f"Repo cloned: {git_url}")
+    notify(emit, "clone_finished", git_url=git_url, commit=commit)
+    return commit
 
 # ------------------------------------------------------------------
 # 3. Analyze Files
 # ------------------------------------------------------------------
-def analyze_file(file_path):
+def analyze_file(file_path, base_dir=None):
     ext = os.path.splitext(file_path)[1].lstrip(".").lower()
     if ext not in LANGUAGE_EXT_MAP:
         return None
 
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            source = f.read()
-    except:
-        source = ""
-
-    analysis = {"lines": len(source.splitlines())}
-
-    if ext == "py":
+        info = read_source(file_path)
+    except (OSError, UnicodeDecodeError):
+        info = {"text": "", "lines": 0, "size": 0, "binary": False, "truncated": False}
+    # Binary files keep their entry (as undecodable files always did), without source
+    source = info["text"] or ""
+
+    analysis = {"lines": info["lines"]}
+
+    # Binary files and files above SOURCE_MAX_BYTES are listed but not parsed
+    if info["binary"]:
+        analysis["skipped"] = "binary"
+    elif info["truncated"]:
+        analysis["skipped"] = "too_large"
+    elif ext == "py":
         try:
-            tree = ast.parse(source)
+            symbols = extract_python_symbols(ast.parse(source))
             analysis.update({
-                "classes": sum(isinstance(n, ast.ClassDef) for n in ast.walk(tree)),
-                "functions": sum(isinstance(n, ast.FunctionDef) for n in ast.walk(tree)),
-                "imports": [n.names[0].name for n in ast.walk(tree) if isinstance(n, ast.Import)]
+                "classes": symbols["classes_count"],
+                "functions": symbols["functions_count"],
+                "imports": symbols["imports"],
+                "symbols": symbols["symbols"]
             })
         except:
             pass
     elif ext == "java":
+        import javalang  # loaded with the first Java file, not at server startup
+
         try:
             tree = javalang.parse.parse(source)
             analysis.update({
                 "classes": len(list(tree.filter(javalang.tree.ClassDeclaration))),
                 "functions": len(list(tree.filter(javalang.tree.MethodDeclaration))),
-                "imports": [imp.path for imp in tree.imports]
+                "imports": [imp.path for imp in tree.imports],
+                "symbols": extract_java_symbols(tree)
             })
         except:
             pass
 
+    # Source is not kept: the prompt packer re-reads the files it has room for (see load_source)
+    path = os.path.relpath(file_path, base_dir or BASE_CLONE_DIR)
     return {
-        "path": os.path.relpath(file_path, BASE_CLONE_DIR),
+        "path": path,
         "ext": ext,
-        "source": source[:2000],
+        "size": info["size"],
+        "entry_point": is_entry_point(path.replace("\\", "/"), source),
         "analysis": analysis
     }
 
+
+def load_source(base_dir, path):
+    """Source of one collected file, "" for binary, undecodable or vanished files (as analyze_file sees them)."""
+    try:
+        return read_source(os.path.join(base_dir, path), with_lines=False)["text"] or ""
+    except (OSError, UnicodeDecodeError):
+        return ""
+
 # ------------------------------------------------------------------
 # 4. Collect All File Docs
 # ------------------------------------------------------------------
-def collect_all_files(base_dir):
+def collect_all_files(base_dir, emit=None):
+    paths = [entry.path for _, _, is_dir, entry in walk_repo(base_dir) if not is_dir]
+
     files_data = []
-    for root, dirs, files in os.walk(base_dir):
-        dirs[:] = [d for d in dirs if d not in EXCLUDE_FOLDERS]
-        for file in files:
-            path = os.path.join(root, file)
-            data = analyze_file(path)
-            if data:
-                files_data.append(data)
+    for index, path in enumerate(paths, start=1):
+        data = analyze_file(path, base_dir)
+        if data:
+            files_data.append(data)
+        notify(emit, "file_analyzed", path=os.path.relpath(path, base_dir), done=index, total=len(paths))
     return files_data
 
 # ------------------------------------------------------------------
 # 5. Generate Full Markdown via Gemini
 # ------------------------------------------------------------------
-def generate_full_markdown_with_gemini(files_data):
+def generate_full_markdown_with_gemini(files_data, emit=None, output_md=None, base_dir=None):
     # Build a single prompt with everything
     prompt = "You are a technical documentation assistant.\n"
     prompt += "Generate a **full Markdown project document** with the following sections:\n"
     prompt += "1. Overview & Introduction\n2. System Architecture\n3. Functional Specification\n"
     prompt += "4. Non-Functional Requirements\n5. Code Documentation\n6. Testing\n7. Deployment / Execution\n"
     prompt += "8. User Guide\n9. Appendices\n\n"
-    prompt += "Use the following per-file summaries as references.\n\n"
-
-    for file in files_data:
-        prompt += f"Filename: {file['path']}\n"
-        prompt += f"Lines: {file['analysis'].get('lines','N/A')}\n"
-        prompt += f"Classes: {file['analysis'].get('classes','N/A')}\n"
-        prompt += f"Functions: {file['analysis'].get('functions','N/A')}\n"
-        prompt += f"Imports: {file['analysis'].get('imports',[])}\n"
-        prompt += f"Code (truncated):\n{file['source']}\n\n"
+    prompt += "Use the following per-file summaries as references (most important files first).\n\n"
+
+    def file_header(entry):
+        analysis = entry["node"]["analysis"]
+        return (
+            f"Filename: {entry['path']}\n"
+            f"Lines: {analysis.get('lines','N/A')}\n"
+            f"Classes: {analysis.get('classes','N/A')}\n"
+            f"Functions: {analysis.get('functions','N/A')}\n"
+            f"Imports: {analysis.get('imports',[])}"
+        )
+
+    # Outlines of every file first, then code bodies by importance, within the token budget;
+    # sources are read from the clone one file at a time, only while there is room for them
+    base_dir = base_dir or BASE_CLONE_DIR
+    entries = [
+        {"path": f["path"].replace("\\", "/"), "node": f, "size": f["size"], "entry_point": f["entry_point"]}
+        for f in files_data
+    ]
+    prompt += pack_files(
+        entries, PROJECT_PROMPT_TOKEN_BUDGET, header=file_header,
+        source_loader=lambda entry: load_source(base_dir, entry["node"]["path"])
+    ) + "\n"
 
     prompt += "\nGenerate the Markdown content ready to save."
 
-    response = model.generate_content(prompt)
-    content = response.text.strip()
+    notify(emit, "llm_started", stage="project_markdown", prompt_chars=len(prompt))
+    # Stream chunks to clients so they can render the document while it is being written
+    on_chunk = (lambda text: notify(emit, "llm_chunk", stage="project_markdown", text=text)) if emit else None
+    content = generate_cached(model, prompt, on_chunk=on_chunk)
+    notify(emit, "llm_finished", stage="project_markdown", chars=len(content))
 
     # Save to file
-    with open(OUTPUT_MD, "w", encoding="utf-8") as f:
+    output_md = output_md or OUTPUT_MD
+    with open(output_md, "w", encoding="utf-8") as f:
         f.write(content)
 
-    print(f"[✔] Full project Markdown generated at: {OUTPUT_MD}")
+    print(f"[✔] Full project Markdown generated at: {output_md}")
+    notify(emit, "markdown_ready", markdown_path=output_md, text=content)
 
 # ------------------------------------------------------------------
-# 6. Main Pipeline
+# 6. Generate Full Markdown via Map-Reduce
 # ------------------------------------------------------------------
-def process_repo_full(git_url):
-    clone_repo(git_url)
-    files_data = collect_all_files(BASE_CLONE_DIR)
-    generate_full_markdown_with_gemini(files_data)
+def generate_full_markdown_map_reduce(base_dir, emit=None, output_md=None, previous=None):
+    analysis_tree = build_code_analysis_tree(
+        base_dir, cache=AnalysisCache(), blob_shas=list_blob_shas(base_dir),
+        previous=previous["analyses"] if previous else None, emit=emit
+    )
+    notify(emit, "analysis_finished", path=base_dir)
+    content = generate_markdown_map_reduce(model, analysis_tree, base_dir, emit=emit, previous=previous)
 
-    # Return the paths/info your frontend expects
+    # Save to file
+    output_md = output_md or OUTPUT_MD
+    with open(output_md, "w", encoding="utf-8") as f:
+        f.write(content)
+
+    print(f"[✔] Full project Markdown generated at: {output_md}")
+    notify(emit, "markdown_ready", markdown_path=output_md, text=content)
+    return analysis_tree, content
+
+# ------------------------------------------------------------------
+# 7. Main Pipeline
+# ------------------------------------------------------------------
+def process_repo_full(git_url, ref=None, emit=None, mode=DOC_MODE, workspace=None,
+                      incremental=INCREMENTAL_DOCS, base_commit=None):
+    """
+    Clones, analyses and documents one repository. With a workspace
+    (see workspaces.py) the clone and the markdown go to its private paths
+    and its disk quota is checked after cloning; without one the global
+    BASE_CLONE_DIR / OUTPUT_MD are used.
+    With incremental (map_reduce mode only) files unchanged since base_commit
+    (default: the last stored run) keep their previous analysis and summary.
+    """
+    clone_dir = workspace.clone_dir if workspace else BASE_CLONE_DIR
+    output_md = workspace.markdown_path if workspace else OUTPUT_MD
+
+    commit = clone_repo(git_url, ref, emit, clone_dir=clone_dir)
+    if workspace:
+        workspace.check_quota()
+    previous = None
+    if mode == "single":
+        analysis = collect_all_files(clone_dir, emit)
+        generate_full_markdown_with_gemini(analysis, emit, output_md=output_md, base_dir=clone_dir)
+    else:
+        if incremental or base_commit:
+            previous = prepare_incremental(git_url, clone_dir, commit, base_commit)
+            if previous:
+                notify(emit, "incremental_plan", base_commit=previous["base_commit"],
+                       changed=len(previous["changed"]))
+        analysis, content = generate_full_markdown_map_reduce(clone_dir, emit, output_md=output_md, previous=previous)
+        try:
+            save_run_state(git_url, commit, analysis, content)
+        except OSError as e:
+            print(f"[!] Could not store run state for later incremental runs: {e}")
+
+    # Return the paths/info your frontend expects; "analysis" feeds the UML
+    # diagrams and is not meant for API responses
     return {
-        "markdown_path": OUTPUT_MD
+        "markdown_path": output_md,
+        "commit": commit,
+        "base_commit": previous["base_commit"] if previous else None,
+        "changed_files": sorted(previous["changed"]) if previous else None,
+        "analysis": analysis
     }
 
 # ------------------------------------------------------------------
@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+import threading
+
+# ----------------------------------------------------
+# Pipeline Progress Events
+# ----------------------------------------------------
+# Pipeline functions take an optional `emit(event, **data)` callable and report
+# structured events through notify(); a ProgressLog collects them per job so
+# clients can stream them as Server-Sent Events.
+HEARTBEAT_SECONDS = 15.0
+# Streamed LLM text events kept per log. Older ones are dropped, and all of
+# them once the log is closed: markdown_ready carries the complete text.
+TOKEN_EVENT = "llm_chunk"
+PROGRESS_MAX_TOKEN_EVENTS = int(os.getenv("PROGRESS_MAX_TOKEN_EVENTS", "500"))
+
+
+def notify(emit, event: str, **data):
+    """Forwards a progress event when the caller asked for them."""
+    if emit is not None:
+        emit(event, **data)
+
+
+class ProgressLog:
+    """
+    Thread-safe event log with blocking readers. Every event keeps its `seq`
+    for good, also when older token events are compacted away, so
+    Last-Event-ID keeps working.
+    """
+
+    def __init__(self, max_token_events: int = PROGRESS_MAX_TOKEN_EVENTS):
+        self.events = []
+        self.next_seq = 0
+        self.closed = False
+        self.closed_at = None
+        self.subscribers = 0
+        self.idle_since = time.time()
+        self.max_token_events = max_token_events
+        self._token_events = 0
+        self._cond = threading.Condition()
+        # (loop, asyncio.Event) of follow_async readers, woken from any thread
+        self._async_waiters = set()
+
+    def emit(self, event: str, **data):
+        with self._cond:
+            self.events.append({"seq": self.next_seq, "event": event, "time": time.time(), **data})
+            self.next_seq += 1
+            if event == TOKEN_EVENT:
+                self._token_events += 1
+                if self._token_events > self.max_token_events:
+                    self._drop_oldest_token_event()
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _drop_oldest_token_event(self):
+        for index, event in enumerate(self.events):
+            if event["event"] == TOKEN_EVENT:
+                del self.events[index]
+                self._token_events -= 1
+                return
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.time()
+            self.events = [event for event in self.events if event["event"] != TOKEN_EVENT]
+            self._token_events = 0
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self):
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed; its reader is gone
+
+    def expired(self, ttl: float, now: float = None) -> bool:
+        """True once the log is closed and has had no reader for `ttl` seconds."""
+        with self._cond:
+            if not self.closed or self.subscribers:
+                return False
+            return (now or time.time()) - max(self.closed_at, self.idle_since) >= ttl
+
+    def follow(self, start: int = 0, heartbeat: float = HEARTBEAT_SECONDS):
+        """
+        Yields events from seq `start` as they arrive and returns once the log
+        is closed. Yields None after `heartbeat` seconds without new events.
+        """
+        next_seq = start
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while True:
+                with self._cond:
+                    if next_seq >= self.next_seq and not self.closed:
+                        self._cond.wait(timeout=heartbeat)
+                    pending = self._pending(next_seq)
+                    closed = self.closed
+                if not pending and not closed:
+                    yield None
+                for event in pending:
+                    yield event
+                if closed:
+                    return  # nothing is appended after close()
+                if pending:
+                    next_seq = pending[-1]["seq"] + 1
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+                self.idle_since = time.time()
+
+    async def follow_async(self, start: int = 0, heartbeat: float = HEARTBEAT_SECONDS):
+        """
+        follow() for async callers: waits on an asyncio.Event set by emit() and
+        close(), so an idle reader holds no thread.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        next_seq = start
+        with self._cond:
+            self.subscribers += 1
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    pending = self._pending(next_seq)
+                    closed = self.closed
+                    if not pending and not closed:
+                        # Cleared under the lock: an emit() after this sets it again
+                        waiter[1].clear()
+                if not pending and not closed:
+                    try:
+                        await asyncio.wait_for(waiter[1].wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                for event in pending:
+                    yield event
+                if closed:
+                    return
+                next_seq = pending[-1]["seq"] + 1
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                self.subscribers -= 1
+                self.idle_since = time.time()
+
+    def _pending(self, next_seq):
+        return self.events[bisect.bisect_left(self.events, next_seq, key=lambda e: e["seq"]):]
+
+
+def format_sse(event):
+    """Encodes one event (or a heartbeat for None) in text/event-stream framing."""
+    if event is None:
+        return ": keep-alive\n\n"
+    payload = json.dumps(event, ensure_ascii=False)
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {payload}\n\n"
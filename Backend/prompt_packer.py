@@ -0,0 +1,239 @@
+import os
+import re
+import posixpath
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Token budget for the code of one file inside a per-file prompt
+FILE_CODE_TOKEN_BUDGET = int(os.getenv("FILE_CODE_TOKEN_BUDGET", "800"))
+# Token budget for all file material inside a whole-project prompt
+PROJECT_PROMPT_TOKEN_BUDGET = int(os.getenv("PROJECT_PROMPT_TOKEN_BUDGET", "60000"))
+
+ENTRY_POINT_NAMES = {
+    "main.py", "__main__.py", "app.py", "manage.py", "server.py", "running.py", "setup.py",
+    "index.js", "main.js", "server.js", "app.js", "main.go", "main.c", "main.cpp", "Main.java",
+}
+ENTRY_POINT_MARKERS = ("__name__ == \"__main__\"", "__name__ == '__main__'", "FastAPI(", "Flask(",
+                       "public static void main", "func main(", "int main(")
+DECLARATION_LINE = re.compile(
+    r"^\s*(export\s+)?(default\s+)?(public|private|protected|static|abstract|async|function|class|"
+    r"interface|def|func|fn|struct|enum|type|module|package)\b"
+)
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+# ------------------------------------------------------------------
+# Token Counting
+# ------------------------------------------------------------------
+def count_tokens(text: str) -> int:
+    """
+    Local approximation of a BPE tokenizer: each punctuation mark is one token
+    and each word costs one token per ~4 characters.
+    """
+    total = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        total += (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == "_" else 1
+    return total
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Keeps whole lines from the start of text while they fit the budget."""
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+# ------------------------------------------------------------------
+# Per-file Material
+# ------------------------------------------------------------------
+def outline_source(node, source: str) -> str:
+    """Signatures and docstrings first: from the symbol table when present, else declaration lines."""
+    symbols = node.get("symbols") or node.get("analysis", {}).get("symbols")
+    if not symbols:
+        return "\n".join(line.rstrip() for line in source.splitlines() if DECLARATION_LINE.match(line))
+
+    lines = []
+
+    def add(signature, doc, indent=""):
+        lines.append(f"{indent}{signature}")
+        if doc:
+            lines.append(f'{indent}    """{doc.splitlines()[0]}"""')
+
+    def span(record):
+        record_lines = record.get("lines")
+        return f"  # lines {record_lines[0]}-{record_lines[1]}" if record_lines else ""
+
+    for cls in symbols.get("classes", []):
+        bases = f"({', '.join(cls['bases'])})" if cls.get("bases") else ""
+        add(f"class {cls['name']}{bases}:{span(cls)}", cls.get("doc"))
+        for method in cls.get("methods", []):
+            prefix = "async def" if method.get("async") else "def"
+            add(f"{prefix} {method['name']}({', '.join(method.get('args', []))})", method.get("doc"), "    ")
+    for func in symbols.get("functions", []):
+        prefix = "async def" if func.get("async") else "def"
+        add(f"{prefix} {func['name']}({', '.join(func.get('args', []))}):{span(func)}", func.get("doc"))
+    return "\n".join(lines)
+
+
+def pack_source(node, source: str, budget: int = FILE_CODE_TOKEN_BUDGET) -> str:
+    """
+    Code material for one file within `budget` tokens: the whole file when it
+    fits, otherwise its outline (signatures + docstrings) followed by as much
+    of the body as still fits.
+    """
+    if count_tokens(source) <= budget:
+        return source
+
+    # Reserve a few tokens for the two section headings
+    outline = truncate_to_tokens(outline_source(node, source), budget - 16)
+    remaining = budget - 16 - count_tokens(outline)
+    body = truncate_to_tokens(source, remaining) if remaining > 0 else ""
+
+    parts = []
+    if outline:
+        parts.append(f"# Outline (signatures and docstrings)\n{outline}")
+    if body:
+        parts.append(f"# Source (truncated)\n{body}")
+    return "\n\n".join(parts)
+
+
+# ------------------------------------------------------------------
+# Importance Ranking
+# ------------------------------------------------------------------
+def module_keys(path):
+    """Names other files may use to import `path` (dotted module names, path stems)."""
+    stem, _ = posixpath.splitext(path)
+    parts = stem.split("/")
+    if parts[-1] in ("__init__", "index"):
+        parts = parts[:-1]
+    keys = {".".join(parts[i:]) for i in range(len(parts))}
+    keys |= {"/".join(parts[i:]) for i in range(len(parts))}
+    keys.discard("")
+    return keys
+
+
+def import_targets(path, imports):
+    """Normalises Python/Java/JS import strings to keys comparable with module_keys."""
+    package = posixpath.dirname(path)
+    targets = set()
+    for raw in imports or []:
+        quoted = re.search(r"['\"]([^'\"]+)['\"]", raw)
+        if quoted:  # JS: import ... from './x' / require('./x')
+            target = quoted.group(1)
+            if target.startswith("."):
+                target = posixpath.normpath(posixpath.join(package, target))
+            targets.add(posixpath.splitext(target)[0].lstrip("./"))
+            continue
+        if raw.startswith("."):  # Python relative import
+            level = len(raw) - len(raw.lstrip("."))
+            base = package.split("/") if package else []
+            base = base[: len(base) - (level - 1)] if level > 1 else base
+            name = raw.lstrip(".")
+            targets.add(".".join([p for p in base if p] + ([name] if name else [])))
+            continue
+        targets.add(raw)
+        if "." in raw:  # `import pkg.mod.Name` may refer to module pkg.mod
+            targets.add(raw.rsplit(".", 1)[0])
+    return targets
+
+
+def is_entry_point(path, source=""):
+    return posixpath.basename(path) in ENTRY_POINT_NAMES or any(m in source for m in ENTRY_POINT_MARKERS)
+
+
+def rank_files(entries):
+    """
+    Orders entries ({"path", "node", "source"}) by importance:
+    import in-degree, then entry-point status, then class count, then size.
+    Entries without "source" may carry precomputed "entry_point" and "size" instead.
+    Returns a new list, most important first; each entry gains a "score".
+    """
+    owners = {}
+    for entry in entries:
+        for key in module_keys(entry["path"]):
+            owners.setdefault(key, set()).add(entry["path"])
+
+    in_degree = {entry["path"]: 0 for entry in entries}
+    for entry in entries:
+        imports = entry["node"].get("imports") or entry["node"].get("analysis", {}).get("imports")
+        hit = set()
+        for target in import_targets(entry["path"], imports):
+            hit |= owners.get(target, set())
+        for path in hit - {entry["path"]}:
+            in_degree[path] += 1
+
+    for entry in entries:
+        node = entry["node"]
+        classes = node.get("classes_count", node.get("analysis", {}).get("classes", 0)) or 0
+        source = entry.get("source", "")
+        entry_point = entry["entry_point"] if "entry_point" in entry else is_entry_point(entry["path"], source)
+        size = entry["size"] if "size" in entry else len(source)
+        entry["score"] = (
+            3.0 * in_degree[entry["path"]]
+            + (5.0 if entry_point else 0.0)
+            + 1.0 * classes
+            + min(size / 20000.0, 1.0)
+        )
+    return sorted(entries, key=lambda e: (-e["score"], e["path"]))
+
+
+# ------------------------------------------------------------------
+# Multi-file Packing
+# ------------------------------------------------------------------
+def pack_files(entries, budget: int = PROJECT_PROMPT_TOKEN_BUDGET, header=None, source_loader=None):
+    """
+    Fills `budget` tokens with the most valuable material across files:
+      1. a header and outline for every file, in importance order
+      2. source bodies, again in importance order, while room remains
+    header(entry) returns the metadata line(s) for a file.
+    source_loader(entry) returns the source of entries without a "source" key,
+    so callers need not hold every file in memory; it is only called when the
+    source is needed (outlines without symbols, bodies while room remains).
+    Returns the packed text.
+    """
+    header = header or (lambda entry: f"Filename: {entry['path']}")
+
+    def source_of(entry):
+        if "source" in entry:
+            return entry["source"]
+        return source_loader(entry) if source_loader else ""
+
+    ranked = rank_files(entries)
+    used = 0
+    sections = {}
+
+    for entry in ranked:
+        text = header(entry)
+        node = entry["node"]
+        has_symbols = node.get("symbols") or node.get("analysis", {}).get("symbols")
+        outline = outline_source(node, "" if has_symbols else source_of(entry))
+        if outline:
+            text += f"\nOutline:\n{outline}"
+        cost = count_tokens(text)
+        if used + cost > budget:
+            text = truncate_to_tokens(text, budget - used)
+            cost = count_tokens(text)
+        if not text:
+            break
+        sections[entry["path"]] = text
+        used += cost
+
+    for entry in ranked:
+        if entry["path"] not in sections:
+            continue
+        remaining = budget - used
+        if remaining < 50:
+            break
+        body = truncate_to_tokens(source_of(entry), remaining - 10)
+        if body:
+            sections[entry["path"]] += f"\nCode:\n{body}"
+            used += count_tokens(body) + 10
+
+    return "\n\n".join(sections[e["path"]] for e in ranked if e["path"] in sections)
@@ -0,0 +1,134 @@
+import ast
+
+# Docstrings are kept short in the analysis tree; prompts only need the gist.
+DOCSTRING_MAX_CHARS = 300
+
+
+def _short_doc(node):
+    doc = ast.get_docstring(node)
+    if not doc:
+        return None
+    return doc[:DOCSTRING_MAX_CHARS]
+
+
+class PythonSymbolVisitor(ast.NodeVisitor):
+    """
+    Collects counts, imports and a compact symbol table in one traversal:
+      - classes: name, bases, decorators, line span, docstring, methods and
+        typed fields (`x: Foo` in the body, `self.x = Foo(...)` /
+        `self.x: Foo = ...` in methods) used for composition edges
+      - functions: module-level functions with the same fields
+    """
+
+    def __init__(self):
+        self.class_count = 0
+        self.func_count = 0
+        self.imports = []
+        self.classes = []
+        self.functions = []
+        self._scope = []  # enclosing ("class", record) / ("function", owning class record or None)
+
+    # ---------------- imports ----------------
+    def visit_Import(self, node):
+        self.imports.extend(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node):
+        self.imports.append("." * node.level + (node.module or ""))
+
+    # ---------------- definitions ----------------
+    def _qualname(self, name):
+        owners = [record["name"] for kind, record in self._scope if kind == "class"]
+        return ".".join(owners[-1:] + [name]) if owners else name
+
+    def visit_ClassDef(self, node):
+        self.class_count += 1
+        record = {
+            "name": self._qualname(node.name),
+            "bases": [ast.unparse(b) for b in node.bases],
+            "decorators": [ast.unparse(d) for d in node.decorator_list],
+            "lines": [node.lineno, node.end_lineno],
+            "doc": _short_doc(node),
+            "methods": [],
+            "fields": [],
+        }
+        self.classes.append(record)
+
+        self._scope.append(("class", record))
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def _visit_function(self, node, is_async):
+        self.func_count += 1
+        record = {
+            "name": node.name,
+            "args": [a.arg for a in node.args.posonlyargs + node.args.args + node.args.kwonlyargs],
+            "decorators": [ast.unparse(d) for d in node.decorator_list],
+            "lines": [node.lineno, node.end_lineno],
+            "doc": _short_doc(node),
+        }
+        if is_async:
+            record["async"] = True
+
+        owner = None
+        if not self._scope:
+            self.functions.append(record)
+        elif self._scope[-1][0] == "class":
+            owner = self._scope[-1][1]
+            owner["methods"].append(record)
+
+        self._scope.append(("function", owner))
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def visit_FunctionDef(self, node):
+        self._visit_function(node, is_async=False)
+
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_function(node, is_async=True)
+
+    # ---------------- fields ----------------
+    def _add_field(self, record, name, type_name):
+        if type_name and all(field["name"] != name for field in record["fields"]):
+            record["fields"].append({"name": name, "type": type_name})
+
+    def _self_attribute(self, target):
+        """Returns (class record, attribute) for `self.x` targets inside a method body."""
+        if not self._scope or self._scope[-1][0] != "function" or self._scope[-1][1] is None:
+            return None, None
+        if (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                and target.value.id == "self"):
+            return self._scope[-1][1], target.attr
+        return None, None
+
+    def visit_Assign(self, node):
+        # Only constructor-looking calls (`Foo(...)`, `mod.Foo(...)`), not max()/time.time()
+        if isinstance(node.value, ast.Call):
+            callee = ast.unparse(node.value.func)
+            if callee.rsplit(".", 1)[-1][:1].isupper():
+                for target in node.targets:
+                    record, attr = self._self_attribute(target)
+                    if record is not None:
+                        self._add_field(record, attr, callee)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        if self._scope and self._scope[-1][0] == "class" and isinstance(node.target, ast.Name):
+            self._add_field(self._scope[-1][1], node.target.id, ast.unparse(node.annotation))
+        else:
+            record, attr = self._self_attribute(node.target)
+            if record is not None:
+                self._add_field(record, attr, ast.unparse(node.annotation))
+        self.generic_visit(node)
+
+
+def extract_python_symbols(tree):
+    """Runs PythonSymbolVisitor over a parsed module and returns its results."""
+    visitor = PythonSymbolVisitor()
+    visitor.visit(tree)
+    return {
+        "classes_count": visitor.class_count,
+        "functions_count": visitor.func_count,
+        "imports": visitor.imports,
+        "has_docstrings": ast.get_docstring(tree) is not None,
+        "symbols": {"classes": visitor.classes, "functions": visitor.functions},
+    }
@@ -0,0 +1,173 @@
+import os
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# One directory walker for every tree this project builds (code analysis,
+# repository metadata, file lists). It is iterative (no recursion limit on deep
+# checkouts) and uses os.scandir, whose DirEntry objects carry the file type
+# from the directory listing itself, so telling folders from files costs no
+# extra stat() call per entry.
+EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
+
+# Analyzer registry: extension (lower case, no dot) -> (language, analyzer(path) -> dict | None)
+ANALYZERS = {}
+
+
+# ------------------------------------------------------------------
+# Analyzer Registry
+# ------------------------------------------------------------------
+def register_analyzer(extensions, language, analyzer, registry=None):
+    """Registers `analyzer` for every extension in `extensions` (e.g. ["py"] or ["c", "h"])."""
+    registry = ANALYZERS if registry is None else registry
+    for ext in extensions:
+        registry[ext.lstrip(".").lower()] = (language, analyzer)
+
+
+def file_extension(name):
+    return os.path.splitext(name)[1].lstrip(".").lower()
+
+
+def get_analyzer(name, registry=None):
+    """Returns (language, analyzer) for a file name, or (None, None) if nothing handles it."""
+    registry = ANALYZERS if registry is None else registry
+    return registry.get(file_extension(name), (None, None))
+
+
+# ------------------------------------------------------------------
+# Walker
+# ------------------------------------------------------------------
+def walk_repo(root_path, exclude=EXCLUDE_FOLDERS):
+    """
+    Yields (rel_path, depth, is_dir, entry) in pre-order, children sorted by
+    name like sorted(os.listdir()). `entry` is the os.DirEntry (None for the
+    root) and can be asked for stat() without another lookup on Windows.
+    Folders named in `exclude` are skipped together with their contents.
+    """
+    if os.path.basename(root_path) in exclude:
+        return
+    stack = [(root_path, ".", 0, None)]
+    while stack:
+        path, rel_path, depth, entry = stack.pop()
+        is_dir = entry is None or entry.is_dir()
+        yield rel_path, depth, is_dir, entry
+        if not is_dir:
+            continue
+
+        try:
+            with os.scandir(path) as it:
+                children = sorted(it, key=lambda child: child.name)
+        except OSError as e:
+            print(f"[!] Error reading directory {path}: {e}")
+            continue
+
+        prefix = "" if rel_path == "." else rel_path + "/"
+        for child in reversed(children):
+            if child.name in exclude and child.is_dir():
+                continue
+            stack.append((child.path, prefix + child.name, depth + 1, child))
+
+
+def folder_record(root_path, rel_path, depth, entry):
+    name = os.path.basename(root_path) if entry is None else entry.name
+    return {"name": name, "path": rel_path, "type": "folder", "depth": depth}
+
+
+def iter_repo_records(root_path, file_record, exclude=EXCLUDE_FOLDERS):
+    """
+    Streams tree nodes without "children" (the record format of
+    github_repo/saving.py). file_record(entry, rel_path, depth) returns the
+    file's node, or None to leave the file out.
+    """
+    for rel_path, depth, is_dir, entry in walk_repo(root_path, exclude):
+        if is_dir:
+            yield folder_record(root_path, rel_path, depth, entry)
+        else:
+            record = file_record(entry, rel_path, depth)
+            if record is not None:
+                yield record
+
+
+# ------------------------------------------------------------------
+# Tree Assembly
+# ------------------------------------------------------------------
+class TreeBuilder:
+    """
+    Nests pre-order records back into the folder/file tree. Folders named in
+    `exclude` are dropped with everything below them, so one walk can feed trees
+    that exclude different folders.
+    """
+
+    def __init__(self, exclude=()):
+        self.root = None
+        self.exclude = set(exclude)
+        self._folders = []  # open folder at each depth
+        self._skip_depth = None
+
+    def add(self, record):
+        depth = record["depth"]
+        if self._skip_depth is not None:
+            if depth > self._skip_depth:
+                return
+            self._skip_depth = None
+
+        if record["type"] == "folder":
+            if record["name"] in self.exclude:
+                self._skip_depth = depth
+                return
+            record = dict(record, children=[])
+
+        del self._folders[depth:]
+        if self._folders:
+            self._folders[-1]["children"].append(record)
+        elif depth == 0:
+            self.root = record
+        if record["type"] == "folder":
+            self._folders.append(record)
+
+
+def build_tree(root_path, file_record, exclude=EXCLUDE_FOLDERS):
+    """Nested tree for one file_record builder; None when the root itself is excluded."""
+    return build_trees(root_path, {"tree": file_record}, exclude)["tree"]
+
+
+def build_trees(root_path, file_records, exclude=EXCLUDE_FOLDERS, prune=None):
+    """
+    Builds several trees from a single filesystem pass.
+    file_records maps a tree name to its file_record(entry, rel_path, depth)
+    builder; prune optionally maps a tree name to extra folder names left out
+    of that tree only. Returns {name: tree or None}.
+    """
+    builders = {name: TreeBuilder((prune or {}).get(name, ())) for name in file_records}
+    for rel_path, depth, is_dir, entry in walk_repo(root_path, exclude):
+        if is_dir:
+            record = folder_record(root_path, rel_path, depth, entry)
+            for builder in builders.values():
+                builder.add(record)
+            continue
+        for name, file_record in file_records.items():
+            node = file_record(entry, rel_path, depth)
+            if node is not None:
+                builders[name].add(node)
+    return {name: builder.root for name, builder in builders.items()}
+
+
+# ------------------------------------------------------------------
+# File Builders
+# ------------------------------------------------------------------
+def analysis_file_record(analyze=None, registry=None):
+    """
+    File builder for code-analysis trees. Files without a registered analyzer
+    are skipped; analyze(path, rel_path, language) replaces the plain analyzer
+    call (e.g. to go through the analysis cache).
+    """
+    def file_record(entry, rel_path, depth):
+        language, analyzer = get_analyzer(entry.name, registry)
+        if language is None:
+            return None
+        analysis = analyze(entry.path, rel_path, language) if analyze else analyzer(entry.path)
+        if not analysis:
+            return None
+        return {"name": entry.name, "path": rel_path, "type": "file", "depth": depth, **analysis}
+
+    return file_record
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from mirror_store import normalize_repo_url
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Finished pipeline runs are kept in one SQLite file, keyed by repository,
+# commit and pipeline version: the final markdown, the analysis tree, per-file
+# summaries and the UML diagrams (sources and rendered images). A request for a
+# repo@commit that was already documented is answered from here without
+# cloning or calling the LLM. Artifacts are stored zlib-compressed.
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", r"P:\AI_Documentation\example\cache\results.sqlite3")
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Artifact kinds
+MARKDOWN = "markdown"
+ANALYSIS = "analysis"
+FILE_SUMMARY = "file_summary"
+DIAGRAM = "diagram"
+DIAGRAM_IMAGE = "diagram_image"
+
+_RUN_COLUMNS = ("id", "repo", "git_url", "commit_sha", "version", "created", "last_access", "size", "meta")
+
+
+# ------------------------------------------------------------------
+# Store
+# ------------------------------------------------------------------
+class ResultStore:
+    """Runs (one row per repo/commit/version) and their artifacts (kind, name, data)."""
+
+    def __init__(self, path: str = RESULT_STORE_PATH, max_bytes: int = RESULT_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, repo TEXT, git_url TEXT, commit_sha TEXT,"
+                " version TEXT, created REAL, last_access REAL, size INTEGER, meta TEXT,"
+                " UNIQUE (repo, commit_sha, version))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs(repo, created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_lru ON runs(last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE, kind TEXT, name TEXT,"
+                " data BLOB, size INTEGER, PRIMARY KEY (run_id, kind, name))"
+            )
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _row(row):
+        run = dict(zip(_RUN_COLUMNS, row))
+        run["meta"] = json.loads(run["meta"]) if run["meta"] else {}
+        return run
+
+    # ---------------- writing ----------------
+    def save(self, git_url: str, commit: str, version: str, meta: dict, artifacts) -> int:
+        """
+        Stores a finished run, replacing an earlier one with the same key.
+        artifacts is an iterable of (kind, name, str | bytes). Returns the run id.
+        """
+        now = time.time()
+        rows = []
+        for kind, name, data in artifacts:
+            raw = data.encode("utf-8") if isinstance(data, str) else data
+            rows.append((kind, name, zlib.compress(raw), len(raw)))
+        size = sum(len(blob) for _, _, blob, _ in rows)
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                repo = normalize_repo_url(git_url)
+                conn.execute("DELETE FROM runs WHERE repo = ? AND commit_sha = ? AND version = ?",
+                             (repo, commit, version))
+                run_id = conn.execute(
+                    "INSERT INTO runs (repo, git_url, commit_sha, version, created, last_access, size, meta)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (repo, git_url, commit, version, now, now, size, json.dumps(meta, default=str)),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT OR REPLACE INTO artifacts (run_id, kind, name, data, size) VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, kind, name, blob, raw_size) for kind, name, blob, raw_size in rows],
+                )
+                self._evict(conn, keep=run_id)
+                conn.commit()
+                return run_id
+            finally:
+                conn.close()
+
+    def _evict(self, conn, keep):
+        """Drops least-recently-used runs until the store fits max_bytes again."""
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM runs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for run_id, size in conn.execute("SELECT id, size FROM runs ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            if run_id == keep:
+                continue
+            conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            total -= size
+            print(f"[-] Evicted stored result {run_id}")
+
+    # ---------------- reading ----------------
+    def find(self, git_url: str, commit: str, version: str):
+        """The stored run for repo@commit and version, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs WHERE repo = ? AND commit_sha = ? AND version = ?",
+                (normalize_repo_url(git_url), commit, version),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE runs SET last_access = ? WHERE id = ?", (time.time(), row[0]))
+            conn.commit()
+            return self._row(row)
+        finally:
+            conn.close()
+
+    def get(self, run_id: int):
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs WHERE id = ?", (run_id,)).fetchone()
+            return self._row(row) if row else None
+        finally:
+            conn.close()
+
+    def artifact(self, run_id: int, kind: str, name: str):
+        """Decompressed artifact bytes, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT data FROM artifacts WHERE run_id = ? AND kind = ? AND name = ?", (run_id, kind, name)
+            ).fetchone()
+            return zlib.decompress(row[0]) if row else None
+        finally:
+            conn.close()
+
+    def artifact_names(self, run_id: int, kind: str = None) -> list:
+        """[{"kind", "name", "size"}] of a run, optionally of one kind only."""
+        conn = self._connect()
+        try:
+            query = "SELECT kind, name, size FROM artifacts WHERE run_id = ?"
+            params = [run_id]
+            if kind:
+                query += " AND kind = ?"
+                params.append(kind)
+            rows = conn.execute(query + " ORDER BY kind, name", params).fetchall()
+            return [{"kind": k, "name": n, "size": s} for k, n, s in rows]
+        finally:
+            conn.close()
+
+    # ---------------- index ----------------
+    def list_runs(self, git_url: str = None, limit: int = 50, offset: int = 0) -> dict:
+        """Newest runs first, optionally for one repository: {"total", "runs"}."""
+        where, params = "", []
+        if git_url:
+            where, params = " WHERE repo = ?", [normalize_repo_url(git_url)]
+        conn = self._connect()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM runs{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs{where} ORDER BY created DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+            return {"total": total, "runs": [self._row(row) for row in rows]}
+        finally:
+            conn.close()
+
+    def purge(self, git_url: str = None, commit: str = None, older_than: float = None, version: str = None) -> int:
+        """Deletes the runs matching every given filter (all runs if none). Returns how many were deleted."""
+        clauses, params = [], []
+        if git_url:
+            clauses.append("repo = ?")
+            params.append(normalize_repo_url(git_url))
+        if commit:
+            clauses.append("commit_sha = ?")
+            params.append(commit)
+        if older_than is not None:
+            clauses.append("created < ?")
+            params.append(time.time() - older_than)
+        if version:
+            clauses.append("version = ?")
+            params.append(version)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            conn = self._connect()
+            try:
+                deleted = conn.execute(f"DELETE FROM runs{where}", params).rowcount
+                conn.commit()
+                return deleted
+            finally:
+                conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Process-wide store shared by the pipeline and the result endpoints."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
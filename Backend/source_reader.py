@@ -0,0 +1,79 @@
+import os
+import mmap
+import codecs
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Generated files (minified JS, huge headers, data-heavy HTML) can be tens of
+# MB. Analyzers only parse files up to SOURCE_MAX_BYTES; larger ones are line
+# counted over an mmap without being decoded, and only a prefix is ever read.
+SOURCE_MAX_BYTES = int(os.getenv("SOURCE_MAX_BYTES", str(2 * 1024 * 1024)))
+BINARY_SNIFF_BYTES = 8192
+# A sample with more than this share of control bytes is treated as binary
+BINARY_CONTROL_RATIO = 0.3
+LINE_COUNT_CHUNK = 1024 * 1024
+
+# Bytes that may appear in text: printable ASCII, common whitespace/escapes and all of UTF-8's high bytes
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x7F)) | set(range(0x80, 0x100)))
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def is_binary(sample: bytes) -> bool:
+    """NUL bytes or a high share of control characters in the first bytes mean binary."""
+    if not sample:
+        return False
+    sample = sample[:BINARY_SNIFF_BYTES]
+    if b"\0" in sample:
+        return True
+    return len(sample.translate(None, _TEXT_BYTES)) / len(sample) > BINARY_CONTROL_RATIO
+
+
+def _lines_in(data) -> int:
+    """Same result as len(text.splitlines()) for \\n and \\r\\n line endings."""
+    if not data:
+        return 0
+    return data.count(b"\n") + (0 if data[-1:] == b"\n" else 1)
+
+
+def count_lines(path: str) -> int:
+    """Counts lines over an mmap in fixed-size windows; the file is never decoded or read whole."""
+    if os.path.getsize(path) == 0:
+        return 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        lines = 0
+        for start in range(0, len(view), LINE_COUNT_CHUNK):
+            lines += view[start:start + LINE_COUNT_CHUNK].count(b"\n")
+        return lines + (0 if view[-1:] == b"\n" else 1)
+
+
+# ------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------
+def read_source(path: str, max_bytes: int = SOURCE_MAX_BYTES, errors: str = "strict", with_lines: bool = True) -> dict:
+    """
+    Reads at most max_bytes of a file. Returns
+      text:      decoded UTF-8 prefix (None for binary files)
+      size:      file size in bytes
+      lines:     line count of the whole file (None unless with_lines)
+      binary:    True when the content sniffs as binary
+      truncated: True when the file is larger than max_bytes
+    errors="strict" raises UnicodeDecodeError like open(..., encoding="utf-8").
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data = f.read(min(size, max_bytes))
+    truncated = size > len(data)
+    binary = is_binary(data)
+
+    lines = None
+    if with_lines:
+        lines = count_lines(path) if truncated else _lines_in(data)
+
+    text = None
+    if not binary:
+        # A multi-byte character cut at the prefix boundary is dropped, not replaced
+        text = codecs.getincrementaldecoder("utf-8")(errors).decode(data, final=not truncated)
+    return {"text": text, "size": size, "lines": lines, "binary": binary, "truncated": truncated}
@@ -0,0 +1,159 @@
+import os
+import re
+import ast
+import json
+
+from llm_cache import generate_cached
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# Structured (JSON) answers let one request return several fields. Models do
+# not always comply exactly, so responses are parsed tolerantly (code fences,
+# surrounding prose, trailing commas, Python-style dicts), validated against
+# the expected fields, and a malformed answer is sent back once for repair.
+STRUCTURED_REPAIR_RETRIES = int(os.getenv("STRUCTURED_REPAIR_RETRIES", "1"))
+# Asks Gemini for a JSON body; part of the llm_cache key like any other setting
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# A fence only counts when it wraps the whole answer: fences inside JSON
+# string values (usage examples in a summary) are part of the content
+_FENCED = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S | re.I)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class StructuredOutputError(ValueError):
+    """The model's answer is not a usable JSON object, even after repair."""
+
+    def __init__(self, message, raw=None):
+        super().__init__(message)
+        self.raw = raw
+
+
+# ------------------------------------------------------------------
+# Parsing / Validation
+# ------------------------------------------------------------------
+def parse_json_object(text: str) -> dict:
+    """Extracts the first JSON object from a model answer. Raises ValueError if there is none."""
+    text = (text or "").strip()
+    try:
+        data = json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return data
+
+    fenced = _FENCED.fullmatch(text)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in the answer")
+    candidate = text[start:end + 1]
+
+    error = None
+    # strict=False accepts raw newlines inside strings, which models often emit
+    for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+        try:
+            data = json.loads(attempt, strict=False)
+            break
+        except json.JSONDecodeError as e:
+            error = e
+    else:
+        try:
+            data = ast.literal_eval(candidate)  # {'summary': '...'} with single quotes
+        except (ValueError, SyntaxError):
+            raise ValueError(f"invalid JSON: {error}")
+    if not isinstance(data, dict):
+        raise ValueError("the answer is not a JSON object")
+    return data
+
+
+def validate_fields(data: dict, fields: dict, required=()) -> dict:
+    """
+    Checks data against fields ({name: str | dict | list}) and returns only
+    those fields. Missing optional fields get an empty value; a dict field also
+    accepts the list form [{"symbol": ..., "docstring": ...}]. Raises ValueError.
+    """
+    result = {}
+    for name, kind in fields.items():
+        value = data.get(name)
+        if value is None:
+            if name in required:
+                raise ValueError(f'missing field "{name}"')
+            value = kind()
+        if kind is dict and isinstance(value, list):
+            value = {
+                str(item.get("symbol") or item.get("name")): item.get("docstring") or item.get("doc")
+                for item in value if isinstance(item, dict) and (item.get("symbol") or item.get("name"))
+            }
+        if kind is str and isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False, indent=2)
+        if not isinstance(value, kind):
+            raise ValueError(f'field "{name}" must be a {kind.__name__}, got {type(value).__name__}')
+        if kind is dict:
+            value = {str(k): str(v) for k, v in value.items() if v}
+        if kind is str and name in required and not value.strip():
+            raise ValueError(f'field "{name}" is empty')
+        result[name] = value
+    return result
+
+
+def build_repair_prompt(prompt: str, answer: str, error: str) -> str:
+    return (
+        f"{prompt}\n\n"
+        "Your previous answer could not be used:\n"
+        f"{error}\n\n"
+        "Previous answer:\n"
+        f"{answer[:4000]}\n\n"
+        "Reply again with only the corrected JSON object: no prose, no code fences."
+    )
+
+
+# ------------------------------------------------------------------
+# Generation
+# ------------------------------------------------------------------
+def _check(answer, fields, required):
+    try:
+        return validate_fields(parse_json_object(answer), fields, required), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def _acceptor(fields, required):
+    """Only answers that parse and validate are cached, so a malformed one is asked for again next time."""
+    return lambda answer: _check(answer, fields, required)[0] is not None
+
+
+def generate_structured(model, prompt: str, fields: dict, required=(), retries: int = STRUCTURED_REPAIR_RETRIES) -> dict:
+    """generate_cached() for a JSON answer; raises StructuredOutputError when repair fails too."""
+    accept = _acceptor(fields, required)
+    answer = generate_cached(model, prompt, JSON_GENERATION_CONFIG, accept=accept)
+    result, error = _check(answer, fields, required)
+    for _ in range(retries):
+        if result is not None:
+            break
+        print(f"[!] Malformed structured answer ({error}); asking for a repair")
+        answer = generate_cached(model, build_repair_prompt(prompt, answer, error), JSON_GENERATION_CONFIG,
+                                 accept=accept)
+        result, error = _check(answer, fields, required)
+    if result is None:
+        raise StructuredOutputError(error, answer)
+    return result
+
+
+async def generate_structured_async(engine, prompt: str, fields: dict, required=(),
+                                    retries: int = STRUCTURED_REPAIR_RETRIES) -> dict:
+    """generate_structured() through an LLMEngine (rate limits, retries on 429, cache)."""
+    accept = _acceptor(fields, required)
+    answer = await engine.generate(prompt, JSON_GENERATION_CONFIG, accept)
+    result, error = _check(answer, fields, required)
+    for _ in range(retries):
+        if result is not None:
+            break
+        print(f"[!] Malformed structured answer ({error}); asking for a repair")
+        answer = await engine.generate(build_repair_prompt(prompt, answer, error), JSON_GENERATION_CONFIG, accept)
+        result, error = _check(answer, fields, required)
+    if result is None:
+        raise StructuredOutputError(error, answer)
+    return result
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+# ------------------------------------------------------------------
+# Test Environment
+# ------------------------------------------------------------------
+# The modules read their paths from the environment at import time, so point
+# every store at a scratch directory and use the offline LLM backend before
+# anything from Backend/ is imported.
+_SCRATCH = tempfile.mkdtemp(prefix="ai_doc_tests_")
+
+for name, value in {
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_LATENCY": "0",
+    "FAKE_LLM_TOKENS_PER_SEC": "0",
+    "ANALYSIS_CACHE_DIR": os.path.join(_SCRATCH, "analysis_cache"),
+    "LLM_CACHE_PATH": os.path.join(_SCRATCH, "llm_cache.sqlite3"),
+    "MIRROR_ROOT": os.path.join(_SCRATCH, "mirrors"),
+    # Tests mirror local repositories; test_mirror_store checks the default (off)
+    "ALLOW_FILE_REMOTES": "1",
+    "WORKSPACE_ROOT": os.path.join(_SCRATCH, "workspaces"),
+    "JOBS_DIR": os.path.join(_SCRATCH, "jobs"),
+    "DOC_STATE_DIR": os.path.join(_SCRATCH, "doc_state"),
+    "RESULT_STORE_PATH": os.path.join(_SCRATCH, "results.sqlite3"),
+    "UML_OUTPUT_DIR": os.path.join(_SCRATCH, "uml"),
+    "BASE_CLONE_DIR": os.path.join(_SCRATCH, "clone"),
+    "OUTPUT_MD": os.path.join(_SCRATCH, "FULL_PROJECT_DOC.md"),
+}.items():
+    os.environ[name] = value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
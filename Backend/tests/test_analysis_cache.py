@@ -0,0 +1,73 @@
+import os
+import json
+import subprocess
+
+import analysis_cache
+from analysis_cache import AnalysisCache, git_blob_sha, list_blob_shas
+
+
+def test_blob_sha_matches_git(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / "a.py").write_bytes(b"print('hi')\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.txt").write_bytes(b"")
+    subprocess.run(["git", "-C", str(tmp_path), "add", "."], check=True)
+
+    shas = list_blob_shas(str(tmp_path))
+    assert shas == {
+        "a.py": git_blob_sha(b"print('hi')\n"),
+        "sub/b.txt": git_blob_sha(b""),
+    }
+    expected = subprocess.run(["git", "hash-object", str(tmp_path / "a.py")], capture_output=True, text=True)
+    assert shas["a.py"] == expected.stdout.strip()
+    assert list_blob_shas(str(tmp_path / "missing")) == {}
+
+
+def test_key_changes_with_content_version_and_language():
+    key = AnalysisCache.make_key("abc", "1", "python")
+    assert key == AnalysisCache.make_key("abc", "1", "python")
+    assert len({key, AnalysisCache.make_key("abd", "1", "python"), AnalysisCache.make_key("abc", "2", "python"),
+                AnalysisCache.make_key("abc", "1", "java")}) == 4
+
+
+def test_round_trip_and_failures_are_not_cached(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    key = AnalysisCache.make_key("sha", "1", "python")
+    assert cache.get(key) == (False, None)
+    cache.put(key, {"classes": []})
+    assert cache.get(key) == (True, {"classes": []})
+
+    failed = AnalysisCache.make_key("other", "1", "python")
+    cache.put(failed, None)
+    assert cache.get(failed) == (False, None)
+    assert not os.path.exists(cache._entry_path(failed))
+
+    # A failure stored by an older version is retried, not served
+    os.makedirs(os.path.dirname(cache._entry_path(failed)), exist_ok=True)
+    with open(cache._entry_path(failed), "w") as f:
+        json.dump({"result": None}, f)
+    assert cache.get(failed) == (False, None)
+    assert cache.stats()["hits"] == 1
+
+
+def test_directory_is_scanned_once_and_evicts_lru(tmp_path, monkeypatch):
+    scans = []
+    original = AnalysisCache._entries
+
+    def counting(self):
+        scans.append(1)
+        return original(self)
+
+    monkeypatch.setattr(AnalysisCache, "_entries", counting)
+    monkeypatch.setattr(analysis_cache, "_dir_totals", {})
+    for index in range(5):
+        AnalysisCache(str(tmp_path), max_bytes=10_000).put(f"{index:064x}", {"n": index})
+    assert len(scans) == 1
+
+    small = AnalysisCache(str(tmp_path), max_bytes=60)
+    old = small._entry_path(f"{0:064x}")
+    os.utime(old, (1, 1))
+    small.put(f"{9:064x}", {"n": 9})
+    assert not os.path.exists(old)
+    assert small.evictions >= 1
+    assert analysis_cache._dir_totals[os.path.abspath(str(tmp_path))] <= 60
@@ -0,0 +1,44 @@
+import gzip
+import json
+
+import pytest
+
+import analysis_views
+from analysis_views import AnalysisViewCache, choose_encoding, parse_field_list, stream_json
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+])
+def test_choose_encoding_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(analysis_views, "brotli", None)
+    assert choose_encoding(header) == expected
+
+
+def test_parse_field_list():
+    assert parse_field_list(None) is None
+    assert parse_field_list(" ast, symbols ,,") == {"ast", "symbols"}
+
+
+def test_stream_json_round_trips_in_blocks():
+    data = {"files": [{"path": f"f{i}.py", "text": "é" * 50} for i in range(500)]}
+    plain = list(stream_json(data, chunk_bytes=4096))
+    assert len(plain) > 1
+    assert json.loads(b"".join(plain)) == data
+    assert json.loads(gzip.decompress(b"".join(stream_json(data, "gzip", chunk_bytes=4096)))) == data
+
+
+def test_view_cache_is_lru():
+    cache = AnalysisViewCache(size=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None and cache.get("a") == {"n": 1}
@@ -0,0 +1,130 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import mirror_store
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("body", [
+    {"git_url": "--upload-pack=touch /tmp/pwn;"},
+    {"git_url": "ext::sh -c touch% /tmp/pwn"},
+    {"git_url": "https://github.com/owner/repo", "ref": "--upload-pack=touch /tmp/pwn"},
+    {"git_url": "https://github.com/owner/repo", "base_commit": "../../etc/passwd"},
+])
+@pytest.mark.parametrize("endpoint", ["/clone_and_analyze", "/process_repo", "/jobs"])
+def test_unsafe_repo_specs_are_rejected(client, monkeypatch, endpoint, body):
+    def fail(*args, **kwargs):
+        raise AssertionError("unsafe input reached the pipeline")
+
+    monkeypatch.setattr(main, "resolve_remote_commit", fail)
+    monkeypatch.setattr(main, "run_full_pipeline", fail)
+    monkeypatch.setattr(main.job_manager, "submit", fail)
+    assert client.post(endpoint, json=body).status_code == 422
+
+
+@pytest.mark.parametrize("endpoint", ["/clone_and_analyze", "/process_repo", "/jobs"])
+def test_file_remotes_are_rejected_by_default(client, monkeypatch, endpoint):
+    monkeypatch.setattr(mirror_store, "ALLOW_FILE_REMOTES", False)
+    monkeypatch.setattr(main, "run_full_pipeline", lambda *args, **kwargs: pytest.fail("reached the pipeline"))
+    assert client.post(endpoint, json={"git_url": "file:///etc/private-repo"}).status_code == 422
+
+
+def test_purge_requires_a_filter(client, monkeypatch):
+    calls = []
+
+    class Store:
+        def purge(self, *args, **kwargs):
+            calls.append((args, kwargs))
+            return 0
+
+    monkeypatch.setattr(main, "get_result_store", Store)
+    assert client.delete("/results").status_code == 400
+    assert client.delete("/results?older_than_days=30").status_code == 400
+    assert calls == []
+
+    assert client.delete("/results?git_url=https://github.com/owner/repo").status_code == 200
+    assert client.delete("/results?all=true&older_than_days=30").status_code == 200
+    assert calls[1] == ((None, None), {"older_than": 30 * 86400, "version": None})
+
+
+def _tree():
+    def file(path, depth):
+        return {"name": path.rsplit("/", 1)[-1], "path": path, "type": "file", "depth": depth,
+                "language": "python", "lines_of_code": 10, "ast": {"type": "module"}, "symbols": ["f"]}
+
+    return {"name": "repo", "path": ".", "type": "folder", "depth": 0, "children": [
+        file("setup.py", 1),
+        {"name": "pkg", "path": "pkg", "type": "folder", "depth": 1, "children": [
+            file("pkg/a.py", 2),
+            file("pkg/b.py", 2),
+            {"name": "sub", "path": "pkg/sub", "type": "folder", "depth": 2, "children": [file("pkg/sub/c.py", 3)]},
+        ]},
+    ]}
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """/clone_and_analyze over a fixed tree; counts how often the repo is really analysed."""
+    calls = []
+
+    def clone_and_analyze_repo(git_url, clone_dir=None, ref=None):
+        calls.append(ref)
+        return _tree()
+
+    monkeypatch.setattr(main, "resolve_remote_commit", lambda git_url, ref=None: "c" * 40)
+    monkeypatch.setattr(main, "clone_and_analyze_repo", clone_and_analyze_repo)
+    monkeypatch.setattr(main, "analysis_view_cache", main.AnalysisViewCache())
+    return calls
+
+
+BODY = {"git_url": "https://github.com/owner/repo"}
+
+
+def test_default_response_is_the_full_tree(client, analyzed):
+    response = client.post("/clone_and_analyze", json=BODY)
+    assert response.status_code == 200
+    assert response.json()["analysis"] == _tree()
+    assert response.json()["status"] == "success"
+
+
+def test_projection_and_depth(client, analyzed):
+    analysis = client.post("/clone_and_analyze?exclude=ast,symbols", json=BODY).json()["analysis"]
+    setup = analysis["children"][0]
+    assert set(setup) == {"name", "path", "type", "depth", "language", "lines_of_code"}
+
+    analysis = client.post("/clone_and_analyze?fields=lines_of_code&max_depth=1", json=BODY).json()["analysis"]
+    setup, pkg = analysis["children"]
+    assert set(setup) == {"name", "path", "type", "depth", "lines_of_code"}
+    assert pkg["children"] == [] and pkg["truncated"] is True
+
+
+def test_pagination_walks_every_file_once(client, analyzed):
+    paths, offset = [], 0
+    while offset is not None:
+        page = client.post(f"/clone_and_analyze?limit=3&offset={offset}&exclude=ast", json=BODY).json()
+        assert page["total"] == 4 and len(page["files"]) <= 3
+        assert all("ast" not in f for f in page["files"])
+        paths += [f["path"] for f in page["files"]]
+        offset = page["next_offset"]
+    assert paths == ["setup.py", "pkg/a.py", "pkg/b.py", "pkg/sub/c.py"]
+    # Pages of the same repo@commit come from the in-memory tree, not a new clone
+    assert analyzed == ["c" * 40]
+
+    page = client.post("/clone_and_analyze?limit=10&max_depth=2", json=BODY).json()
+    assert [f["path"] for f in page["files"]] == ["setup.py", "pkg/a.py", "pkg/b.py"]
+
+
+def test_response_compression_follows_accept_encoding(client, analyzed):
+    gzipped = client.post("/clone_and_analyze", json=BODY, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in gzipped.headers["vary"]
+    assert gzipped.json()["analysis"] == _tree()
+
+    plain = client.post("/clone_and_analyze", json=BODY, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == gzipped.json()
@@ -0,0 +1,31 @@
+from chunker import chunk_source, needs_chunking, CHUNK_TOKEN_BUDGET
+from prompt_packer import count_tokens, FILE_CODE_TOKEN_BUDGET
+
+
+def _module(functions, body_lines=6):
+    parts = []
+    for index in range(functions):
+        body = "\n".join(f"    value_{n} = compute_{index}_{n}(argument, other_argument)" for n in range(body_lines))
+        parts.append(f"def function_{index}(argument, other_argument):\n{body}\n    return value_0\n")
+    return "\n\n".join(parts)
+
+
+def test_files_within_one_chunk_are_not_chunked():
+    source = _module(12)
+    assert FILE_CODE_TOKEN_BUDGET < count_tokens(source) <= CHUNK_TOKEN_BUDGET
+    assert len(chunk_source(source, "python")) == 1
+    assert not needs_chunking(source)
+
+
+def test_large_files_are_chunked_at_function_boundaries():
+    source = _module(40)
+    assert needs_chunking(source)
+    chunks = chunk_source(source, "python")
+    assert len(chunks) > 1
+
+    # Every line is in exactly one chunk, in order, and chunks start at a def
+    lines = source.splitlines()
+    covered = [n for chunk in chunks for n in range(chunk["lines"][0], chunk["lines"][1] + 1)]
+    assert covered == list(range(1, len(lines) + 1))
+    assert all(chunk["text"].lstrip().startswith("def ") for chunk in chunks)
+    assert all(count_tokens(chunk["text"]) <= CHUNK_TOKEN_BUDGET for chunk in chunks)
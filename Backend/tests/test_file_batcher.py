@@ -0,0 +1,102 @@
+import asyncio
+
+from file_batcher import plan_batches, run_batch
+
+
+def test_plan_batches_respects_budget_and_count():
+    costs = [30, 30, 50, 10, 90, 5, 5, 5]
+    batches = plan_batches(costs, cost=lambda c: c, budget=100, max_items=3)
+    assert batches == [[30, 30], [50, 10], [90, 5, 5], [5]]
+    assert [item for batch in batches for item in batch] == costs
+    # An item over the budget still gets a batch of its own
+    assert plan_batches([150, 10], cost=lambda c: c, budget=100) == [[150], [10]]
+    assert plan_batches([], cost=lambda c: c) == []
+
+
+def _run(items, answer):
+    """Runs run_batch with request() answering via answer(batch); returns (applied, fallbacks, requests)."""
+    applied, fallbacks, requests = {}, [], []
+
+    async def request(batch):
+        requests.append(list(batch))
+        return answer(batch)
+
+    async def fallback(item):
+        fallbacks.append(item)
+
+    asyncio.run(run_batch(items, request, lambda item, result: applied.__setitem__(item, result), fallback,
+                          key=lambda item: item))
+    return applied, fallbacks, requests
+
+
+def test_complete_answer_needs_one_request():
+    applied, fallbacks, requests = _run(list("abcd"), lambda batch: {item: item.upper() for item in batch})
+    assert applied == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert fallbacks == [] and len(requests) == 1
+
+
+def test_missing_items_are_split_and_retried():
+    # The model always drops "c" and "f" from multi-file answers, but answers them alone
+    def answer(batch):
+        if len(batch) == 1:
+            return {batch[0]: batch[0].upper()}
+        return {item: item.upper() for item in batch if item not in "cf"}
+
+    applied, fallbacks, requests = _run(list("abcdef"), answer)
+    assert applied == {item: item.upper() for item in "abde"}
+    # Single leftovers go straight to the per-file fallback
+    assert sorted(fallbacks) == ["c", "f"]
+    assert requests[0] == list("abcdef") and len(requests) == 1
+
+
+def test_failed_request_splits_down_to_fallback():
+    def answer(batch):
+        if len(batch) > 2:
+            raise RuntimeError("context too long")
+        return {batch[0]: "ok"}  # only the first of a pair is answered
+
+    applied, fallbacks, requests = _run(list("abcd"), answer)
+    assert applied == {"a": "ok", "c": "ok"}
+    assert sorted(fallbacks) == ["b", "d"]
+    assert requests[0] == list("abcd")
+
+
+def _load_combined():
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "LLM_analysis_summary"))
+    import analysis_summary_combined
+    return analysis_summary_combined
+
+
+def _file_node(index):
+    return {"name": f"mod{index}.py", "path": f"pkg/mod{index}.py", "type": "file", "lines_of_code": 1,
+            "classes_count": 0, "functions_count": 0, "imports": [], "symbols": [], "has_docstrings": False}
+
+
+def test_batch_answer_keys_are_matched_and_validated():
+    combined = _load_combined()
+    entries = [(_file_node(index), "x = 1\n") for index in range(3)]
+    answer = '{"pkg/mod0.py": {"summary": "s0", "analysis": "a0"}, "mod1.py": {"summary": "s1", "analysis": "a1"},' \
+             ' "pkg/mod2.py": {"summary": ""}}'
+    results = combined.parse_batch_answer(answer, entries, quiet=True)
+    assert sorted(results) == ["pkg/mod0.py", "pkg/mod1.py"]
+    assert results["pkg/mod1.py"]["summary"] == "s1"
+
+
+def test_small_files_go_out_in_one_request():
+    from llm_backend import FakeModel
+    from llm_engine import LLMEngine, RateLimiter
+
+    combined = _load_combined()
+    model = FakeModel(latency=0, tokens_per_sec=0)
+    entries = [(_file_node(index), f"value_{index} = {index}\n") for index in range(5)]
+
+    async def fallback(entry):
+        raise AssertionError("no file should need the single-file path")
+
+    with LLMEngine(model, limiter=RateLimiter(rpm=1e6, tpm=1e9)) as engine:
+        done = asyncio.run(combined.summarize_small_files_async(engine, entries, fallback))
+    assert done == {node["path"] for node, _ in entries}
+    assert all(node["summary"].startswith("Fake summary") for node, _ in entries)
+    assert model.calls == 1
@@ -0,0 +1,97 @@
+import time
+import socket
+import asyncio
+import threading
+
+import pytest
+import uvicorn
+
+import main
+from progress import ProgressLog
+
+WATCHERS = 50  # more than the 40 threads of Starlette's default threadpool
+
+
+def _start_server():
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=0, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(500):
+        if server.started:
+            break
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, port
+
+
+def _request(port, path, timeout=5):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    return sock
+
+
+def _read_until(sock, marker):
+    data = b""
+    while marker not in data:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+@pytest.fixture
+def server(monkeypatch):
+    log = ProgressLog()
+    log.emit("job_started", job_id="job")
+    monkeypatch.setattr(main.job_manager, "progress", lambda job_id: log if job_id == "job" else None)
+    server, thread, port = _start_server()
+    yield port, log
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_idle_watchers_do_not_block_other_endpoints(server):
+    port, log = server
+    watchers = [_request(port, "/jobs/job/events") for _ in range(WATCHERS)]
+    for sock in watchers:
+        assert b"job_started" in _read_until(sock, b"job_started")
+
+    # Every watcher is now idle, waiting for the next event
+    started = time.monotonic()
+    sock = _request(port, "/healthz")
+    assert b'"status":"ok"' in _read_until(sock, b"}")
+    assert time.monotonic() - started < 2
+    sock.close()
+
+    log.emit("stage_started", stage="clone")
+    log.close()
+    for sock in watchers:
+        data = _read_until(sock, b"0\r\n\r\n")  # end of the chunked body
+        assert b"stage_started" in data
+        sock.close()
+    for _ in range(100):
+        if log.subscribers == 0:
+            break
+        time.sleep(0.01)
+    assert log.subscribers == 0
+
+
+def test_follow_async_resumes_and_heartbeats():
+    log = ProgressLog()
+    for index in range(3):
+        log.emit("tick", n=index)
+
+    async def read():
+        seen = []
+        async for event in log.follow_async(1, heartbeat=0.01):
+            seen.append(event)
+            if event is None:
+                threading.Thread(target=log.close).start()
+        return seen
+
+    seen = asyncio.run(read())
+    assert [e["n"] for e in seen if e] == [1, 2]
+    assert None in seen
+    assert log.subscribers == 0
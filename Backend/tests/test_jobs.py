@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import itertools
+
+from jobs import JobManager, SUCCEEDED
+from progress import ProgressLog, TOKEN_EVENT
+
+
+def test_token_events_are_capped_and_dropped_on_close():
+    log = ProgressLog(max_token_events=3)
+    log.emit("llm_started")
+    for index in range(10):
+        log.emit(TOKEN_EVENT, text=str(index))
+    log.emit("markdown_ready", text="0123456789")
+
+    tokens = [e for e in log.events if e["event"] == TOKEN_EVENT]
+    assert [e["text"] for e in tokens] == ["7", "8", "9"]
+    # Sequence numbers are stable, so readers can resume by Last-Event-ID
+    assert [e["seq"] for e in itertools.islice(log.follow(9), 2)] == [9, 10]
+
+    log.close()
+    assert [e["event"] for e in log.events] == ["llm_started", "markdown_ready"]
+    assert [e["seq"] for e in log.follow(5)] == [11]
+
+
+def test_log_expires_only_without_subscribers():
+    log = ProgressLog()
+    log.emit("job_started")
+    reader = log.follow(0, heartbeat=0.01)
+    next(reader)
+    log.close()
+    assert not log.expired(0)
+    list(reader)
+    assert log.expired(0)
+    assert not log.expired(3600)
+
+
+def _wait_finished(manager, job_id):
+    for _ in range(200):
+        if manager.status(job_id)["status"] == SUCCEEDED and manager.progress(job_id).closed:
+            return
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_prune_drops_logs_and_old_records(tmp_path):
+    manager = JobManager(lambda *args, **kwargs: {"markdown": "x" * 1000}, jobs_dir=str(tmp_path),
+                         workers=1, log_ttl=0, retention=3600, max_records=2)
+    ids = []
+    for _ in range(3):
+        job = manager.submit("https://github.com/owner/repo")
+        _wait_finished(manager, job["id"])
+        ids.append(job["id"])
+    manager.prune()
+
+    # Oldest record deleted (memory and file); the others keep their result on disk only
+    assert manager.status(ids[0]) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), f"{ids[0]}.json"))
+    assert "result" not in manager._jobs[ids[2]]
+    assert manager.result(ids[2])["result"] == {"markdown": "x" * 1000}
+    assert ids[2] not in manager._progress
+
+    # A pruned log is rebuilt with the final state
+    events = list(manager.progress(ids[2]).follow())
+    assert [e["event"] for e in events] == ["job_finished"]
+    manager.shutdown()
+
+
+def test_resume_reads_only_recent_job_files(tmp_path):
+    now = time.time()
+    for index in range(4):
+        job = {"id": f"job{index}", "status": SUCCEEDED, "error": None, "result": {"n": index},
+               "created_at": now, "finished_at": now}
+        path = tmp_path / f"job{index}.json"
+        path.write_text(json.dumps(job))
+        os.utime(path, (now - index * 100, now - index * 100))
+
+    manager = JobManager(lambda *args, **kwargs: None, jobs_dir=str(tmp_path), workers=1,
+                         retention=250, max_records=2)
+    manager.resume()
+    assert sorted(manager._jobs) == ["job0", "job1"]
+    assert sorted(os.listdir(str(tmp_path))) == ["job0.json", "job1.json"]
+    assert manager.result("job1")["result"] == {"n": 1}
+    manager.shutdown()
@@ -0,0 +1,60 @@
+import uuid
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_backend import FakeModel
+from llm_engine import LLMEngine, RateLimiter, get_rate_limiter
+
+
+def test_engines_share_one_process_wide_limiter():
+    first, second = LLMEngine(FakeModel()), LLMEngine(FakeModel(), concurrency=2)
+    assert first.limiter is second.limiter is get_rate_limiter()
+
+    custom = get_rate_limiter(rpm=7, tpm=700)
+    assert LLMEngine(FakeModel(), rpm=7, tpm=700).limiter is custom
+    dedicated = RateLimiter(rpm=5)
+    assert LLMEngine(FakeModel(), limiter=dedicated).limiter is dedicated
+
+
+def test_limiter_counts_requests_from_all_event_loops():
+    limiter = RateLimiter(rpm=6, tpm=1_000_000)
+
+    def worker():
+        async def run():
+            for _ in range(3):
+                await limiter.acquire(10)
+        asyncio.run(run())
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Six requests from two loops drained the single six-request bucket
+    assert limiter.requests.tokens < 1
+    assert limiter.requests.wait_time(1) > 5
+
+
+def test_concurrency_is_not_capped_by_the_default_executor():
+    concurrency = 16
+    barrier = threading.Barrier(concurrency, timeout=5)
+
+    class BarrierModel:
+        """Every call waits until `concurrency` calls are in flight at once."""
+        model_name = "barrier/model"
+
+        def generate_content(self, prompt, **kwargs):
+            barrier.wait()
+            return type("Response", (), {"text": f"answer to {prompt}"})()
+
+    async def run(engine):
+        # A tiny default executor must not limit the engine
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        return await asyncio.gather(*(engine.generate(f"prompt {uuid.uuid4().hex}") for _ in range(concurrency)))
+
+    with LLMEngine(BarrierModel(), concurrency=concurrency, limiter=RateLimiter(rpm=1e6, tpm=1e9)) as engine:
+        answers = asyncio.run(run(engine))
+    assert len(answers) == concurrency and engine.stats["requests"] == concurrency
+    assert engine._executor._shutdown
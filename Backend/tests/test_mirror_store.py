@@ -0,0 +1,103 @@
+import os
+import subprocess
+
+import pytest
+
+import mirror_store
+from mirror_store import InvalidRepoSpec, validate_git_url, validate_ref
+
+
+@pytest.mark.parametrize("url", [
+    "https://github.com/owner/repo",
+    "https://github.com/owner/repo.git",
+    "ssh://git@github.com/owner/repo.git",
+    "git@github.com:owner/repo.git",
+    "file:///srv/repos/project",
+])
+def test_accepts_supported_urls(url):
+    assert validate_git_url(f"  {url} ") == url
+
+
+def test_file_remotes_need_the_opt_in(monkeypatch):
+    monkeypatch.setattr(mirror_store, "ALLOW_FILE_REMOTES", False)
+    with pytest.raises(InvalidRepoSpec):
+        validate_git_url("file:///srv/repos/project")
+    assert validate_git_url("https://github.com/owner/repo") == "https://github.com/owner/repo"
+
+
+@pytest.mark.parametrize("url", [
+    "--upload-pack=touch /tmp/pwn;",
+    "-c core.sshCommand=x",
+    "ext::sh -c touch% /tmp/pwn",
+    "http://github.com/owner/repo",
+    "git://github.com/owner/repo",
+    "git@-oProxyCommand=x:repo",
+    "https:///owner/repo",
+    "https://github.com/owner/repo\n--upload-pack=x",
+    "",
+    None,
+])
+def test_rejects_unsafe_urls(url):
+    with pytest.raises(InvalidRepoSpec):
+        validate_git_url(url)
+
+
+@pytest.mark.parametrize("ref", [None, "main", "v1.2.0", "feature/new-ui", "release_2024", "a" * 40])
+def test_accepts_refs(ref):
+    assert validate_ref(ref) == ref
+
+
+@pytest.mark.parametrize("ref", [
+    "", "-x", "--upload-pack=touch /tmp/pwn", "a..b", "a@{1}", "HEAD~1", "main^", "x.lock",
+    "with space", "/main", "main/", "feature//x", "feature/.hidden",
+])
+def test_rejects_bad_refs(ref):
+    with pytest.raises(InvalidRepoSpec):
+        validate_ref(ref)
+
+
+def test_resolve_remote_commit_never_runs_git_for_bad_input(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("git must not be called")
+
+    monkeypatch.setattr(subprocess, "run", fail)
+    with pytest.raises(InvalidRepoSpec):
+        mirror_store.resolve_remote_commit("--upload-pack=touch /tmp/pwn;")
+    with pytest.raises(InvalidRepoSpec):
+        mirror_store.resolve_remote_commit("https://github.com/owner/repo", "--upload-pack=x")
+
+
+def _fake_mirror(root, name, size, worktree_target=None):
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "objects.pack"), "wb") as f:
+        f.write(b"x" * size)
+    with open(os.path.join(path, mirror_store.LAST_USED_MARKER), "w") as f:
+        f.write(name)
+    if worktree_target:
+        os.makedirs(os.path.join(path, "worktrees", "wt"))
+        with open(os.path.join(path, "worktrees", "wt", "gitdir"), "w") as f:
+            f.write(os.path.join(worktree_target, ".git") + "\n")
+    return path
+
+
+def test_eviction_skips_mirrors_in_use(tmp_path, monkeypatch):
+    root = str(tmp_path / "mirrors")
+    monkeypatch.setattr(mirror_store, "MIRROR_ROOT", root)
+    checkout = tmp_path / "workspace" / "repo"
+    checkout.mkdir(parents=True)
+    (checkout / ".git").write_text("gitdir: somewhere")
+
+    live = _fake_mirror(root, "live.git", 1000, worktree_target=str(checkout))
+    stale = _fake_mirror(root, "stale.git", 1000, worktree_target=str(tmp_path / "gone"))
+    busy = _fake_mirror(root, "busy.git", 1000)
+
+    mirror_store._mark_in_use(busy, 1)
+    try:
+        evicted = mirror_store.evict_cold_mirrors(quota_bytes=0)
+    finally:
+        mirror_store._mark_in_use(busy, -1)
+
+    assert evicted == [stale]
+    assert os.path.isdir(live) and os.path.isdir(busy)
+    assert mirror_store.evict_cold_mirrors(quota_bytes=0) == [busy]
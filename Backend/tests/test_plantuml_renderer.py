@@ -0,0 +1,45 @@
+import os
+
+import plantuml_renderer
+from plantuml_renderer import PlantUMLRenderer
+
+SOURCE = "@startuml\nclass A\n@enduml"
+
+
+class _StubPipe:
+    """Stands in for the JVM; the renderer still builds its command (and resolves the jar)."""
+
+    def __init__(self, command, fmt, timeout=None):
+        self.command = command
+
+    def render(self, source):
+        return b"image"
+
+    def close(self):
+        pass
+
+
+def test_render_key_is_stable_across_a_cold_start(tmp_path, monkeypatch):
+    jar_path = str(tmp_path / "vendor" / "plantuml.jar")
+
+    def download(path, url=None):
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"jar" * 100)
+        return path
+
+    monkeypatch.setattr(plantuml_renderer, "ensure_jar", download)
+    monkeypatch.setattr(plantuml_renderer, "PipeProcess", _StubPipe)
+    output_dir = str(tmp_path / "uml")
+
+    # First render in a process: the jar is still missing and gets fetched
+    cold = PlantUMLRenderer(jar_path=jar_path, mode="pipe")
+    first = cold.render(SOURCE, output_dir)
+    assert cold.render(SOURCE, output_dir) == first
+    assert cold.stats == {"rendered": 1, "cache_hits": 1, "failures": 0}
+
+    # A restarted process with the jar already in place picks the same file
+    warm = PlantUMLRenderer(jar_path=jar_path, mode="pipe")
+    assert warm.render(SOURCE, output_dir) == first
+    assert warm.stats["cache_hits"] == 1
@@ -0,0 +1,60 @@
+import process_repo_full
+from clone_utils import build_code_analysis_tree
+from process_repo_full import analyze_file, collect_all_files, generate_full_markdown_with_gemini
+
+
+def test_binary_and_undecodable_files_keep_their_entry(tmp_path):
+    binary = tmp_path / "blob.py"
+    binary.write_bytes(b"\x00\x01\x02abc\n" * 10)
+    undecodable = tmp_path / "latin1.py"
+    undecodable.write_bytes(b'x = "\xff\xfe"\n')
+
+    entry = analyze_file(str(binary), str(tmp_path))
+    assert entry["path"] == "blob.py" and "source" not in entry
+    assert entry["analysis"] == {"lines": 10, "skipped": "binary"}
+
+    entry = analyze_file(str(undecodable), str(tmp_path))
+    assert entry["path"] == "latin1.py" and "source" not in entry
+    assert entry["analysis"]["lines"] == 0
+
+
+def test_unknown_extensions_are_skipped(tmp_path):
+    other = tmp_path / "notes.bin"
+    other.write_bytes(b"\x00")
+    assert analyze_file(str(other), str(tmp_path)) is None
+
+
+def test_sources_are_read_lazily_for_the_single_prompt(tmp_path, monkeypatch):
+    (tmp_path / "main.py").write_text('if __name__ == "__main__":\n    print("entry body")\n')
+    (tmp_path / "util.js").write_text("function helper() {\n  return 42;\n}\n")
+    (tmp_path / "big.py").write_text("x = 1\n" * 100000)
+    files = collect_all_files(str(tmp_path))
+    assert all("source" not in f for f in files)
+    assert next(f for f in files if f["path"] == "main.py")["entry_point"]
+
+    loaded = []
+    real_load = process_repo_full.load_source
+    monkeypatch.setattr(process_repo_full, "load_source", lambda base, path: loaded.append(path) or real_load(base, path))
+    prompts = []
+    monkeypatch.setattr(process_repo_full, "generate_cached", lambda model, prompt, on_chunk=None: prompts.append(prompt) or "# Doc")
+    monkeypatch.setattr(process_repo_full, "PROJECT_PROMPT_TOKEN_BUDGET", 300)
+
+    generate_full_markdown_with_gemini(files, output_md=str(tmp_path / "doc.md"), base_dir=str(tmp_path))
+    assert 'print("entry body")' in prompts[0] and "function helper()" in prompts[0]
+    # Only what fits the budget is used; each source is read on demand and dropped again
+    assert prompts[0].count("x = 1") < 100
+    assert "big.py" in loaded
+
+
+def test_map_reduce_analysis_reports_each_file(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("def a():\n    return 1\n")
+    (tmp_path / "pkg" / "b.js").write_text("function b() {}\n")
+    (tmp_path / "README.md").write_text("# no analyzer\n")
+    events = []
+    tree = build_code_analysis_tree(str(tmp_path), emit=lambda event, **data: events.append((event, data)))
+
+    assert tree == build_code_analysis_tree(str(tmp_path))
+    assert [(e, d["path"], d["done"], d["total"]) for e, d in events] == [
+        ("file_analyzed", "pkg/a.py", 1, 2), ("file_analyzed", "pkg/b.js", 2, 2)
+    ]
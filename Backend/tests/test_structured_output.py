@@ -0,0 +1,102 @@
+import json
+import uuid
+import asyncio
+
+import pytest
+
+from llm_engine import LLMEngine, RateLimiter
+from structured_output import (
+    StructuredOutputError, parse_json_object, validate_fields, generate_structured, generate_structured_async
+)
+
+FIELDS = {"summary": str, "analysis": str, "docstrings": dict}
+REQUIRED = ("summary",)
+
+
+class ScriptedModel:
+    """Answers prompts from a list of scripted responses and records every call."""
+
+    def __init__(self, answers):
+        self.model_name = f"scripted/{uuid.uuid4().hex}"
+        self.answers = list(answers)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        text = self.answers.pop(0)
+        return type("Response", (), {"text": text})()
+
+
+@pytest.mark.parametrize("text", [
+    '{"summary": "s"}',
+    'Here you go:\n```json\n{"summary": "s"}\n```',
+    'Sure! {"summary": "s",} Hope that helps.',
+    "{'summary': 's'}",
+    '{"summary": "line one\nline two"}',
+])
+def test_parse_json_object_tolerates_common_noise(text):
+    assert parse_json_object(text)["summary"] in ("s", "line one\nline two")
+
+
+def test_fenced_code_inside_string_values_is_kept():
+    data = {"summary": "Usage:\n```python\nfoo()\n```\n", "analysis": "ok", "docstrings": {}}
+    assert parse_json_object(json.dumps(data)) == data
+    assert parse_json_object("```json\n" + json.dumps(data) + "\n```") == data
+    assert parse_json_object("Here it is: " + json.dumps(data)) == data
+
+
+def test_fenced_snippets_survive_the_batch_parser():
+    from test_file_batcher import _load_combined, _file_node
+
+    combined = _load_combined()
+    entries = [(_file_node(0), "x = 1\n")]
+    answer = json.dumps({"pkg/mod0.py": {"summary": "Call it:\n```\nmod0.run()\n```", "analysis": "a"}})
+    assert combined.parse_batch_answer(answer, entries)["pkg/mod0.py"]["summary"].endswith("```")
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "[1, 2]", "{not: valid: json"])
+def test_parse_json_object_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        parse_json_object(text)
+
+
+def test_validate_fields_normalises_and_checks():
+    data = {"summary": "s", "analysis": ["a", "b"], "docstrings": [{"symbol": "f", "docstring": "Does f."}]}
+    result = validate_fields(data, FIELDS, REQUIRED)
+    assert result["docstrings"] == {"f": "Does f."}
+    assert result["analysis"].startswith("[")
+    assert validate_fields({"summary": "s"}, FIELDS, REQUIRED)["docstrings"] == {}
+    with pytest.raises(ValueError):
+        validate_fields({"analysis": "a"}, FIELDS, REQUIRED)
+    with pytest.raises(ValueError):
+        validate_fields({"summary": "  "}, FIELDS, REQUIRED)
+
+
+def test_malformed_answer_is_repaired():
+    model = ScriptedModel(["not json at all", '{"summary": "fixed"}'])
+    assert generate_structured(model, "Describe x", FIELDS, REQUIRED)["summary"] == "fixed"
+    assert "could not be used" in model.prompts[1]
+
+
+def test_malformed_answers_are_not_cached():
+    model = ScriptedModel(["broken", "still broken"])
+    with pytest.raises(StructuredOutputError):
+        generate_structured(model, "Describe y", FIELDS, REQUIRED)
+
+    # A rerun asks the model again instead of failing on the cached bad answer
+    model.answers = ['{"summary": "good"}']
+    assert generate_structured(model, "Describe y", FIELDS, REQUIRED)["summary"] == "good"
+    assert len(model.prompts) == 3
+
+    # ...and the valid answer is cached from then on
+    assert generate_structured(model, "Describe y", FIELDS, REQUIRED)["summary"] == "good"
+    assert len(model.prompts) == 3
+
+
+def test_async_path_skips_caching_bad_answers():
+    model = ScriptedModel(["broken", '{"summary": "repaired"}', '{"summary": "fresh"}'])
+    with LLMEngine(model, limiter=RateLimiter(rpm=1e6, tpm=1e9)) as engine:
+        assert asyncio.run(generate_structured_async(engine, "Describe z", FIELDS, REQUIRED))["summary"] == "repaired"
+
+    with LLMEngine(model, limiter=RateLimiter(rpm=1e6, tpm=1e9)) as engine:
+        assert asyncio.run(generate_structured_async(engine, "Describe z", FIELDS, REQUIRED))["summary"] == "fresh"
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+import workspaces
+from workspaces import WorkspaceManager, HEARTBEAT_MARKER, RELEASED_MARKER
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_live_workspaces_of_other_processes_survive_gc(tmp_path):
+    owner = WorkspaceManager(str(tmp_path), ttl=60, heartbeat_interval=3600, heartbeat_timeout=120)
+    other = WorkspaceManager(str(tmp_path), ttl=60, heartbeat_interval=3600, heartbeat_timeout=120)
+    workspace = owner.create()
+    _age(workspace.path, 7200)
+
+    # Another process (separate manager) does not know the id, but the heartbeat is fresh
+    assert other.collect_garbage(max_age=0) == []
+    assert os.path.isdir(workspace.path)
+
+    # The owner died: its heartbeat goes stale and the workspace is collected
+    _age(os.path.join(workspace.path, HEARTBEAT_MARKER), 7200)
+    assert other.collect_garbage() == [workspace.path]
+
+
+def test_released_workspaces_expire_after_the_ttl(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), ttl=60, heartbeat_interval=3600, heartbeat_timeout=120)
+    workspace = manager.create()
+    manager.release(workspace)
+    assert not os.path.exists(os.path.join(workspace.path, HEARTBEAT_MARKER))
+    assert manager.collect_garbage() == []
+
+    _age(os.path.join(workspace.path, RELEASED_MARKER), 120)
+    assert manager.collect_garbage() == [workspace.path]
+
+
+def test_unmarked_directories_wait_for_the_heartbeat_timeout(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), ttl=60, heartbeat_interval=3600, heartbeat_timeout=120)
+    fresh = tmp_path / "being-created"
+    fresh.mkdir()
+    leftover = tmp_path / "leftover"
+    leftover.mkdir()
+    _age(str(leftover), 7200)
+
+    assert manager.collect_garbage(max_age=0) == [str(leftover)]
+
+
+def test_heartbeat_refreshes_active_workspaces(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), heartbeat_interval=0.05, heartbeat_timeout=120)
+    workspace = manager.create()
+    marker = os.path.join(workspace.path, HEARTBEAT_MARKER)
+    _age(marker, 7200)
+    deadline = time.time() + 5
+    while time.time() - os.path.getmtime(marker) > 60 and time.time() < deadline:
+        time.sleep(0.02)
+    assert time.time() - os.path.getmtime(marker) < 60
+    manager.stop_gc()
+
+
+def test_create_does_not_measure_the_root_every_time(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(workspaces, "dir_size", lambda path: calls.append(path) or 0)
+    manager = WorkspaceManager(str(tmp_path), root_quota_bytes=10 ** 9, heartbeat_interval=3600)
+    for _ in range(5):
+        manager.create()
+    assert len(calls) == 1
+
+    manager.collect_garbage()
+    assert len(calls) == 2
+
+
+def test_root_quota_uses_the_measured_usage(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "dir_size", lambda path: 10 ** 6)
+    manager = WorkspaceManager(str(tmp_path), root_quota_bytes=1000, heartbeat_interval=3600)
+    with pytest.raises(workspaces.WorkspaceQuotaExceeded):
+        manager.create()
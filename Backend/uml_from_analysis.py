@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import posixpath
+
+from prompt_packer import module_keys, import_targets
+
+# ------------------------------------------------------------------
+# Global Configurations
+# ------------------------------------------------------------------
+# PlantUML diagrams built directly from the analysis tree (no LLM call):
+#   class diagram:     classes with members, inheritance and composition edges
+#   component diagram: folders as components, edges from the import graph
+UML_MAX_CLASSES = int(os.getenv("UML_MAX_CLASSES", "150"))
+UML_MAX_MEMBERS = int(os.getenv("UML_MAX_MEMBERS", "12"))
+# Folder depth that defines one component (1 = top-level folders)
+UML_COMPONENT_DEPTH = int(os.getenv("UML_COMPONENT_DEPTH", "2"))
+UML_MAX_EXTERNALS = int(os.getenv("UML_MAX_EXTERNALS", "15"))
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][\w.]*")
+# Standard-library imports are left out of the component diagram
+_STDLIB = set(getattr(sys, "stdlib_module_names", ())) | {"java", "javax"}
+
+
+# ------------------------------------------------------------------
+# Analysis Input
+# ------------------------------------------------------------------
+def iter_file_nodes(analysis):
+    """
+    Yields (path, language, info) for every analysed file, where info holds
+    imports/symbols. Accepts the nested analysis tree or the flat files_data
+    list built by process_repo_full's single-prompt mode.
+    """
+    if isinstance(analysis, list):
+        for entry in analysis:
+            yield entry["path"].replace(os.sep, "/"), entry.get("ext"), entry.get("analysis", {})
+        return
+
+    stack = [analysis]
+    while stack:
+        node = stack.pop()
+        if node.get("type") == "file":
+            yield node["path"].replace(os.sep, "/"), node.get("language"), node
+        else:
+            stack.extend(reversed(node.get("children", [])))
+
+
+def _quote(text):
+    return '"' + str(text).replace('"', "'") + '"'
+
+
+def _simple_name(type_name):
+    """`pkg.mod.Foo[int]` / `Optional[Foo]` -> candidate class names, innermost last."""
+    return [name.rsplit(".", 1)[-1] for name in _IDENTIFIER.findall(type_name or "")]
+
+
+# ------------------------------------------------------------------
+# Class Diagram
+# ------------------------------------------------------------------
+def collect_classes(analysis):
+    classes = []
+    for path, language, info in iter_file_nodes(analysis):
+        for cls in (info.get("symbols") or {}).get("classes", []):
+            classes.append({
+                "alias": f"C{len(classes)}",
+                "name": cls["name"],
+                "short": cls["name"].rsplit(".", 1)[-1],
+                "path": path,
+                "folder": posixpath.dirname(path),
+                "kind": cls.get("kind", "class"),
+                "bases": cls.get("bases", []),
+                "fields": cls.get("fields", []),
+                "methods": cls.get("methods", []),
+            })
+    return classes
+
+
+def _resolver(classes):
+    by_name = {}
+    for cls in classes:
+        by_name.setdefault(cls["short"], []).append(cls)
+
+    def resolve(owner, type_name):
+        """Best match for a type referenced from `owner`: same file, same folder, else a unique name."""
+        for name in reversed(_simple_name(type_name)):
+            candidates = by_name.get(name, [])
+            for scope in ("path", "folder"):
+                local = [c for c in candidates if c[scope] == owner[scope]]
+                if local:
+                    return local[0]
+            if len(candidates) == 1:
+                return candidates[0]
+        return None
+
+    return resolve
+
+
+def class_relations(classes):
+    """Returns (inheritance, composition) edge lists of (parent/owner, child/part, label)."""
+    resolve = _resolver(classes)
+    inheritance, composition, seen = [], [], set()
+    for cls in classes:
+        for base in cls["bases"]:
+            target = resolve(cls, base)
+            if target and target is not cls and ("is", target["alias"], cls["alias"]) not in seen:
+                seen.add(("is", target["alias"], cls["alias"]))
+                inheritance.append((target, cls, None))
+        for field in cls["fields"]:
+            target = resolve(cls, field.get("type"))
+            if target and target is not cls and ("has", cls["alias"], target["alias"]) not in seen:
+                seen.add(("has", cls["alias"], target["alias"]))
+                composition.append((cls, target, field["name"]))
+    return inheritance, composition
+
+
+def _select_classes(classes, inheritance, composition, limit):
+    """Keeps the `limit` most connected classes (ties: most members) when the project is large."""
+    if len(classes) <= limit:
+        return classes
+    degree = {cls["alias"]: 0 for cls in classes}
+    for a, b, _ in inheritance + composition:
+        degree[a["alias"]] += 1
+        degree[b["alias"]] += 1
+    ranked = sorted(classes, key=lambda c: (-degree[c["alias"]], -len(c["methods"]) - len(c["fields"]), c["path"]))
+    keep = {c["alias"] for c in ranked[:limit]}
+    return [c for c in classes if c["alias"] in keep]
+
+
+def _class_block(cls):
+    keyword = {"interface": "interface", "enum": "enum"}.get(cls["kind"], "class")
+    members = [f"  -{f['name']} : {f['type']}" for f in cls["fields"]]
+    members += [
+        f"  +{m['name']}({', '.join(a for a in m.get('args', []) if a not in ('self', 'cls'))})"
+        for m in cls["methods"]
+    ]
+    if len(members) > UML_MAX_MEMBERS:
+        hidden = len(members) - UML_MAX_MEMBERS
+        members = members[:UML_MAX_MEMBERS] + [f"  .. {hidden} more .."]
+    return [f"{keyword} {_quote(cls['name'])} as {cls['alias']} {{"] + members + ["}"]
+
+
+def build_class_diagram(analysis, max_classes=UML_MAX_CLASSES) -> str:
+    """PlantUML class diagram, one package per folder, with inheritance and composition."""
+    classes = collect_classes(analysis)
+    inheritance, composition = class_relations(classes)
+    shown = _select_classes(classes, inheritance, composition, max_classes)
+    shown_aliases = {cls["alias"] for cls in shown}
+
+    lines = ["@startuml", "set namespaceSeparator none", "hide empty members", "skinparam packageStyle folder"]
+    by_folder = {}
+    for cls in shown:
+        by_folder.setdefault(cls["folder"] or "(root)", []).append(cls)
+    for folder in sorted(by_folder):
+        lines.append(f"package {_quote(folder)} {{")
+        for cls in by_folder[folder]:
+            lines.extend("  " + line for line in _class_block(cls))
+        lines.append("}")
+
+    for parent, child, _ in inheritance:
+        if parent["alias"] in shown_aliases and child["alias"] in shown_aliases:
+            lines.append(f"{parent['alias']} <|-- {child['alias']}")
+    for owner, part, label in composition:
+        if owner["alias"] in shown_aliases and part["alias"] in shown_aliases:
+            lines.append(f"{owner['alias']} *-- {part['alias']} : {label}")
+
+    if len(shown) < len(classes):
+        lines.append(f"legend right\n  Showing {len(shown)} of {len(classes)} classes (most connected)\nendlegend")
+    if not classes:
+        lines.append("note as N1\n  No classes found in the analysed files\nend note")
+    lines.append("@enduml")
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# Component Diagram
+# ------------------------------------------------------------------
+def component_of(path, depth=UML_COMPONENT_DEPTH):
+    folder = posixpath.dirname(path)
+    return "/".join(folder.split("/")[:depth]) if folder else "(root)"
+
+
+def _external_name(raw, language):
+    quoted = re.search(r"['\"]([^'\"]+)['\"]", raw)
+    if quoted:
+        target = quoted.group(1)
+        if target.startswith("."):
+            return None
+        return "/".join(target.split("/")[:2]) if target.startswith("@") else target.split("/")[0]
+    if raw.startswith(".") or not raw:
+        return None
+    parts = raw.split(".")
+    if parts[0] in _STDLIB:
+        return None
+    return ".".join(parts[:2]) if language == "java" else parts[0]
+
+
+def import_graph(analysis, depth=UML_COMPONENT_DEPTH):
+    """
+    Aggregates file-level imports into component edges.
+    Returns (components {name: file count}, internal {(src, dst): n},
+    external {package: {importing component: n}}).
+    """
+    files = list(iter_file_nodes(analysis))
+    owners = {}
+    for path, _, _ in files:
+        for key in module_keys(path):
+            owners.setdefault(key, set()).add(path)
+
+    components, internal, external = {}, {}, {}
+    for path, language, info in files:
+        source = component_of(path, depth)
+        components[source] = components.get(source, 0) + 1
+        for raw in info.get("imports") or []:
+            targets = set()
+            for key in import_targets(path, [raw]):
+                targets |= owners.get(key, set())
+            targets.discard(path)
+            if targets:
+                for target in {component_of(t, depth) for t in targets} - {source}:
+                    internal[(source, target)] = internal.get((source, target), 0) + 1
+            else:
+                name = _external_name(raw, language)
+                if name:
+                    users = external.setdefault(name, {})
+                    users[source] = users.get(source, 0) + 1
+    return components, internal, external
+
+
+def build_component_diagram(analysis, depth=UML_COMPONENT_DEPTH, max_externals=UML_MAX_EXTERNALS) -> str:
+    """PlantUML component diagram: folders as components, import counts on the arrows."""
+    components, internal, external = import_graph(analysis, depth)
+    aliases = {name: f"M{i}" for i, name in enumerate(sorted(components))}
+
+    lines = ["@startuml", "skinparam componentStyle rectangle", "left to right direction"]
+    for name in sorted(components):
+        lines.append(f"component {_quote(f'{name} ({components[name]} files)')} as {aliases[name]}")
+
+    top_external = sorted(external.items(), key=lambda item: (-sum(item[1].values()), item[0]))[:max_externals]
+    if top_external:
+        lines.append('package "External dependencies" {')
+        for i, (name, _) in enumerate(top_external):
+            lines.append(f"  [{name}] as X{i}")
+        lines.append("}")
+
+    for (source, target), count in sorted(internal.items()):
+        lines.append(f"{aliases[source]} --> {aliases[target]} : {count}")
+    # Each external package is linked from the component that imports it most
+    for i, (_, users) in enumerate(top_external):
+        source = max(sorted(users), key=users.get)
+        lines.append(f"{aliases[source]} ..> X{i}")
+
+    lines.append("@enduml")
+    return "\n".join(lines)
@@ -0,0 +1,249 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+
+from mirror_store import dir_size
+
+# ----------------------------------------------------
+# Global Configurations
+# ----------------------------------------------------
+# Every pipeline run gets its own directory tree under WORKSPACE_ROOT:
+#   <root>/<id>/repo                      checked-out repository
+#   <root>/<id>/output/FULL_PROJECT_DOC.md generated documentation
+#   <root>/<id>/output/uml/*.puml         diagram sources
+# so concurrent runs never delete each other's clone or overwrite each
+# other's output. Finished workspaces are removed after WORKSPACE_TTL_SECONDS.
+# Several processes (uvicorn workers, pipeline runs) may share the root: a run
+# proves it is alive by touching <root>/<id>/.active every
+# WORKSPACE_HEARTBEAT_INTERVAL seconds, and no process collects a workspace
+# whose heartbeat is fresher than WORKSPACE_HEARTBEAT_TIMEOUT.
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", r"P:\AI_Documentation\example\workspaces")
+WORKSPACE_QUOTA_BYTES = int(os.getenv("WORKSPACE_QUOTA_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Upper bound for all workspaces together; 0 disables the check
+WORKSPACE_ROOT_QUOTA_BYTES = int(os.getenv("WORKSPACE_ROOT_QUOTA_BYTES", str(20 * 1024 * 1024 * 1024)))
+WORKSPACE_TTL_SECONDS = float(os.getenv("WORKSPACE_TTL_SECONDS", "3600"))
+WORKSPACE_GC_INTERVAL = float(os.getenv("WORKSPACE_GC_INTERVAL", "300"))
+WORKSPACE_HEARTBEAT_INTERVAL = float(os.getenv("WORKSPACE_HEARTBEAT_INTERVAL", "30"))
+WORKSPACE_HEARTBEAT_TIMEOUT = float(os.getenv("WORKSPACE_HEARTBEAT_TIMEOUT", str(4 * WORKSPACE_HEARTBEAT_INTERVAL)))
+
+RELEASED_MARKER = ".released"
+HEARTBEAT_MARKER = ".active"
+
+
+class WorkspaceQuotaExceeded(Exception):
+    pass
+
+
+# ----------------------------------------------------
+# Workspace
+# ----------------------------------------------------
+class Workspace:
+    """Directory tree and output paths of one pipeline run."""
+
+    def __init__(self, root: str, workspace_id: str, quota_bytes: int = WORKSPACE_QUOTA_BYTES):
+        self.id = workspace_id
+        self.path = os.path.join(root, workspace_id)
+        self.clone_dir = os.path.join(self.path, "repo")
+        self.output_dir = os.path.join(self.path, "output")
+        self.markdown_path = os.path.join(self.output_dir, "FULL_PROJECT_DOC.md")
+        self.uml_dir = os.path.join(self.output_dir, "uml")
+        self.quota_bytes = quota_bytes
+
+    def usage(self) -> int:
+        return dir_size(self.path) if os.path.isdir(self.path) else 0
+
+    def check_quota(self):
+        """Raises WorkspaceQuotaExceeded once the workspace outgrows its quota."""
+        if not self.quota_bytes:
+            return
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Workspace {self.id} uses {used} bytes (quota {self.quota_bytes})"
+            )
+
+
+# ----------------------------------------------------
+# Workspace Manager
+# ----------------------------------------------------
+class WorkspaceManager:
+    """
+    Creates per-run workspaces and garbage-collects released ones.
+    A released workspace is kept for `ttl` seconds (so its markdown can still
+    be read) and then deleted by collect_garbage(), which also removes
+    leftovers of runs interrupted by a restart (their heartbeat went stale).
+    The root quota is checked against the usage measured by the last garbage
+    collection, re-measured at most every WORKSPACE_GC_INTERVAL seconds.
+    """
+
+    def __init__(self, root: str = WORKSPACE_ROOT, quota_bytes: int = WORKSPACE_QUOTA_BYTES,
+                 root_quota_bytes: int = WORKSPACE_ROOT_QUOTA_BYTES, ttl: float = WORKSPACE_TTL_SECONDS,
+                 heartbeat_interval: float = WORKSPACE_HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = WORKSPACE_HEARTBEAT_TIMEOUT):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.root_quota_bytes = root_quota_bytes
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self._active = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._gc_thread = None
+        self._heartbeat_thread = None
+        self._root_usage = None
+        self._root_usage_at = 0.0
+
+    def create(self, workspace_id: str = None) -> Workspace:
+        """Returns a fresh, empty workspace; an existing one with the same id is wiped."""
+        if self.root_quota_bytes and self.root_usage() > self.root_quota_bytes:
+            self.collect_garbage(max_age=0)
+            if self.root_usage() > self.root_quota_bytes:
+                raise WorkspaceQuotaExceeded(f"Workspace root {self.root} is over its quota")
+
+        workspace = Workspace(self.root, workspace_id or uuid.uuid4().hex, self.quota_bytes)
+        with self._lock:
+            self._active.add(workspace.id)
+        shutil.rmtree(workspace.path, ignore_errors=True)
+        os.makedirs(workspace.uml_dir)
+        self._touch(workspace.id)
+        self._start_heartbeat()
+        return workspace
+
+    def release(self, workspace: Workspace):
+        """Marks a finished workspace for garbage collection after the TTL."""
+        with self._lock:
+            self._active.discard(workspace.id)
+        if os.path.isdir(workspace.path):
+            with open(os.path.join(workspace.path, RELEASED_MARKER), "w") as f:
+                f.write(str(time.time()))
+            try:
+                os.remove(os.path.join(workspace.path, HEARTBEAT_MARKER))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, workspace: Workspace):
+        """Deletes a workspace right away (nothing in it is needed after the run)."""
+        with self._lock:
+            self._active.discard(workspace.id)
+        shutil.rmtree(workspace.path, ignore_errors=True)
+
+    def root_usage(self, max_age: float = WORKSPACE_GC_INTERVAL) -> int:
+        """Bytes used under the root; dir_size() walks every workspace, so it runs at most every max_age seconds."""
+        now = time.time()
+        with self._lock:
+            if self._root_usage is not None and now - self._root_usage_at < max_age:
+                return self._root_usage
+        usage = dir_size(self.root) if os.path.isdir(self.root) else 0
+        with self._lock:
+            self._root_usage, self._root_usage_at = usage, now
+        return usage
+
+    def collect_garbage(self, max_age: float = None) -> list:
+        """
+        Deletes workspaces idle for longer than max_age (default: the TTL).
+        A workspace with a fresh heartbeat belongs to a live run, possibly in
+        another process, and is never deleted. Idle time counts from the
+        release, else from the last heartbeat; a workspace with neither marker
+        (being created, or left by an older version) must also be older than
+        the heartbeat timeout.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        if not os.path.isdir(self.root):
+            return []
+
+        removed = []
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            with self._lock:
+                if entry.name in self._active:
+                    continue
+            heartbeat = _mtime(os.path.join(entry.path, HEARTBEAT_MARKER))
+            released = _mtime(os.path.join(entry.path, RELEASED_MARKER))
+            if heartbeat is not None and now - heartbeat < self.heartbeat_timeout:
+                continue
+            if released is not None:
+                last_used = released
+            elif heartbeat is not None:
+                last_used = heartbeat
+            else:
+                last_used = entry.stat().st_mtime
+                if now - last_used < self.heartbeat_timeout:
+                    continue
+            if now - last_used < max_age:
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(entry.path)
+            print(f"[-] Removed workspace {entry.path}")
+        self.root_usage(max_age=0)
+        return removed
+
+    def _touch(self, workspace_id: str):
+        try:
+            with open(os.path.join(self.root, workspace_id, HEARTBEAT_MARKER), "w") as f:
+                f.write(f"{os.getpid()} {time.time()}")
+        except FileNotFoundError:
+            pass  # discarded meanwhile
+        except OSError as e:
+            print(f"[!] Could not refresh heartbeat of workspace {workspace_id}: {e}")
+
+    def heartbeat(self):
+        """Touches the heartbeat of every workspace this process is still using."""
+        with self._lock:
+            active = list(self._active)
+        for workspace_id in active:
+            self._touch(workspace_id)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+
+            def loop():
+                while not self._stop.wait(self.heartbeat_interval):
+                    self.heartbeat()
+
+            self._heartbeat_thread = threading.Thread(target=loop, name="workspace-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def start_gc(self, interval: float = WORKSPACE_GC_INTERVAL):
+        """Runs collect_garbage() every `interval` seconds on a daemon thread."""
+        if self._gc_thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.collect_garbage()
+                except OSError as e:
+                    print(f"[!] Workspace garbage collection failed: {e}")
+
+        self._gc_thread = threading.Thread(target=loop, name="workspace-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_gc(self):
+        self._stop.set()
+
+
+def _mtime(path: str):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Process-wide manager shared by the job pool and the synchronous endpoints."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = WorkspaceManager()
+        return _manager
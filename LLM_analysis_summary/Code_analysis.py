@@ -1,8 +1,13 @@
 import os
+import sys
 import json
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from llm_cache import generate_cached
+from chunker import code_material
+
 load_dotenv()
 
 api_key = os.getenv("GEMINI_API_KEY")
@@ -20,7 +25,8 @@ def read_file_content(base_path, rel_path):
         return ""
 
 def generate_prompt(file_node, content):
-    truncated_code = content[:1500]  # Context control for Gemini input
+    # Whole file when it fits, else summaries of its class/function chunks
+    truncated_code = code_material(model, file_node, content)
     return f"""
 You are a helpful code documentation assistant.
 
@@ -43,8 +49,7 @@ Has Docstrings: {file_node['has_docstrings']}
 
 def call_gemini(prompt):
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return generate_cached(model, prompt)
     except Exception as e:
         print(f"[!] Gemini generation failed: {e}")
         return ""
@@ -1,13 +1,29 @@
 import os
+import sys
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
+import asyncio
+import posixpath
 
-load_dotenv()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from llm_cache import generate_cached
+from llm_engine import LLMEngine, LLM_CONCURRENCY, GEMINI_RPM, GEMINI_TPM
+from prompt_packer import pack_source, count_tokens
+from structured_output import (
+    generate_structured, generate_structured_async, parse_json_object, validate_fields, JSON_GENERATION_CONFIG
+)
+from file_batcher import plan_batches, run_batch, SMALL_FILE_TOKENS
+from chunker import needs_chunking, summarize_chunks, summarize_chunks_sync, format_chunk_summaries
+from llm_backend import get_model
+from github_repo.saving import RecordWriter, iter_records
 
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("models/gemini-1.5-flash")
+model = get_model("models/gemini-1.5-flash")
+
+# One JSON request per file (summary + analysis + docstrings) instead of two
+# prompts with the same code; set COMBINED_ANALYSIS=0 for the separate prompts
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "1") == "1"
+COMBINED_FIELDS = {"summary": str, "analysis": str, "docstrings": dict}
+COMBINED_REQUIRED = ("summary", "analysis")
 
 def read_file_content(base_path, rel_path):
     abs_path = os.path.join(base_path, rel_path)
@@ -18,8 +34,14 @@ def read_file_content(base_path, rel_path):
         print(f"[!] Could not read {rel_path}: {e}")
         return ""
 
-def generate_summary_prompt(file_node, content):
-    truncated_code = content[:1500]
+def code_section(file_node, content, chunk_summaries=None):
+    """The packed source, or the chunk summaries of a file too large for one prompt."""
+    if chunk_summaries:
+        return "Section summaries (the whole file, in order):\n" + format_chunk_summaries(chunk_summaries)
+    return pack_source(file_node, content)
+
+def generate_summary_prompt(file_node, content, chunk_summaries=None):
+    truncated_code = code_section(file_node, content, chunk_summaries)
     return f"""
 You are an expert AI Project Documentation Assistant.
 
@@ -44,8 +66,8 @@ Functions: {file_node['functions_count']}
 ### End Code.
 """
 
-def generate_analysis_prompt(file_node, content):
-    truncated_code = content[:1500]
+def generate_analysis_prompt(file_node, content, chunk_summaries=None):
+    truncated_code = code_section(file_node, content, chunk_summaries)
     return f"""
 You are a helpful code documentation assistant.
 
@@ -66,43 +88,278 @@ Has Docstrings: {file_node['has_docstrings']}
 ### End Code.
 """
 
+def generate_combined_prompt(file_node, content, chunk_summaries=None):
+    truncated_code = code_section(file_node, content, chunk_summaries)
+    return f"""
+You are an expert AI Project Documentation Assistant writing for software engineers working on AI/ML or backend systems.
+
+Answer with a single JSON object and nothing else:
+{{
+  "summary": "<concise Markdown summary: 1. Purpose, 2. Key Components, 3. Inputs and Outputs, 4. Dependencies, 5. Use Case / Context>",
+  "analysis": "<high-level explanation of what the file does>",
+  "docstrings": {{"<class, function or Class.method name>": "<suggested docstring>"}}
+}}
+Only list docstrings for classes and functions that lack one.
+
+Filename: {file_node['name']}
+Path: {file_node['path']}
+Lines of Code: {file_node['lines_of_code']}
+Imports: {file_node['imports']}
+Classes: {file_node['classes_count']}
+Functions: {file_node['functions_count']}
+Has Docstrings: {file_node['has_docstrings']}
+
+### Begin Code:
+{truncated_code}
+### End Code.
+"""
+
+def generate_batch_prompt(entries):
+    """One prompt for several small files ([(file_node, content)]), answered as JSON keyed by path."""
+    paths = [node["path"] for node, _ in entries]
+    files = "\n".join(f"""
+### File: {node['path']}
+Lines of Code: {node['lines_of_code']}
+Imports: {node['imports']}
+Classes: {node['classes_count']}
+Functions: {node['functions_count']}
+Has Docstrings: {node['has_docstrings']}
+### Begin Code:
+{content}
+### End Code.""" for node, content in entries)
+    return f"""
+You are an expert AI Project Documentation Assistant writing for software engineers working on AI/ML or backend systems.
+
+Document each of the {len(entries)} files below. Answer with a single JSON object with one entry per file path.
+JSON keys: {json.dumps(paths)}
+Each value: {{"summary": "<concise Markdown summary: purpose, key components, inputs/outputs, dependencies, use case>", "analysis": "<high-level explanation of what the file does>", "docstrings": {{"<class, function or Class.method name>": "<suggested docstring>"}}}}
+Only list docstrings for classes and functions that lack one.
+{files}
+"""
+
+def is_small_file(content):
+    return COMBINED_ANALYSIS and SMALL_FILE_TOKENS > 0 and count_tokens(content) <= SMALL_FILE_TOKENS
+
+def apply_combined(tree_node, fields):
+    tree_node["summary"] = fields["summary"]
+    tree_node["analysis"] = fields["analysis"]
+    tree_node["suggested_docstrings"] = fields["docstrings"]
+
 def call_gemini(prompt, mode="summary"):
     try:
         print(f"[Gemini] Generating {mode}...")
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return generate_cached(model, prompt)
     except Exception as e:
         print(f"[!] Gemini generation failed: {e}")
         return f"Error generating {mode}: {e}"
 
-def walk_and_process(tree_node, base_path):
-    if tree_node["type"] == "file" and tree_node["name"].endswith(".py"):
+def walk_and_process(tree_node, base_path, done=None):
+    # Small files are documented several per request up front (see file_batcher.py)
+    if done is None:
+        done = summarize_small_files_sync(tree_node, base_path)
+    if tree_node["type"] == "file" and tree_node["name"].endswith(".py") and tree_node["path"] not in done:
         content = read_file_content(base_path, tree_node["path"])
         if content.strip():
             print(f"[+] Processing file: {tree_node['path']}")
             
-            summary_prompt = generate_summary_prompt(tree_node, content)
-            analysis_prompt = generate_analysis_prompt(tree_node, content)
+            chunk_summaries = summarize_chunks_sync(model, content, "python") if needs_chunking(content) else None
+            if COMBINED_ANALYSIS:
+                try:
+                    print("[Gemini] Generating summary + analysis...")
+                    apply_combined(tree_node, generate_structured(
+                        model, generate_combined_prompt(tree_node, content, chunk_summaries),
+                        COMBINED_FIELDS, COMBINED_REQUIRED
+                    ))
+                    return
+                except Exception as e:
+                    print(f"[!] Combined request failed, falling back to separate prompts: {e}")
+
+            summary_prompt = generate_summary_prompt(tree_node, content, chunk_summaries)
+            analysis_prompt = generate_analysis_prompt(tree_node, content, chunk_summaries)
 
             tree_node["summary"] = call_gemini(summary_prompt, "summary")
             tree_node["analysis"] = call_gemini(analysis_prompt, "analysis")
     elif tree_node["type"] == "folder":
         for child in tree_node.get("children", []):
-            walk_and_process(child, base_path)
+            walk_and_process(child, base_path, done)
 
-BASE_REPO_PATH = r"P:\AI_Documentation\github_repo\cloned_repos"
-INPUT_TREE_JSON = r"P:\AI_Documentation\code_analysis.json"
-OUTPUT_TREE_JSON = r"P:\AI_Documentation\annotated_code_analysis.json"
+def collect_file_nodes(tree_node):
+    """Python file nodes of the analysis tree, in walk_and_process order."""
+    nodes = []
+    stack = [tree_node]
+    while stack:
+        node = stack.pop()
+        if node["type"] == "file" and node["name"].endswith(".py"):
+            nodes.append(node)
+        elif node["type"] == "folder":
+            stack.extend(reversed(node.get("children", [])))
+    return nodes
+
+async def call_gemini_async(engine, prompt, mode="summary"):
+    try:
+        return await engine.generate(prompt)
+    except Exception as e:
+        print(f"[!] Gemini generation failed: {e}")
+        return f"Error generating {mode}: {e}"
+
+def parse_batch_answer(answer, entries, quiet=False):
+    """{path: fields} for the files of a batch answer that are usable; raises ValueError for non-JSON."""
+    data = parse_json_object(answer)
+    names = [node["name"] for node, _ in entries]
+    results = {}
+    for node, _ in entries:
+        # Tolerate answers keyed by file name instead of path
+        value = data.get(node["path"])
+        if value is None and names.count(node["name"]) == 1:
+            value = data.get(node["name"]) or data.get(posixpath.basename(node["path"]))
+        try:
+            results[node["path"]] = validate_fields(value if isinstance(value, dict) else {}, COMBINED_FIELDS,
+                                                    COMBINED_REQUIRED)
+        except ValueError as e:
+            if not quiet:
+                print(f"[!] Unusable batch entry for {node['path']}: {e}")
+    return results
+
+async def summarize_batch_async(engine, entries):
+    """Sends one batch prompt; returns {path: fields} for the files answered correctly."""
+    def accept(answer):
+        # Answers without a single usable entry are not cached, so a rerun asks again
+        try:
+            return bool(parse_batch_answer(answer, entries, quiet=True))
+        except ValueError:
+            return False
+
+    answer = await engine.generate(generate_batch_prompt(entries), JSON_GENERATION_CONFIG, accept)
+    return parse_batch_answer(answer, entries)
 
-with open(INPUT_TREE_JSON, "r", encoding="utf-8") as f:
-    tree = json.load(f)
+async def summarize_small_files_async(engine, entries, fallback):
+    """
+    Documents small files ([(file_node, content)]) in batches of up to
+    BATCH_TOKEN_BUDGET tokens; a file that fails even on its own goes to
+    fallback(entry). Returns the paths documented by a batch.
+    """
+    done = set()
 
-walk_and_process(tree, BASE_REPO_PATH)
+    def apply(entry, fields):
+        apply_combined(entry[0], fields)
+        done.add(entry[0]["path"])
 
-with open(OUTPUT_TREE_JSON, "w", encoding="utf-8") as f:
-    json.dump(tree, f, indent=2, ensure_ascii=False)
+    batches = plan_batches(entries, lambda entry: count_tokens(entry[1]) + 60)
+    if batches:
+        print(f"[Gemini] {len(entries)} small files in {len(batches)} batch request(s)")
+    await asyncio.gather(*(
+        run_batch(batch, lambda items: summarize_batch_async(engine, items), apply, fallback,
+                  key=lambda entry: entry[0]["path"])
+        for batch in batches
+    ))
+    return done
 
-print(f"\n Enhanced JSON saved to: {OUTPUT_TREE_JSON}")
+def summarize_small_files_sync(tree_node, base_path):
+    """Batch pass of walk_and_process; files left out are processed one by one afterwards."""
+    entries = []
+    for node in collect_file_nodes(tree_node):
+        content = read_file_content(base_path, node["path"])
+        if content.strip() and is_small_file(content):
+            entries.append((node, content))
+    if not entries:
+        return set()
 
+    async def leave_for_walk(entry):
+        return None
+
+    with LLMEngine(model) as engine:
+        return asyncio.run(summarize_small_files_async(engine, entries, leave_for_walk))
+
+async def process_files_async(engine, nodes, base_path):
+    """Small files go out in batches, the rest one request per file."""
+    contents = await asyncio.gather(*(asyncio.to_thread(read_file_content, base_path, n["path"]) for n in nodes))
+    small = [(node, content) for node, content in zip(nodes, contents) if content.strip() and is_small_file(content)]
+    small_paths = {node["path"] for node, _ in small}
+
+    async def single(entry):
+        await process_file_async(engine, entry[0], base_path, entry[1])
+
+    await asyncio.gather(
+        summarize_small_files_async(engine, small, single),
+        *(process_file_async(engine, node, base_path, content)
+          for node, content in zip(nodes, contents) if node["path"] not in small_paths),
+    )
+
+async def process_file_async(engine, tree_node, base_path, content=None):
+    if content is None:
+        content = await asyncio.to_thread(read_file_content, base_path, tree_node["path"])
+    if not content.strip():
+        return
+    print(f"[+] Processing file: {tree_node['path']}")
+    # Large files: chunk summaries (in parallel, cached by content) stand in for the code
+    chunk_summaries = await summarize_chunks(engine, content, "python") if needs_chunking(content) else None
+    if COMBINED_ANALYSIS:
+        try:
+            apply_combined(tree_node, await generate_structured_async(
+                engine, generate_combined_prompt(tree_node, content, chunk_summaries),
+                COMBINED_FIELDS, COMBINED_REQUIRED
+            ))
+            return
+        except Exception as e:
+            print(f"[!] Combined request failed for {tree_node['path']}, falling back to separate prompts: {e}")
+    summary, analysis = await asyncio.gather(
+        call_gemini_async(engine, generate_summary_prompt(tree_node, content, chunk_summaries), "summary"),
+        call_gemini_async(engine, generate_analysis_prompt(tree_node, content, chunk_summaries), "analysis"),
+    )
+    tree_node["summary"] = summary
+    tree_node["analysis"] = analysis
+
+async def summarize_tree_async(tree_node, base_path, concurrency=LLM_CONCURRENCY, rpm=GEMINI_RPM, tpm=GEMINI_TPM):
+    """
+    Concurrent version of walk_and_process: every summary/analysis request in
+    the tree runs through one rate-limited LLMEngine and results are written
+    back into the tree nodes.
+    """
+    nodes = collect_file_nodes(tree_node)
+    with LLMEngine(model, concurrency=concurrency, rpm=rpm, tpm=tpm) as engine:
+        await process_files_async(engine, nodes, base_path)
+    print(f"[Gemini] {len(nodes)} files processed: {engine.stats}")
+    return tree_node
+
+async def summarize_records_async(records, writer, base_path, concurrency=LLM_CONCURRENCY, rpm=GEMINI_RPM,
+                                  tpm=GEMINI_TPM, window=None):
+    """
+    Streaming version of summarize_tree_async: reads analysis records one at a
+    time, summarises Python files in windows of `window` records and writes
+    every record (annotated or passed through) to `writer` in input order.
+    Only one window is held in memory, whatever the size of the repository.
+    """
+    engine = LLMEngine(model, concurrency=concurrency, rpm=rpm, tpm=tpm)
+    window = window or max(1, concurrency) * 4
+    batch = []
+    processed = 0
+
+    async def flush():
+        nonlocal processed
+        files = [r for r in batch if r["type"] == "file" and r["name"].endswith(".py")]
+        await process_files_async(engine, files, base_path)
+        for record in batch:
+            writer.write(record)
+        processed += len(files)
+        batch.clear()
+
+    with engine:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= window:
+                await flush()
+        await flush()
+    print(f"[Gemini] {processed} files processed: {engine.stats}")
+    return processed
+
+BASE_REPO_PATH = r"P:\AI_Documentation\github_repo\cloned_repos"
+# Record files (.ndjson or .msgpack.zst, see github_repo/saving.py); a legacy
+# nested .json input is still accepted
+INPUT_TREE_JSON = r"P:\AI_Documentation\code_analysis.ndjson"
+OUTPUT_TREE_JSON = r"P:\AI_Documentation\annotated_code_analysis.ndjson"
 
+if __name__ == "__main__":
+    with RecordWriter(OUTPUT_TREE_JSON) as writer:
+        asyncio.run(summarize_records_async(iter_records(INPUT_TREE_JSON), writer, BASE_REPO_PATH))
 
+    print(f"\n Enhanced records saved to: {OUTPUT_TREE_JSON}")
@@ -1,7 +1,11 @@
 import os
+import sys
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from llm_cache import generate_cached
+
 load_dotenv()
 
 api_key = os.getenv("GEMINI_API_KEY")
@@ -30,8 +34,7 @@ model = genai.GenerativeModel("models/gemini-1.5-flash")
 
 def generate_plantuml(md_text):
     prompt = PROMPT_TEMPLATE.format(markdown_content=md_text)
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return generate_cached(model, prompt)
 
 def extract_uml_block(text):
     if "```plantuml" in text:
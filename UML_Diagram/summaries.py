@@ -1,5 +1,8 @@
 import os
-import json
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from github_repo.saving import iter_records
 
 def export_markdown_from_tree(tree, output_md_path="code_documentation.md"):
     md_lines = ["# Code Documentation Summary\n"]
@@ -29,8 +32,17 @@ def export_markdown_from_tree(tree, output_md_path="code_documentation.md"):
 
     print(f"Markdown documentation exported to: {output_md_path}")
 
-if __name__ == "__main__":
-    with open("annotated_code_analysis.json", "r", encoding="utf-8") as f:
-        tree_data = json.load(f)
+def export_markdown_from_records(records_path, output_md_path="code_documentation.md"):
+    """Same output as export_markdown_from_tree, streamed record by record (see github_repo/saving.py)."""
+    with open(output_md_path, "w", encoding="utf-8") as f:
+        f.write("# Code Documentation Summary\n")
+        for record in iter_records(records_path):
+            if record["type"] == "folder":
+                f.write(f"\n\n# Folder: {record['name']}")
+            elif record["name"].endswith(".py"):
+                f.write("\n\n### Summary\n" + (record.get("summary") or "> No summary available."))
 
-    export_markdown_from_tree(tree_data, output_md_path="complete_code_summary.md")
+    print(f"Markdown documentation exported to: {output_md_path}")
+
+if __name__ == "__main__":
+    export_markdown_from_records("annotated_code_analysis.ndjson", output_md_path="complete_code_summary.md")
@@ -1,4 +1,8 @@
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from repo_walker import EXCLUDE_FOLDERS as ANALYSIS_EXCLUDE_FOLDERS, build_tree, build_trees, analysis_file_record
 
 EXTENSION_LANG_MAP = {
     ".py": "Python",
@@ -21,42 +25,40 @@ def get_language(extension):
 
 EXCLUDE_FOLDERS = {".git", "node_modules", "__pycache__", "venv", "build", "dist"}
 
-def build_tree_with_metadata(path, root_path=None, depth=0):
-    if root_path is None:
-        root_path = path
-
-    name = os.path.basename(path)
-    rel_path = os.path.relpath(path, root_path).replace("\\", "/")
-
-    if os.path.isdir(path):
-        if name in EXCLUDE_FOLDERS:
-            return None
-
-        node = {
-            "name": name,
-            "path": rel_path,
-            "type": "folder",
-            "depth": depth,
-            "children": []
-        }
-        try:
-            for item in sorted(os.listdir(path)):
-                full_path = os.path.join(path, item)
-                child_node = build_tree_with_metadata(full_path, root_path, depth + 1)
-                if child_node is not None:
-                    node["children"].append(child_node)
-        except Exception as e:
-            print(f"Error accessing {path}: {e}")
-    else:
-        extension = os.path.splitext(name)[1]
-        node = {
-            "name": name,
-            "path": rel_path,
-            "type": "file",
-            "extension": extension,
-            "depth": depth,
-            "language": get_language(extension)
-        }
-    return node
+def metadata_file_record(entry, rel_path, depth):
+    extension = os.path.splitext(entry.name)[1]
+    try:
+        size = entry.stat().st_size  # cached by DirEntry, free on Windows
+    except OSError:
+        size = None
+    return {
+        "name": entry.name,
+        "path": rel_path,
+        "type": "file",
+        "extension": extension,
+        "depth": depth,
+        "language": get_language(extension),
+        "size": size
+    }
+
+def build_tree_with_metadata(path):
+    return build_tree(path, metadata_file_record, exclude=EXCLUDE_FOLDERS)
+
+def build_trees_with_metadata(path, analyzers=None):
+    """
+    Metadata tree and code-analysis tree from a single directory walk.
+    `analyzers` is a repo_walker registry (default: the language analyzers
+    clone_utils registers, loaded here if nothing imported them yet).
+    Returns (metadata_tree, analysis_tree).
+    """
+    if analyzers is None:
+        import clone_utils  # registers the analyzers in repo_walker.ANALYZERS on import
+    trees = build_trees(
+        path,
+        {"metadata": metadata_file_record, "analysis": analysis_file_record(registry=analyzers)},
+        exclude=EXCLUDE_FOLDERS & ANALYSIS_EXCLUDE_FOLDERS,
+        prune={"metadata": EXCLUDE_FOLDERS, "analysis": ANALYSIS_EXCLUDE_FOLDERS},
+    )
+    return trees["metadata"], trees["analysis"]
 
 tree = build_tree_with_metadata(r"P:\AI_Documentation\github_repo\cloned_repos")
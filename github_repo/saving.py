@@ -1,5 +1,162 @@
 import json
+import posixpath
+
+# Optional: the compact binary variant needs `pip install msgpack zstandard`
+try:
+    import msgpack
+    import zstandard
+except ImportError:
+    msgpack = zstandard = None
+
+# ------------------------------------------------------------------
+# Streaming record format
+# ------------------------------------------------------------------
+# A tree is stored as one record per node, in pre-order, without "children":
+#   {"type": "header", "format": RECORD_FORMAT}
+#   {"type": "folder", "name": ..., "path": ..., "depth": ...}
+#   {"type": "file", "name": ..., "path": ..., "depth": ..., <analysis fields>}
+# Writers and readers handle one record at a time, so memory stays flat
+# however large the repository is.
+#   *.ndjson / *.jsonl   one JSON object per line
+#   *.msgpack.zst        msgpack objects in a zstd stream (much smaller)
+RECORD_FORMAT = "ai-doc-records-1"
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+MSGPACK_EXTENSIONS = (".msgpack.zst", ".mpk.zst")
+ZSTD_LEVEL = 3
+
+
+def record_format(filename):
+    name = filename.lower()
+    if name.endswith(NDJSON_EXTENSIONS):
+        return "ndjson"
+    if name.endswith(MSGPACK_EXTENSIONS):
+        return "msgpack"
+    return "json"
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError("msgpack and zstandard are required for .msgpack.zst files (pip install msgpack zstandard)")
+
+
+def iter_tree_records(tree):
+    """Flattens a nested folder/file tree into records (pre-order, children removed)."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield {key: value for key, value in node.items() if key != "children"}
+        stack.extend(reversed(node.get("children", [])))
+
+
+def build_tree(records):
+    """Inverse of iter_tree_records; materialises the whole tree (for legacy consumers)."""
+    root = None
+    folders = {}
+    for record in records:
+        if record.get("type") == "header":
+            continue
+        node = dict(record, children=[]) if record["type"] == "folder" else dict(record)
+        if root is None:
+            root = node
+        else:
+            folders.get(posixpath.dirname(record["path"]) or ".", root)["children"].append(node)
+        if record["type"] == "folder":
+            folders[record["path"]] = node
+    return root
+
+
+class RecordWriter:
+    """Appends records one at a time to an NDJSON or msgpack+zstd file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.format = record_format(filename)
+        if self.format == "json":
+            raise ValueError(f"Not a record file: {filename} (use .ndjson or .msgpack.zst)")
+        if self.format == "msgpack":
+            _require_msgpack()
+            self._raw = open(filename, "wb")
+            self._file = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._raw)
+            self._packer = msgpack.Packer()
+        else:
+            self._file = open(filename, "w", encoding="utf-8", newline="\n")
+        self.count = 0
+        self.write({"type": "header", "format": RECORD_FORMAT})
+
+    def write(self, record):
+        if self.format == "msgpack":
+            self._file.write(self._packer.pack(record))
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+        if self.format == "msgpack" and not self._raw.closed:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_records(records, filename):
+    """Streams an iterable of records (or a whole tree) to `filename`. Returns the record count."""
+    if isinstance(records, dict):
+        records = iter_tree_records(records)
+    with RecordWriter(filename) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count - 1
+
+
+def iter_records(filename):
+    """
+    Yields records one by one from an NDJSON or msgpack+zstd file.
+    A legacy nested .json file is loaded whole and flattened.
+    """
+    fmt = record_format(filename)
+    if fmt == "json":
+        with open(filename, "r", encoding="utf-8") as f:
+            yield from iter_tree_records(json.load(f))
+        return
+
+    if fmt == "msgpack":
+        _require_msgpack()
+        with open(filename, "rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            unpacker = msgpack.Unpacker(raw=False)
+            while True:
+                chunk = reader.read(1 << 16)
+                if not chunk:
+                    break
+                unpacker.feed(chunk)
+                for record in unpacker:
+                    if record.get("type") != "header":
+                        yield record
+        return
+
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("type") != "header":
+                    yield record
+
+
+def iter_file_records(filename, extension=None):
+    """File records only, optionally filtered by name suffix (e.g. ".py")."""
+    for record in iter_records(filename):
+        if record["type"] == "file" and (extension is None or record["name"].endswith(extension)):
+            yield record
+
 
 def save_structure(structure, filename="repo_metadata.json"):
+    # Record files stream node by node; plain .json keeps the nested, indented layout
+    if record_format(filename) != "json":
+        save_records(structure, filename)
+        return
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(structure, f, indent=2)
@@ -1,8 +1,12 @@
 import javalang
 import os
+import sys
 import ast
 
-EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from repo_walker import register_analyzer, build_tree, analysis_file_record
+
+ANALYZERS = {}
 
 def analyze_java_code(file_path):
     try:
@@ -28,49 +32,10 @@ def analyze_java_code(file_path):
     except Exception as e:
         print(f"[!] Error analyzing Java file {file_path}: {e}")
         return None
-    
-def build_code_analysis_tree(path, root_path=None, depth=0):
-    if root_path is None:
-        root_path = path
-
-    name = os.path.basename(path)
-    rel_path = os.path.relpath(path, root_path).replace("\\", "/")
-
-    if os.path.isdir(path):
-        if name in EXCLUDE_FOLDERS:
-            return None
 
-        node = {
-            "name": name,
-            "path": rel_path,
-            "type": "folder",
-            "depth": depth,
-            "children": []
-        }
-
-        try:
-            for item in sorted(os.listdir(path)):
-                full_path = os.path.join(path, item)
-                child_node = build_code_analysis_tree(full_path, root_path, depth + 1)
-                if child_node is not None:
-                    node["children"].append(child_node)
-        except Exception as e:
-            print(f"[!] Error reading directory {path}: {e}")
+register_analyzer(["java"], "java", analyze_java_code, ANALYZERS)
 
-        return node
-    else:
-        if not path.endswith(".java"):
-            return None
+def build_code_analysis_tree(path):
+    return build_tree(path, analysis_file_record(registry=ANALYZERS))
 
-        analysis = analyze_java_code(path)
-        if analysis:
-            return {
-                "name": name,
-                "path": rel_path,
-                "type": "file",
-                "depth": depth,
-                **analysis
-            }
-        return None
-    
 print(build_code_analysis_tree(r"P:\AI_Documentation\github_repo\cloned_repos"))
@@ -1,7 +1,12 @@
 import re
 import os
+import sys
 import ast
-EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from repo_walker import register_analyzer, build_tree, analysis_file_record
+
+ANALYZERS = {}
 
 def analyze_js_code(file_path):
     try:
@@ -28,51 +33,9 @@ def analyze_js_code(file_path):
         print(f"[!] Error analyzing JS file {file_path}: {e}")
         return None
 
-def build_code_analysis_tree(path, root_path=None, depth=0):
-    if root_path is None:
-        root_path = path
-
-    name = os.path.basename(path)
-    rel_path = os.path.relpath(path, root_path).replace("\\", "/")
-
-    if os.path.isdir(path):
-        if name in EXCLUDE_FOLDERS:
-            return None
-
-        node = {
-            "name": name,
-            "path": rel_path,
-            "type": "folder",
-            "depth": depth,
-            "children": []
-        }
-
-        try:
-            for item in sorted(os.listdir(path)):
-                full_path = os.path.join(path, item)
-                child_node = build_code_analysis_tree(full_path, root_path, depth + 1)
-                if child_node is not None:
-                    node["children"].append(child_node)
-        except Exception as e:
-            print(f"[!] Error reading directory {path}: {e}")
-
-        return node
-    else:
-        extension = os.path.splitext(name)[1].lower()
+register_analyzer(["js"], "javascript", analyze_js_code, ANALYZERS)
 
-        if extension == ".js":
-            analysis = analyze_js_code(path)
-        else:
-            return None
-
-        if analysis:
-            return {
-                "name": name,
-                "path": rel_path,
-                "type": "file",
-                "depth": depth,
-                **analysis
-            }
-        return None
+def build_code_analysis_tree(path):
+    return build_tree(path, analysis_file_record(registry=ANALYZERS))
 
 print(build_code_analysis_tree(r"P:\AI_Documentation\github_repo\cloned_repos"))
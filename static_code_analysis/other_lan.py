@@ -1,7 +1,11 @@
 import os
+import sys
+from functools import partial
 from tree_sitter_languages import get_parser
 
-EXCLUDE_FOLDERS = {".git", "__pycache__", "node_modules", ".vscode", "venv"}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Backend"))
+from compact_ast import compact_ast_from_node
+from repo_walker import register_analyzer, build_tree, analysis_file_record
 
 LANGUAGE_EXT_MAP = {
     "c": "c",
@@ -16,78 +20,29 @@ LANGUAGE_EXT_MAP = {
     "css": "css",
 }
 
+ANALYZERS = {}
+
 def analyze_tree_sitter_code(file_path, language_name):
     try:
         parser = get_parser(language_name)
         with open(file_path, "r", encoding="utf-8", errors="replace") as f:
             source = f.read()
         tree = parser.parse(source.encode())
-        root = tree.root_node
-
-        def walk_tree(node):
-            node_dict = {
-                "type": node.type,
-                "start": node.start_point,
-                "end": node.end_point,
-                "children": [walk_tree(child) for child in node.children if child.is_named]
-            }
-            return node_dict
 
         return {
             "lines_of_code": len(source.splitlines()),
-            "ast": walk_tree(root),
+            "ast": compact_ast_from_node(tree.root_node),
             "summary_generated": False
         }
     except Exception as e:
         print(f"[!] Error analyzing file {file_path}: {e}")
         return None
 
-def build_code_analysis_tree(path, root_path=None, depth=0):
-    if root_path is None:
-        root_path = path
-
-    name = os.path.basename(path)
-    rel_path = os.path.relpath(path, root_path).replace("\\", "/")
+for ext, language_name in LANGUAGE_EXT_MAP.items():
+    register_analyzer([ext], language_name, partial(analyze_tree_sitter_code, language_name=language_name), ANALYZERS)
 
-    if os.path.isdir(path):
-        if name in EXCLUDE_FOLDERS:
-            return None
-
-        node = {
-            "name": name,
-            "path": rel_path,
-            "type": "folder",
-            "depth": depth,
-            "children": []
-        }
-
-        try:
-            for item in sorted(os.listdir(path)):
-                full_path = os.path.join(path, item)
-                child_node = build_code_analysis_tree(full_path, root_path, depth + 1)
-                if child_node is not None:
-                    node["children"].append(child_node)
-        except Exception as e:
-            print(f"[!] Error reading directory {path}: {e}")
-
-        return node
-    else:
-        _, ext = os.path.splitext(name)
-        ext = ext.lstrip(".").lower()  # clean extension
-        language_name = LANGUAGE_EXT_MAP.get(ext)
-        if not language_name:
-            return None
-
-        analysis = analyze_tree_sitter_code(path, language_name)
-        if analysis:
-            return {
-                "name": name,
-                "path": rel_path,
-                "type": "file",
-                "depth": depth,
-                **analysis
-            }
-        return None
+def build_code_analysis_tree(path):
+    return build_tree(path, analysis_file_record(registry=ANALYZERS))
 
 print(build_code_analysis_tree(r"P:\AI_Documentation\cloned_repos"))
 